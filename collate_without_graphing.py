@@ -5,9 +5,9 @@ or sort by frequency. This should be used for abnormal data.
 
 import sys
 import re
-from typing import List, Dict
-import pandas as pd
-import speckle
+from typing import Any, Dict, List, Optional
+from speckle.catalog import Catalog
+from speckle.index import FileIndex
 
 
 def main(args: List[str]) -> int:
@@ -74,26 +74,29 @@ def main(args: List[str]) -> int:
 
         print(f'Accepted file {file}')
 
-        # Load tracks file
-        tracks: pd.DataFrame = pd.read_csv(file)
-        tracks.drop([0, 1, 2], inplace=True)
+        # Look up the mean and (sample) std of
+        # MEAN_STRAIGHT_LINE_SPEED in the index
+        summary: Optional[Dict[str, Any]] = index.summary(file)
 
-        speeds = \
-            tracks['MEAN_STRAIGHT_LINE_SPEED'].astype(float)
+        if summary is None or summary['sls_mean'] is None:
+            print(f'Rejected unindexed file {file}')
+            return
 
-        # Calculate mean MEAN_STRAIGHT_LINE_SPEED
-        mean: float = speeds.mean()
+        # Append to `means` and `stds`
+        means[file] = summary['sls_mean']
+        stds[file] = summary['sls_std'] \
+            if summary['sls_std'] is not None else float('nan')
 
-        # Calculate std MEAN_STRAIGHT_LINE_SPEED
-        std: float = speeds.std()
+    # Walk the tree once, and only reread files which have
+    # changed since they were last indexed
+    catalog: Catalog = Catalog.scan(root)
 
-        # Append to `means` and `stds`
-        means[file] = mean
-        stds[file] = std
+    with FileIndex(root) as index:
+        print(f'Indexed {index.refresh(catalog)} new or changed files.')
 
-    # Fetch all the data from the current frequency pattern
-    speckle.for_each_file(
-        do_single_frequency_file, root, pattern)
+        # Fetch all the data from the current frequency pattern
+        for file in catalog.select(matching=pattern).paths():
+            do_single_frequency_file(file)
 
     if len(means) == 0:
         print('Failed to find any track data!')
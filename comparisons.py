@@ -14,59 +14,12 @@ jdehmel@outlook.com
 
 import sys
 import re
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 import pandas as pd
 from matplotlib import pyplot as plt
 
-import speckle
-
-
-# The set of all possible chamber heights. A set of files should
-# match only one.
-z_position_filters: List[str] = [r'8940', r'8960', r'8965', r'8980', r'8985',
-                                 r'8990', r'9010', r'9015', r'9035', r'9040',
-                                 r'9060', r'9080', r'9090', r'9115', r'9140',
-                                 r'9180', r'9197', r'9205', r'9230', r'9240',
-                                 r'9255', r'9265', r'9280', r'9290', r'9305',
-                                 r'9315', r'9340',
-                                 r'top-195', r'top-165', r'top-135',
-                                 r'top-100', r'top-97', r'top-75', r'top-50',
-                                 r'top-25', r'top(?!-)', r'bot(?!\+)',
-                                 r'bot\+25', r'bot\+50', r'bot\+70',
-                                 r'bot\+75', r'bot\+100', r'bot\+135',
-                                 r'bot\+165', r'bot\+190', r'bot\+195',
-                                 r'bot\+210']
-
-# The voltage filters to use
-voltages: Dict[str, str] = {r'(?<!1)5[_ ]?[vV]': '5v',
-                            r'7[_ ]?[vV]': '7v',
-                            r'8[_ ]?[vV]': '8v',
-                            r'9[_ ]?[vV]': '9v',
-                            r'10[_ ]?[vV]': '10v',
-                            r'12[_ ]?[vV]': '12v',
-                            r'15[_ ]?[vV]': '15v',
-                            r'16[_ ]?[vV]': '16v',
-                            r'20[_ ]?[vV]': '20v'}
-skip_voltage: bool = False
-
-# The frequency filters to use
-control_pattern: str = r'control[0-9]*_tracks\.csv'
-frequencies: Dict[str, str] = {
-    control_pattern: '0khz',
-    r'(?<![\.0-9])0\.5khz[0-9]*': '0.5khz',
-    r'(?<![\.0-9])0\.2khz[0-9]*': '0.2khz',
-    r'(?<![\.0-9])0\.3khz[0-9]*_tracks\.csv': '0.3khz',
-    r'(?<![\.0-9])0\.4khz[0-9]*_tracks\.csv': '0.4khz',
-    r'(?<![\.0-9])0\.8khz[0-9]*': '0.8khz',
-    r'(?<![\.0-9])1khz[0-9]*': '1khz',
-    r'(?<![\.0-9])2khz[0-9]*': '2khz',
-    r'(?<![\.0-9])3khz[0-9]*': '3khz',
-    r'(?<![\.0-9])5khz[0-9]*': '5khz',
-    r'(?<![\.0-9])10khz[0-9]*': '10khz',
-    r'(?<![\.0-9])25khz[0-9]*': '25khz',
-    r'(?<![\.0-9])50khz[0-9]*': '50khz',
-    r'(?<![\.0-9])75khz[0-9]*': '75khz',
-    r'(?<![\.0-9])100khz[0-9]*': '100khz'}
+from speckle.catalog import Catalog, frequency_label, height_order
+from speckle.index import FileIndex
 
 
 def clean_pattern(what: str, replacement: str = '_', exclude: str = '') -> str:
@@ -106,32 +59,38 @@ def graph_each_frequency(root: str,
         these operations.
     '''
 
-    column_name: str = 'MEAN_STRAIGHT_LINE_SPEED'
     all_data: Dict[str, Tuple[List[str], List[float], List[float]]] = {}
 
-    # Used for comparing SLS and MSD
-    all_sls: List[float] = []
-    all_msd: List[float] = []
+    # Walk the tree only once, and only reread files which have
+    # changed since they were last indexed
+    scanned: Catalog = Catalog.scan(root)
+    catalog: Catalog = scanned.select(kind=('tracks', 'filtered'))
 
-    # Iterate over frequency patterns
-    for frequency in frequencies:
+    index: FileIndex = FileIndex(root)
+    print(f'Indexed {index.refresh(scanned)} new or changed files.')
 
-        print(f'Frequency {clean_pattern(frequency, "")}')
+    # Iterate over frequencies
+    for hz in catalog.frequencies():
+
+        frequency: str = frequency_label(hz)
+        print(f'Frequency {frequency}')
 
         means: Dict[str, float] = {}
         stds: Dict[str, float] = {}
         title: str = ''
 
-        def do_single_frequency_file(file: str) -> None:
+        def do_single_frequency_file(file: str,
+                                     height: Optional[str]) -> None:
             '''
             Loads a single frequency's tracks file and loads the
             mean and std for straight line speed. Appends this
             information to external variables.
 
             :param file: The file to operate on.
+            :param height: The chamber height of the file.
             '''
 
-            nonlocal means, stds, title, all_sls, all_msd
+            nonlocal means, stds, title
 
             # Skip non-matching
             if not re.findall(pattern, file):
@@ -150,33 +109,24 @@ def graph_each_frequency(root: str,
             print(f'Accepted file {file}')
             title = file
 
-            # Load tracks file
-            tracks: pd.DataFrame = pd.read_csv(file)
-            tracks.drop([0, 1, 2], inplace=True)
+            # Look up the tracks file in the index
+            summary: Optional[Dict[str, Any]] = index.summary(file)
 
-            speeds = tracks[column_name].astype(float)
+            if summary is None or summary['sls_mean'] is None:
+                print(f'Rejected unindexed file {file}')
+                return
 
-            if 'MEAN_SQUARED_DISPLACEMENT' in tracks:
-                all_sls += list(speeds)
-                all_msd += list(
-                    tracks['MEAN_SQUARED_DISPLACEMENT'].astype(float))
-            else:
+            if summary['msd_mean'] is None:
                 print('Failed to find MSD entries.')
 
-            # Calculate mean MEAN_STRAIGHT_LINE_SPEED
-            mean: float = speeds.mean()
-
-            # Calculate std MEAN_STRAIGHT_LINE_SPEED
-            std: float = speeds.std()
+            # Mean and (sample) std of MEAN_STRAIGHT_LINE_SPEED
+            mean: float = summary['sls_mean']
+            std: float = summary['sls_std'] \
+                if summary['sls_std'] is not None else float('nan')
 
             # Extract friendlier chamber height label for the
             # graph x-axis
-            label: str = file
-            for height_pattern in z_position_filters:
-
-                if re.findall(height_pattern, file):
-                    label = height_pattern
-                    break
+            label: str = height if height is not None else file
 
             if label in means or label in stds:
                 print(f'Abandoning {file}')
@@ -186,8 +136,9 @@ def graph_each_frequency(root: str,
             means[label] = mean
             stds[label] = std
 
-        # Fetch all the data from the current frequency pattern
-        speckle.for_each_file(do_single_frequency_file, root, '.*' + frequency)
+        # Fetch all the data from the current frequency
+        for entry in catalog.select(frequency=hz):
+            do_single_frequency_file(entry.path, entry.height)
 
         if len(means) == 0:
             print(f'Skipping pattern {frequency}')
@@ -196,7 +147,7 @@ def graph_each_frequency(root: str,
         # Fetch the list of keys in ascending order. This will
         # be used several times later on.
         keys: List[str] = list(means)
-        keys.sort(key=z_position_filters.index)
+        keys.sort(key=height_order)
 
         cleaned_keys = [clean_pattern(key, '') for key in keys]
 
@@ -250,6 +201,7 @@ def graph_each_frequency(root: str,
     plt.savefig(saveat + '/chamber_height.png', bbox_inches='tight')
 
     plt.close()
+    index.close()
 
 
 def main(argv: List[str]) -> int:
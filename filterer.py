@@ -48,13 +48,16 @@ col_names = ['TRACK_DISPLACEMENT',
 '''
 
 # Import needed packages
+import json
 import sys
 from time import time
-from typing import List, Tuple, Union, Optional, Any
-from os import chdir, getcwd, sep
+from dataclasses import dataclass, fields, replace
+from typing import List, Tuple, Union, Optional, Any, Dict
+from os import getcwd, listdir, sep
+from os.path import dirname, join, realpath
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import matplotlib.pyplot as plt
-from numpy import zeros, mean, std, percentile
+from numpy import zeros, ones, mean, std, percentile, ndarray
 import name_fixer
 
 ###############################################################################
@@ -111,7 +114,7 @@ do_duration_thresh: bool = True
 duration_threshold: int = 65
 
 # If not None, also save graphs and .csv files here
-secondary_save_path: str = '/home/jorb/Programs/physicsScripts'
+secondary_save_path: Optional[str] = None
 
 # If true, will only print warnings and errors
 silent: bool = True
@@ -129,6 +132,16 @@ do_extra_filter_scatter_plots: bool = False
 # If true, saves a histogram of filtered data points for each file
 save_filtering_data: bool = False
 
+# If true, only saves the numeric results of filtering, without
+# importing matplotlib. The graphs can be rendered from these later
+# by running this script with `--render`.
+compute_only: bool = False
+
+# If greater than 1, the files after the control are filtered on
+# this many worker processes. This can also be set by passing
+# `--jobs N`.
+jobs: int = 1
+
 ###############################################################################
 # End settings
 ###############################################################################
@@ -144,15 +157,10 @@ extra_columns: List[str] = ['INITIAL_TRACK_COUNT',
                             'FILTERED_TRACK_COUNT',
                             'STRAIGHT_LINE_SPEED_UM_PER_S']
 
-# These are internally used; Do not change
-brownian_speed_threshold: float = 0.0
-brownian_displacement_threshold: float = 0.0
-brownian_linearity_threshold: float = 0.0
-
 # These are for internal use, do not change
-filter_scatter_plots_data: List[List[List[Any]]] = []
-save_num: int = 0
-quality_threshold: Optional[float] = None
+results_name: str = 'track_data_results.json'
+pre_filter_suffix: str = '_pre_filter_sls.csv'
+batch_summary_name: str = 'batch_track_data_summary.csv'
 
 # These are regular expressions that power the automatic folder
 # thing. Any naming scheme which matches these regular expressions
@@ -186,13 +194,59 @@ fallback_patterns: List[str] = ['((?<![0-9])0 ?khz|[cC]ontrol)',
                                 '300 ?khz']
 
 
+@dataclass
+class FilterConfig:
+    '''
+    The settings of a filtering run, as described above. Passing
+    one of these to `run` configures it without touching any
+    module-level state, so that many folders can be filtered in
+    one process with different settings. The defaults match
+    those of the settings above.
+    '''
+
+    do_std_filter_flags: Optional[List[bool]] = None
+    do_iqr_filter_flags: Optional[List[bool]] = None
+    do_quality_percentile_filter: bool = False
+    quality_percentile_filter: float = 50.0
+    conversion: float = 4 * 0.32
+    do_speed_thresh: bool = True
+    brownian_multiplier: float = 0.0
+    do_displacement_thresh: bool = False
+    do_linearity_thresh: bool = False
+    do_duration_thresh: bool = True
+    duration_threshold: int = 65
+    secondary_save_path: Optional[str] = None
+    silent: bool = True
+    do_speed_thresh_fallback: bool = False
+    brownian_speed_threshold_fallback: float = 0.042114570268546765
+    do_filter_scatter_plots: bool = True
+    do_extra_filter_scatter_plots: bool = False
+    save_filtering_data: bool = False
+    compute_only: bool = False
+    jobs: int = 1
+
+    @staticmethod
+    def from_settings() -> 'FilterConfig':
+        '''
+        :returns: A config holding the current values of the
+            module-level settings.
+        '''
+
+        settings: Dict[str, Any] = globals()
+        return FilterConfig(**{field.name: settings[field.name]
+                               for field in fields(FilterConfig)})
+
+
 def do_file(name: str,
             displacement_threshold: float = 0.0,
             speed_threshold: float = 0.0,
             linearity_threshold: float = 0.0,
-            std_drop_flags: List[bool] = None,
-            iqr_drop_flags: List[bool] = None,
-            return_label: bool = False) -> ([float], [float]):
+            std_drop_flags: Optional[List[bool]] = None,
+            iqr_drop_flags: Optional[List[bool]] = None,
+            return_label: bool = False,
+            number: int = 1,
+            config: Optional['FilterConfig'] = None
+            ) -> ([float], [float], [[Any]]):
     '''
     Analyze a file with a given name, and return the results
     If speed_threshold is nonzero, any track with less speed will
@@ -201,13 +255,19 @@ def do_file(name: str,
     arrays of booleans. If the ith item is True, that column
     will be filtered such that only items which remain are those
     which are above 2 STD/IQR below the mean for their column.
+    The number of the file within its run is used to name the
+    files saved by save_filtering_data. Any files are saved in
+    the same folder as the given one. If no config is given, the
+    settings above are used.
     Returns a tuple containing the output data followed by
-    the standard deviations.
+    the standard deviations, then each track's SLS, whether it was
+    dropped, and why.
     '''
 
-    global save_num
-    save_num += 1
+    if config is None:
+        config = FilterConfig.from_settings()
 
+    where: str = dirname(name)
     csv: pd.DataFrame = pd.DataFrame()
 
     try:
@@ -216,7 +276,7 @@ def do_file(name: str,
     except RuntimeError:
         print('Failed to open', name)
         return ([None for _ in col_names] + [None, None],
-                [None for _ in col_names])
+                [None for _ in col_names], [])
 
     # Drop useless data (columns)
     names_to_drop: List[str] = []
@@ -236,270 +296,180 @@ def do_file(name: str,
     # Drop useless data (rows)
     csv.drop(axis=0, inplace=True, labels=[0, 1, 2])
 
-    if save_filtering_data:
-        plt.clf()
-        plt.hist([float(row[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                 for row in csv.iterrows()], bins=30, color='r', label='PRE')
-
-        m = mean([float(row[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                 for row in csv.iterrows()])
-        s = std([float(row[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                for row in csv.iterrows()])
-        plt.vlines([m - s, m, m + s], 0, 5, colors=['r'])
-
     # For keeping track of what was dropped
-    dropped_row_indices = []
+    dropped_row_indices: List[List[Any]] = []
 
     # Used later
     initial_num_rows: int = len(csv)
 
-    backup = csv.copy(deep=True)
+    # The SLS of every track before filtering, for the histogram
+    # which `render` draws from the saved results
+    if config.save_filtering_data:
+        csv['MEAN_STRAIGHT_LINE_SPEED'].astype(float).to_csv(
+            join(where, str(number) + pre_filter_suffix))
 
-    # Null filtering
-    for row in csv.iterrows():
-        if float(row[1]['TRACK_DURATION']) != float(row[1]['TRACK_DURATION']):
-            csv.drop(axis=0, inplace=True, labels=[row[0]])
+    # Each stage computes a mask of the rows it drops from typed
+    # copies of the columns, and combines it with the running mask
+    # of kept rows. The frame itself is only cut down once, after
+    # every stage has run.
+    columns: Dict[str, pd.Series] = {}
+    kept: ndarray = ones(len(csv), dtype=bool)
 
-    # Do duration thresh here
-    try:
-        backup = csv.copy(deep=True)
-
-        if do_duration_thresh:
-            for row in csv.iterrows():
-                # Must pass duration threshold
-                if (float(row[1]['TRACK_DURATION']) < duration_threshold
-                        or float(row[1]['TRACK_DURATION'])
-                        != float(row[1]['TRACK_DURATION'])):
-                    dropped_row_indices.append(
-                        [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                         'DURATION_THRESHOLD'])
-                    csv.drop(axis=0, inplace=True, labels=[row[0]])
-                    continue
-
-        if csv.shape[0] == 0:
-            print('In file', name)
-            print('Error! No items exceeded duration thresholding.')
-            raise RuntimeError('Overfiltering Error')
+    def column(col_name: str) -> pd.Series:
+        '''
+        :param col_name: A column of the file.
+        :returns: The column as floats, for every row.
+        '''
 
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
-        csv = backup.copy(deep=True)
+        if col_name not in columns:
+            columns[col_name] = csv[col_name].astype(float)
+        return columns[col_name]
 
-    # Now drop duration, it's not needed anymore
-    csv.drop(axis=1, inplace=True, labels=['TRACK_DURATION'])
-    assert csv.columns.to_list() == col_names
-
-    # Recheck column order
-    i: int = 0
-    for item in csv.columns.to_list():
-        assert item == col_names[i]
-        i += 1
-
-    try:
-        # Do thresholding here
-        if do_speed_thresh:
-            for row in csv.iterrows():
-                # Must meet mean straight line speed threshold
-                if float(row[1]['MEAN_STRAIGHT_LINE_SPEED']) < speed_threshold:
-                    dropped_row_indices.append(
-                        [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                         'SPEED_THRESHOLD'])
-                    csv.drop(axis=0, inplace=True, labels=[row[0]])
-                    continue
-
-        if csv.shape[0] == 0:
-            print('In file', name)
-            print('Error! No items exceeded brownian speed thresholding.')
-            raise RuntimeError('Overfiltering Error')
-
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
-        csv = backup.copy(deep=True)
-
-    try:
-        backup = csv.copy(deep=True)
-
-        if do_displacement_thresh:
-            for row in csv.iterrows():
-                # Must also meet displacement threshold
-                if (float(row[1]['TRACK_DISPLACEMENT'])
-                        < displacement_threshold):
-                    dropped_row_indices.append(
-                        [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                         'DISPLACEMENT_THRESHOLD'])
-                    csv.drop(axis=0, inplace=True, labels=[row[0]])
-                    continue
-
-        if csv.shape[0] == 0:
-            print('In file', name)
-            print(
-                'Error! No items exceeded brownian displacement thresholding.')
-            raise RuntimeError('Overfiltering Error')
+    def drop(mask: ndarray, reason: Optional[str]) -> None:
+        '''
+        Drops every kept row in a mask, recording why.
 
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
-        csv = backup.copy(deep=True)
+        :param mask: The rows to drop, over every row.
+        :param reason: The reason to record, or None.
+        '''
 
-    try:
-        backup = csv.copy(deep=True)
-
-        if do_linearity_thresh:
-            for row in csv.iterrows():
-                # Must pass linearity threshold
-                if (float(row[1]['LINEARITY_OF_FORWARD_PROGRESSION'])
-                        < linearity_threshold):
-                    dropped_row_indices.append(
-                        [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                         'LINEARITY_THRESHOLD'])
-                    csv.drop(axis=0, inplace=True, labels=[row[0]])
-                    continue
-
-        if csv.shape[0] == 0:
-            print('In file', name)
-            print('Error! No items exceeded brownian linearity thresholding.')
-            raise RuntimeError('Overfiltering Error')
+        nonlocal kept
 
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
-        csv = backup.copy(deep=True)
+        mask = kept & mask
+        if reason is not None:
+            dropped_row_indices.extend(
+                [index, speed, reason] for index, speed in zip(
+                    csv.index[mask], csv['MEAN_STRAIGHT_LINE_SPEED'][mask]))
 
-    try:
-        backup = csv.copy(deep=True)
-
-        if do_quality_percentile_filter:
-            # Must pass quality threshold
-            quality_percentile_threshold: float = percentile(
-                csv['TRACK_MEAN_QUALITY'].astype(float),
-                q=[quality_percentile_filter])[0]
-
-            for row in csv.iterrows():
-                if (float(row[1]['TRACK_MEAN_QUALITY'])
-                        < quality_percentile_threshold):
-                    dropped_row_indices.append(
-                        [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                         'QUALITY_PERCENTILE'])
-                    csv.drop(axis=0, inplace=True, labels=[row[0]])
-                    continue
-
-        if csv.shape[0] == 0:
-            print('In file', name)
-            print('Error! No items exceeded quality thresholding.')
-            raise RuntimeError('Overfiltering Error')
+        kept = kept & ~mask
 
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
-        csv = backup.copy(deep=True)
+    def check(backup: ndarray, message: List[str]) -> None:
+        '''
+        Reverts to the given mask if no rows are left.
 
-    try:
-        backup = csv.copy(deep=True)
-
-        # Do STD filtering if needed
-        if std_drop_flags is not None:
-            # Collect STD's for the requested items
-            std_values: List[float] = [
-                std(csv[col_name].astype(float)) if std_drop_flags[i] else 0.0
-                for i, col_name in enumerate(csv.columns)]
-
-            # Collect means
-            mean_values: List[float] = [
-                mean(csv[col_name].astype(float)) if std_drop_flags[i] else 0.0
-                for i, col_name in enumerate(csv.columns)]
-
-            # Iterate over rows, dropping if needed
-            for row in csv.iterrows():
-                raw_list: List[float] = row[1].astype(float).to_list()
-
-                for i, _ in enumerate(raw_list):
-                    if raw_list[i] < mean_values[i] - (2 * std_values[i]):
-                        dropped_row_indices.append(
-                            [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                             'INTERNAL_STD_FILTERING'])
-                        csv.drop(axis=0, inplace=True, labels=[row[0]])
-                        break
-
-                    # Filter anything above, but ONLY if this is control
-                    elif (speed_threshold == 0.0 and std_drop_flags[i]
-                            and raw_list[i] > mean_values[i]
-                            + (2 * std_values[i])):
-                        dropped_row_indices.append(
-                            [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                             'INTERNAL_STD_FILTERING'])
-                        csv.drop(axis=0, inplace=True, labels=[row[0]])
-                        break
-
-        if csv.shape[0] == 0:
-            print('In file', name)
-            print('Error! No items survived brownian thresholding',
-                  'and standard deviation filtering.')
-            raise RuntimeError('Overfiltering Error')
+        :param backup: The mask of kept rows before the stage.
+        :param message: What to print on reverting.
+        '''
 
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
-        csv = backup.copy(deep=True)
+        nonlocal kept
 
-    try:
-        backup = csv.copy(deep=True)
-
-        # Do IQR filtering if needed
-        if (iqr_drop_flags is not None
-                and len(iqr_drop_flags) == len(csv.columns)):
-
-            # Calculate IQR values
-            iqr_values: List[float] = [0.0 for i in csv.columns]
-            for i, col_name in enumerate(csv.columns):
-                if iqr_drop_flags[i]:
-                    q1, q3 = percentile(csv[col_name].astype(float), [25, 75])
-                    iqr_values[i] = q3 - q1
-
-            # Collect means
-            mean_values: List[float] = [
-                mean(csv[col_name].astype(float)) if iqr_drop_flags[i] else 0.0
-                for col_name in csv.columns]
-
-            # Iterate over rows, dropping if needed
-            for row in csv.iterrows():
-                raw_list: List[float] = row[1].astype(float).to_list()
-
-                for i, _ in enumerate(raw_list):
-                    if raw_list[i] < mean_values[i] - (1.5 * iqr_values[i]):
-                        dropped_row_indices.append(
-                            [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                             'INTERNAL_IQR_FILTERING'])
-                        csv.drop(axis=0, inplace=True, labels=[row[0]])
-                        break
-
-                    # Filter anything above, but ONLY if this is control
-                    elif (speed_threshold == 0.0 and iqr_drop_flags[i]
-                            and raw_list[i] > mean_values[i]
-                            + (1.5 * iqr_values[i])):
-                        dropped_row_indices.append(
-                            [row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED'],
-                             'INTERNAL_IQR_FILTERING'])
-                        csv.drop(axis=0, inplace=True, labels=[row[0]])
-                        break
-
-        if csv.shape[0] == 0:
+        if not kept.any():
             print('In file', name)
-            print(
-                'Error! No items survived brownian thresholding, STD',
-                'filtering, and IQR filtering.')
-            raise RuntimeError('Overfiltering Error')
+            print(*message)
+            print('Overfiltering Error')
+            print('SEVERE WARNING! Reverting')
+            kept = backup
 
-    except RuntimeError as e:
-        print(e)
-        print('SEVERE WARNING! Reverting')
+    # Null filtering
+    durations: ndarray = column('TRACK_DURATION').to_numpy()
+    drop(durations != durations, None)
 
-        csv = backup.copy(deep=True)
+    # Do duration thresh here
+    backup: ndarray = kept
+    if config.do_duration_thresh:
+        # Must pass duration threshold
+        drop(durations < config.duration_threshold, 'DURATION_THRESHOLD')
+    check(backup, ['Error! No items exceeded duration thresholding.'])
 
-    del backup
+    # Now drop duration, it's not needed anymore
+    csv.drop(axis=1, inplace=True, labels=['TRACK_DURATION'])
+    assert csv.columns.to_list() == col_names
 
-    csv.to_csv(name.replace('/', '_') + '.filtered.csv')
+    # Do thresholding here
+    backup = kept
+    if config.do_speed_thresh:
+        # Must meet mean straight line speed threshold
+        drop(column('MEAN_STRAIGHT_LINE_SPEED').to_numpy() < speed_threshold,
+             'SPEED_THRESHOLD')
+    check(backup, ['Error! No items exceeded brownian speed thresholding.'])
+
+    backup = kept
+    if config.do_displacement_thresh:
+        # Must also meet displacement threshold
+        drop(column('TRACK_DISPLACEMENT').to_numpy()
+             < displacement_threshold, 'DISPLACEMENT_THRESHOLD')
+    check(backup,
+          ['Error! No items exceeded brownian displacement thresholding.'])
+
+    backup = kept
+    if config.do_linearity_thresh:
+        # Must pass linearity threshold
+        drop(column('LINEARITY_OF_FORWARD_PROGRESSION').to_numpy()
+             < linearity_threshold, 'LINEARITY_THRESHOLD')
+    check(backup,
+          ['Error! No items exceeded brownian linearity thresholding.'])
+
+    backup = kept
+    if config.do_quality_percentile_filter:
+        # Must pass quality threshold
+        quality_percentile_threshold: float = percentile(
+            column('TRACK_MEAN_QUALITY')[kept],
+            q=[config.quality_percentile_filter])[0]
+
+        drop(column('TRACK_MEAN_QUALITY').to_numpy()
+             < quality_percentile_threshold, 'QUALITY_PERCENTILE')
+    check(backup, ['Error! No items exceeded quality thresholding.'])
+
+    # Do STD filtering if needed
+    backup = kept
+    if std_drop_flags is not None:
+        # Collect STD's and means for the requested items
+        std_values: List[float] = [
+            std(column(col_name)[kept]) if std_drop_flags[i] else 0.0
+            for i, col_name in enumerate(csv.columns)]
+        mean_values: List[float] = [
+            mean(column(col_name)[kept]) if std_drop_flags[i] else 0.0
+            for i, col_name in enumerate(csv.columns)]
+
+        # Every column is checked from below, so unflagged ones
+        # drop any row where they are negative
+        outliers: ndarray = zeros(len(csv), dtype=bool)
+        for i, col_name in enumerate(csv.columns):
+            values: ndarray = column(col_name).to_numpy()
+            outliers |= values < mean_values[i] - (2 * std_values[i])
+
+            # Filter anything above, but ONLY if this is control
+            if speed_threshold == 0.0 and std_drop_flags[i]:
+                outliers |= values > mean_values[i] + (2 * std_values[i])
+
+        drop(outliers, 'INTERNAL_STD_FILTERING')
+    check(backup, ['Error! No items survived brownian thresholding',
+                   'and standard deviation filtering.'])
+
+    # Do IQR filtering if needed
+    backup = kept
+    if (iqr_drop_flags is not None
+            and len(iqr_drop_flags) == len(csv.columns)):
+
+        # Calculate IQR values
+        iqr_values: List[float] = [0.0 for _ in csv.columns]
+        for i, col_name in enumerate(csv.columns):
+            if iqr_drop_flags[i]:
+                q1, q3 = percentile(column(col_name)[kept], [25, 75])
+                iqr_values[i] = q3 - q1
+
+        # Collect means. These have always been taken for every
+        # column or for none, depending on the last flag.
+        mean_values = [
+            mean(column(col_name)[kept]) if iqr_drop_flags[-1] else 0.0
+            for col_name in csv.columns]
+
+        outliers = zeros(len(csv), dtype=bool)
+        for i, col_name in enumerate(csv.columns):
+            values = column(col_name).to_numpy()
+            outliers |= values < mean_values[i] - (1.5 * iqr_values[i])
+
+            # Filter anything above, but ONLY if this is control
+            if speed_threshold == 0.0 and iqr_drop_flags[i]:
+                outliers |= values > mean_values[i] + (1.5 * iqr_values[i])
+
+        drop(outliers, 'INTERNAL_IQR_FILTERING')
+    check(backup, ['Error! No items survived brownian thresholding, STD',
+                   'filtering, and IQR filtering.'])
+
+    csv = csv[kept]
+
+    csv.to_csv(join(where, name.replace('/', '_') + '.filtered.csv'))
 
     # Compile output data from filtered inputs
     final_num_rows: int = len(csv)
@@ -524,10 +494,10 @@ def do_file(name: str,
     if output_data[5] is None:
         output_data[len(col_names) + 2] = None
     else:
-        output_data[len(col_names) + 2] = output_data[5] * conversion
+        output_data[len(col_names) + 2] = output_data[5] * config.conversion
 
     # Output percent remaining
-    if initial_num_rows != final_num_rows and not silent:
+    if initial_num_rows != final_num_rows and not config.silent:
         print((name + ':')[-20:],
               'Filtered out', initial_num_rows -
               final_num_rows, 'tracks, leaving',
@@ -535,108 +505,26 @@ def do_file(name: str,
               str(round(100 * final_num_rows / initial_num_rows, 3))
               + '% remain)')
 
-    if save_filtering_data:
-        plt.hist([float(row[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                 for row in csv.iterrows()], bins=30, alpha=0.5, color='b',
-                 label='POST')
-        plt.title('Pre V. Post Filter SLS w/ Means\n' + name)
-
-        m = mean([float(row[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                 for row in csv.iterrows()])
-        s = std([float(row[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                for row in csv.iterrows()])
-        plt.vlines([m - s, m, m + s], 0, 5, colors=['b'])
-        plt.vlines([brownian_speed_threshold], 0, 10, colors=['black'])
-
-        lgd = plt.legend(bbox_to_anchor=(1.1, 1.05))
-
-        plt.savefig(name.replace('/', '_') + str(save_num) + '.png',
-                    bbox_extra_artists=(lgd,), bbox_inches='tight')
-
-        if secondary_save_path is not None:
-            plt.savefig(secondary_save_path + '/' + name.replace('/', '_')
-                        + str(save_num) + '.png',
-                        bbox_extra_artists=(lgd,), bbox_inches='tight')
-
-        plt.close()
-
+    if config.save_filtering_data:
         dropped: pd.DataFrame = pd.DataFrame(dropped_row_indices, columns=[
                                              'CSV_TRACK_ROW_NUMBER',
                                              'MEAN_STRAIGHT_LINE_SPEED',
                                              'REASON'])
-        dropped.to_csv(name.replace('/', '_') + str(save_num) + '.csv')
-        dropped.to_csv(str(save_num) + '_dropped_tracks' + '.csv')
-
-    if do_filter_scatter_plots:
-        # Build an additional array w/ all the data, dropped or not.
-        # Save the SLS for each track, as well as whether or not
-        # it was dropped. Later we will assemble this into a
-        # scatter plot
-
-        # Build into a py array
-        data: List[List[Any]] = []
-
-        for item in csv.iterrows():
-            data.append([item[0], item[1]['MEAN_STRAIGHT_LINE_SPEED'], False])
-
-        for item in dropped_row_indices:
-            data.append([item[0], item[1], True])
-
-        # Append to global data for filter scatter plots
-        filter_scatter_plots_data.append(data[:])
-
-        plt.clf()
-
-        plt.figure(figsize=(6, 4), dpi=500)
-        plt.title(name[-60:])
-        plt.xlabel('Track Original Index')
-        plt.ylabel('Mean Straight Line Speed')
-
-        # Brownian line
-        if brownian_speed_threshold != 0.0:
-            plt.plot([3] + [int(item[0]) for item in csv.iterrows()],
-                     [brownian_speed_threshold] +
-                     [brownian_speed_threshold for _ in csv.iterrows()],
-                     c='black',
-                     label='Brownian Mean + ' + str(brownian_multiplier)
-                     + ' Standard Deviations')
-
-        # Brownian mean + some amount of std explicit line
-        else:
-            value: float = output_data[5] + brownian_multiplier * output_std[5]
-
-            plt.plot([3] + [int(item[0]) for item in csv.iterrows()],
-                     [value] + [value for _ in csv.iterrows()],
-                     c='black',
-                     label='Mean + ' + str(brownian_multiplier)
-                     + ' Standard Deviations')
-
-        # Kept data
-        plt.scatter([int(item[0]) for item in csv.iterrows()],
-                    [float(item[1]['MEAN_STRAIGHT_LINE_SPEED'])
-                     for item in csv.iterrows()],
-                    c='b',
-                    label='Kept')
-
-        # Lost data
-        plt.scatter([int(item[0]) for item in dropped_row_indices],
-                    [float(item[1]) for item in dropped_row_indices],
-                    c='r',
-                    label='Lost')
-
-        lgd = plt.legend(bbox_to_anchor=(1.1, 1.05), title=(
-            'Kept ' + str(csv.shape[0]) + ', Lost '
-            + str(len(dropped_row_indices))))
-
-        if secondary_save_path is not None:
-            plt.savefig(secondary_save_path + '/'
-                        + name.replace('/', '_') +
-                        str(save_num) + '_track_scatter.png')
-        plt.savefig(name.replace('/', '_')
-                    + str(save_num) + '_track_scatter.png',
-                    bbox_extra_artists=(lgd,), bbox_inches='tight')
-
-        plt.close()
+        dropped.to_csv(join(where, name.replace('/', '_') + str(number)
+                            + '.csv'))
+        dropped.to_csv(join(where, str(number) + '_dropped_tracks.csv'))
+
+    # Save the SLS for each track, as well as whether or not it
+    # was dropped and why. `main` saves these with the summary,
+    # and `render` later assembles them into scatter plots.
+    # These are returned rather than kept globally, so that files
+    # can be filtered in worker processes.
+    data: List[List[Any]] = [
+        [index, speed, False, '']
+        for index, speed in csv['MEAN_STRAIGHT_LINE_SPEED'].items()]
+
+    for dropped_row in dropped_row_indices:
+        data.append([dropped_row[0], dropped_row[1], True, dropped_row[2]])
 
     if return_label:
         label: str = ''
@@ -661,22 +549,43 @@ def do_file(name: str,
         elif '0khz' in name or 'control' in name:
             label = '0.0'
 
-        return (output_data, output_std, label)
+        return (output_data, output_std, data, label)
     else:
-        return (output_data, output_std)
+        return (output_data, output_std, data)
 
 
-def graph_column_with_bars(table: pd.DataFrame,
+def graph_column_with_bars(folder: str,
+                           label: str,
+                           table: pd.DataFrame,
                            bar_table: pd.DataFrame,
                            column_name: str,
                            bar_column_name: str,
-                           file_name: (str | None) = None,
+                           config: FilterConfig,
+                           file_name: Optional[str] = None,
                            has_control: bool = False,
-                           override_ticks: List[str] = None) -> bool:
+                           override_ticks: Optional[List[str]] = None) \
+        -> bool:
     '''
     Create a column graph with bars.
+
+    :param folder: The folder to save the graph in.
+    :param label: The cleaned name of the folder.
+    :param table: The means of each column, by frequency.
+    :param bar_table: The spread of each column, by frequency.
+    :param column_name: The column of `table` to graph.
+    :param bar_column_name: The column of `bar_table` to use as
+        error bars.
+    :param config: The settings of the run.
+    :param file_name: The name to save as. If None, the column
+        name is used.
+    :param has_control: If True, the first row is the control,
+        and is also graphed as a horizontal line.
+    :param override_ticks: The labels of the x axis, if any.
+    :returns: False if either column is missing, True otherwise.
     '''
 
+    import matplotlib.pyplot as plt
+
     if (column_name not in table.columns
             or bar_column_name not in bar_table.columns):
         return False
@@ -712,332 +621,718 @@ def graph_column_with_bars(table: pd.DataFrame,
     filter_status: str = ''
 
     # Create filter text
-    if do_speed_thresh:
+    if config.do_speed_thresh:
         filter_status += 'Speed-filtered '
-    if do_displacement_thresh:
+    if config.do_displacement_thresh:
         filter_status += 'Displacement-filtered '
-    if do_linearity_thresh:
+    if config.do_linearity_thresh:
         filter_status += 'Linearity-filtered '
-    if do_quality_percentile_filter:
+    if config.do_quality_percentile_filter:
         filter_status += 'Quality-filtered '
-    if do_quality_percentile_filter:
-        filter_status += str(quality_percentile_filter) + \
+    if config.do_quality_percentile_filter:
+        filter_status += str(config.quality_percentile_filter) + \
             '-percentile-plus '
-    if do_std_filter_flags is not None:
+    if config.do_std_filter_flags is not None:
         filter_status += '2_STD_MIN-filtered '
-    if do_iqr_filter_flags is not None:
+    if config.do_iqr_filter_flags is not None:
         filter_status += '1.5_IQR_MIN-filtered '
 
     if filter_status == '':
         filter_status = 'Unfiltered '
 
-    plt.title(name_fixer.get_cwd() + '\n' + filter_status + '\nMean '
+    plt.title(label + '\n' + filter_status + '\nMean '
               + column_name +
               'by Applied Frequency (Plus or Minus ' + bar_column_name + ')')
 
     plt.xlabel('Applied Frequency (Hertz)')
     plt.ylabel(column_name)
 
-    plt.savefig(file_name)
+    plt.savefig(folder + sep + file_name)
 
-    if secondary_save_path is not None:
-        plt.savefig(secondary_save_path + '/' +
-                    name_fixer.get_cwd() + '_' + file_name)
+    if config.secondary_save_path is not None:
+        plt.savefig(config.secondary_save_path + '/' +
+                    label + '_' + file_name)
+
+    plt.close()
 
     return True
 
 
-def main() -> int:
+def plot_filtering_histogram(folder: str,
+                             name: str,
+                             number: int,
+                             tracks: pd.DataFrame,
+                             speed_threshold: float,
+                             config: FilterConfig) -> None:
     '''
-    This is what will be executed when the script is run;
-    Everything above here is just meta stuff.
+    Render a histogram of a file's SLS before and after filtering.
+    The SLS before filtering is read from the copy which
+    `do_file` saved, so the file itself is not needed.
+
+    :param folder: The folder to save the graph in, which holds
+        the saved results.
+    :param name: The file which was filtered.
+    :param number: The number of the file within its run.
+    :param tracks: The file's rows of `all_tracks.csv`.
+    :param speed_threshold: The Brownian SLS threshold which was
+        in effect for the file.
+    :param config: The settings of the run.
     '''
 
-    global folder, brownian_speed_threshold, brownian_displacement_threshold
-    global quality_threshold, brownian_linearity_threshold
+    import matplotlib.pyplot as plt
 
-    if folder == '' or folder is None:
-        if len(sys.argv) != 1:
-            if not silent:
-                print('Changing folder from arguments...')
+    pre: List[float] = pd.read_csv(
+        folder + sep + str(number) + pre_filter_suffix,
+        index_col=0)['MEAN_STRAIGHT_LINE_SPEED'].to_list()
+    post: List[float] = tracks['MEAN_STRAIGHT_LINE_SPEED'][
+        ~tracks['WAS_FILTERED']].astype(float).to_list()
 
-            chdir(sys.argv[1])
+    plt.clf()
+    plt.hist(pre, bins=30, color='r', label='PRE')
 
-    else:
-        chdir(folder)
+    m = mean(pre)
+    s = std(pre)
+    plt.vlines([m - s, m, m + s], 0, 5, colors=['r'])
 
-    if not silent:
-        print('Getting current folder...')
+    plt.hist(post, bins=30, alpha=0.5, color='b', label='POST')
+    plt.title('Pre V. Post Filter SLS w/ Means\n' + name)
 
-    folder = getcwd()
+    m = mean(post)
+    s = std(post)
+    plt.vlines([m - s, m, m + s], 0, 5, colors=['b'])
+    plt.vlines([speed_threshold], 0, 10, colors=['black'])
 
-    if not silent:
-        print('Analyzing input data at', folder)
+    lgd = plt.legend(bbox_to_anchor=(1.1, 1.05))
 
-    # Internal string representation of the frequencies
-    names: List[str] = name_fixer.fix_names(patterns)
-    has_control: bool = names[0] is not None
+    plt.savefig(folder + sep + name.replace('/', '_') + str(number) + '.png',
+                bbox_extra_artists=(lgd,), bbox_inches='tight')
 
-    # Drop any files which do not exist
-    names = [name for name in names if name is not None]
+    if config.secondary_save_path is not None:
+        plt.savefig(config.secondary_save_path + '/' + name.replace('/', '_')
+                    + str(number) + '.png',
+                    bbox_extra_artists=(lgd,), bbox_inches='tight')
+
+    plt.close()
 
-    # Use fallback patterns if needed
-    if len(names) == 0:
-        if not silent:
-            print(
-                'Using fallback patterns; \
-                This could lead to picking up spots files instead of tracks.')
 
-        names: List[str] = name_fixer.fix_names(fallback_patterns)
-        has_control: bool = names[0] is not None
+def plot_track_scatter(folder: str,
+                       name: str,
+                       number: int,
+                       tracks: pd.DataFrame,
+                       line: float,
+                       line_label: str,
+                       config: FilterConfig) -> None:
+    '''
+    Render a scatter plot of which of a file's tracks were kept.
+
+    :param folder: The folder to save the graph in.
+    :param name: The file which was filtered.
+    :param number: The number of the file within its run.
+    :param tracks: The file's rows of `all_tracks.csv`.
+    :param line: The SLS at which to draw a horizontal line.
+    :param line_label: The legend entry for the line.
+    :param config: The settings of the run.
+    '''
 
-        # Drop any files which do not exist
-        names = [name for name in names if name is not None]
+    import matplotlib.pyplot as plt
 
-    # Exit if no names remain
-    if len(names) == 0:
-        print(folder)
-        raise RuntimeError('No files could be found.')
+    kept: pd.DataFrame = tracks[~tracks['WAS_FILTERED']]
+    lost: pd.DataFrame = tracks[tracks['WAS_FILTERED']]
 
-    # Output array for data
-    array = zeros(shape=(len(names), len(col_names) + len(extra_columns)))
-    std_array = zeros(shape=(len(names), len(col_names)))
-
-    # Analyze files
-    for i, name in enumerate(names):
-        if i == 0 and has_control:
-            start: float = time()
-
-            try:
-                array[i], std_array[i] = do_file(folder + sep + name,
-                                                 0.0, 0.0, 0.0,
-                                                 do_std_filter_flags,
-                                                 do_iqr_filter_flags)
-            except RuntimeError:
-                print("ERROR DURING COLLECTION OF FILE",
-                      folder + sep + name)
-                array[i] = [None for i in range(len(array[i]))]
-                std_array[i] = [None for i in range(len(std_array[i]))]
-
-            end: float = time()
-
-            # Uses updated brownian standards:
-            # In order to pass the filter, it must be more than 2 std from
-            # brownian
-            brownian_speed_threshold = array[0][5] + \
-                brownian_multiplier * std_array[0][5]
-
-            brownian_displacement_threshold = array[0][0]
-            quality_threshold = array[0][3]
-            brownian_linearity_threshold = array[0][6]
-
-        else:
-            start: float = time()
-
-            array[i], std_array[i] = do_file(folder + sep + name,
-                                             brownian_displacement_threshold,
-                                             brownian_speed_threshold,
-                                             brownian_linearity_threshold,
-                                             do_std_filter_flags,
-                                             do_iqr_filter_flags)
-
-            end: float = time()
-
-            if i == 0 and do_speed_thresh_fallback:
-                brownian_speed_threshold = brownian_speed_threshold_fallback
-
-        if not silent:
-            print(name, 'took', round(end - start, 5), 'seconds.')
-
-    if not silent:
-        print('Generating output .csv file...')
+    plt.clf()
 
-    floated_names: List[str] = [
-        str(name_fixer.path_to_hz(item)) for item in names]
+    plt.figure(figsize=(6, 4), dpi=500)
+    plt.title(name[-60:])
+    plt.xlabel('Track Original Index')
+    plt.ylabel('Mean Straight Line Speed')
+
+    plt.plot([3] + kept['ORIGINAL_POSITION'].astype(int).to_list(),
+             [line for _ in range(len(kept) + 1)],
+             c='black',
+             label=line_label)
+
+    # Kept data
+    plt.scatter(kept['ORIGINAL_POSITION'].astype(int).to_list(),
+                kept['MEAN_STRAIGHT_LINE_SPEED'].astype(float).to_list(),
+                c='b',
+                label='Kept')
+
+    # Lost data
+    plt.scatter(lost['ORIGINAL_POSITION'].astype(int).to_list(),
+                lost['MEAN_STRAIGHT_LINE_SPEED'].astype(float).to_list(),
+                c='r',
+                label='Lost')
+
+    lgd = plt.legend(bbox_to_anchor=(1.1, 1.05), title=(
+        'Kept ' + str(len(kept)) + ', Lost ' + str(len(lost))))
+
+    if config.secondary_save_path is not None:
+        plt.savefig(config.secondary_save_path + '/'
+                    + name.replace('/', '_') +
+                    str(number) + '_track_scatter.png')
+    plt.savefig(folder + sep + name.replace('/', '_')
+                + str(number) + '_track_scatter.png',
+                bbox_extra_artists=(lgd,), bbox_inches='tight')
 
-    out_csv: pd.DataFrame = pd.DataFrame(array,
-                                         columns=(
-                                             col_names + extra_columns),
-                                         index=floated_names)
-    out_csv.to_csv('track_data_summary.csv')
+    plt.close()
 
-    std_csv: pd.DataFrame = pd.DataFrame(std_array,
-                                         columns=(
-                                             [name + '_STD'
-                                              for name in col_names]),
-                                         index=floated_names)
-    std_csv.to_csv('track_data_summary_stds.csv')
 
-    if secondary_save_path is not None:
-        out_csv.to_csv(secondary_save_path + '/' +
-                       name_fixer.get_cwd() + 'track_data_summary.csv')
-        std_csv.to_csv(secondary_save_path + '/' +
-                       name_fixer.get_cwd() + 'track_data_summary_stds.csv')
+def plot_summary(folder: str,
+                 label: str,
+                 out_csv: pd.DataFrame,
+                 tracks: pd.DataFrame,
+                 config: FilterConfig) -> None:
+    '''
+    Render the graphs which cover every file in a folder.
+
+    :param folder: The folder to save the graphs in.
+    :param label: The cleaned name of the folder.
+    :param out_csv: The folder's `track_data_summary.csv`,
+        indexed by frequency.
+    :param tracks: The folder's `all_tracks.csv`.
+    :param config: The settings of the run.
+    '''
+
+    import matplotlib.pyplot as plt
 
     plt.clf()
     plt.rc('font', size=6)
 
-    plt.title(name_fixer.get_cwd() +
-              '\nInitial (Top) Vs. Final (Bottom) Track Counts')
+    plt.title(label + '\nInitial (Top) Vs. Final (Bottom) Track Counts')
 
     plt.plot(out_csv['INITIAL_TRACK_COUNT'])
     plt.plot(out_csv['FILTERED_TRACK_COUNT'])
 
-    plt.savefig('TRACK_COUNT.png')
-    if secondary_save_path is not None:
-        plt.savefig(secondary_save_path + '/TRACK_COUNT.png')
+    plt.savefig(folder + sep + 'TRACK_COUNT.png')
+    if config.secondary_save_path is not None:
+        plt.savefig(config.secondary_save_path + '/TRACK_COUNT.png')
 
     plt.close()
 
-    if do_filter_scatter_plots:
-        everything_labels: List[str] = [
-            'FREQUENCY', 'ORIGINAL_POSITION', 'MEAN_STRAIGHT_LINE_SPEED',
-            'WAS_FILTERED']
-        everything = []
-
-        only_kept_x = []
-        only_kept_y = []
-
-        only_lost_x = []
-        only_lost_y = []
+    if not config.do_filter_scatter_plots:
+        return
 
-        for i, freq in enumerate(filter_scatter_plots_data):
-            for item in freq:
-                # item is a single track's info
-                # = (name, sls, was_filtered)
+    kept: pd.DataFrame = tracks[~tracks['WAS_FILTERED']]
+    lost: pd.DataFrame = tracks[tracks['WAS_FILTERED']]
 
-                if not item[2]:
-                    only_kept_x.append(floated_names[i])
-                    only_kept_y.append(float(item[1]))
-                else:
-                    only_lost_x.append(floated_names[i])
-                    only_lost_y.append(float(item[1]))
+    only_kept_x: List[str] = kept['FREQUENCY'].to_list()
+    only_kept_y: List[float] = \
+        kept['MEAN_STRAIGHT_LINE_SPEED'].astype(float).to_list()
 
-                everything.append(
-                    [floated_names[i], item[0], item[1], item[2]])
+    only_lost_x: List[str] = lost['FREQUENCY'].to_list()
+    only_lost_y: List[float] = \
+        lost['MEAN_STRAIGHT_LINE_SPEED'].astype(float).to_list()
 
-        # Save as csv
+    floated_names: List[str] = []
+    for item in out_csv.index:
+        if item not in floated_names:
+            floated_names.append(item)
 
-        # Sort data such that its primary sort in frequency, and secondary is
-        # track number. This is just aesthetic
-        everything.sort(key=lambda i: float(i[0]) * 1000 + float(i[1]))
+    floated_names.sort(key=float)
 
-        csv: pd.DataFrame = pd.DataFrame(everything, columns=everything_labels)
-        if secondary_save_path is not None:
-            csv.to_csv(secondary_save_path + '/all_tracks.csv')
-        csv.to_csv('all_tracks.csv')
-
-        temp: List[str] = []
-        for item in floated_names:
-            if item not in temp:
-                temp.append(item)
-        floated_names = temp[:]
+    # Create actual scatter plot
+    plt.clf()
 
-        del temp
+    plt.figure(figsize=(6, 4), dpi=400)
+
+    plt.xticks(ticks=[i for i in range(len(floated_names))],
+               labels=[i for i in floated_names],
+               rotation=45)
+
+    values: List[Tuple[Any, float]] = sorted(
+        out_csv['MEAN_STRAIGHT_LINE_SPEED'].items(),
+        key=lambda p: float(p[0]))
+
+    plt.plot([value[0] for value in values], [value[1]
+             for value in values], label='Post-Filter Mean', alpha=0.5)
+
+    plt.scatter(only_lost_x + only_kept_x,
+                only_lost_y + only_kept_y,
+                marker='.',
+                c='r',
+                sizes=[5 for _ in only_lost_x + only_kept_x],
+                alpha=0.5,
+                label='Original')
+
+    plt.scatter(only_kept_x,
+                only_kept_y,
+                marker='^',
+                c='b',
+                sizes=[5 for _ in only_lost_x + only_kept_x],
+                alpha=0.5,
+                label='Post-Filter')
+
+    plt.title(
+        'Straight Line Speed By Applied Frequency\nRed = Original,'
+        + 'Blue = Kept')
+    plt.xlabel('Applied Frequency (Hz)')
+    plt.ylabel('Mean Straight Line Speed (Pixels / Frame)')
+
+    plt.legend(bbox_to_anchor=(1.1, 1.05), title=(
+        'Kept ' + str(len(only_kept_x)) + ', Lost ' + str(
+            len(only_lost_x))))
+
+    if config.secondary_save_path is not None:
+        plt.savefig(config.secondary_save_path + '/' +
+                    label + '_filter_scatter.png')
+    plt.savefig(folder + sep + label + '_filter_scatter.png')
 
-        floated_names.sort(key=float)
+    plt.close()
 
-        # Create actual scatter plot
+    if config.do_extra_filter_scatter_plots:
+        # Other one
         plt.clf()
 
         plt.figure(figsize=(6, 4), dpi=400)
 
-        plt.xticks(ticks=[i for i in range(len(floated_names))],
-                   labels=[i for i in floated_names],
-                   rotation=45)
+        plt.scatter(only_kept_x, only_kept_y, c=[
+                    'b' for _ in only_kept_y], sizes=[
+                        5 for _ in only_kept_x])
 
-        values: List[Tuple[float, float]] = []
-        for row in out_csv.iterrows():
-            values.append((row[0], row[1]['MEAN_STRAIGHT_LINE_SPEED']))
+        plt.title(
+            'Post-Filter Straight Line Speed By Applied Frequency\n\
+                (Only tracks which WERE included in the final'
+            + 'dataset appear here)')
+        plt.xlabel('Applied Frequency (Hz)')
+        plt.ylabel('Mean Straight Line Speed (Pixels / Frame)')
 
-        values.sort(key=lambda p: float(p[0]))
+        if config.secondary_save_path is not None:
+            plt.savefig(config.secondary_save_path + '/' +
+                        label + '_filtered_scatter.png')
+        plt.savefig(folder + sep + label + '_filtered_scatter.png')
 
-        plt.plot([value[0] for value in values], [value[1]
-                 for value in values], label='Post-Filter Mean', alpha=0.5)
+        plt.close()
+
+        # Other other one
+        plt.clf()
 
-        plt.scatter(only_lost_x + only_kept_x,
-                    only_lost_y + only_kept_y,
-                    marker='.',
-                    c='r',
-                    sizes=[5 for _ in only_lost_x + only_kept_x],
-                    alpha=0.5,
-                    label='Original')
+        plt.figure(figsize=(6, 4), dpi=400)
 
-        plt.scatter(only_kept_x,
-                    only_kept_y,
-                    marker='^',
-                    c='b',
-                    sizes=[5 for _ in only_lost_x + only_kept_x],
-                    alpha=0.5,
-                    label='Post-Filter')
+        plt.scatter(only_lost_x, only_lost_y, c=[
+                    'b' for _ in only_lost_y], sizes=[
+                        5 for _ in only_lost_x])
 
         plt.title(
-            'Straight Line Speed By Applied Frequency\nRed = Original,'
-            + 'Blue = Kept')
+            'Filtered Out Straight Line Speed By Applied Frequency\n\
+                (Only tracks which were NOT included in the final dataset'
+            + 'appear here)')
         plt.xlabel('Applied Frequency (Hz)')
         plt.ylabel('Mean Straight Line Speed (Pixels / Frame)')
 
-        plt.legend(bbox_to_anchor=(1.1, 1.05), title=(
-            'Kept ' + str(len(only_kept_x)) + ', Lost ' + str(
-                len(only_lost_x))))
-
-        if secondary_save_path is not None:
-            plt.savefig(secondary_save_path + '/' +
-                        name_fixer.get_cwd() + '_filter_scatter.png')
-        plt.savefig(name_fixer.get_cwd() + '_filter_scatter.png')
+        if config.secondary_save_path is not None:
+            plt.savefig(config.secondary_save_path + '/' +
+                        label + '_lost_scatter.png')
+        plt.savefig(folder + sep + label + '_lost_scatter.png')
 
         plt.close()
 
-        if do_extra_filter_scatter_plots:
-            # Other one
-            plt.clf()
 
-            plt.figure(figsize=(6, 4), dpi=400)
+def render(folder: str, config: Optional[FilterConfig] = None) -> None:
+    '''
+    Render the graphs of a folder which has already been
+    filtered, from the results saved by `main`. This is the only
+    part of this file which uses matplotlib.
 
-            plt.scatter(only_kept_x, only_kept_y, c=[
-                        'b' for _ in only_kept_y], sizes=[
-                            5 for _ in only_kept_x])
+    :param folder: The filtered folder.
+    :param config: The settings of the run. If None, the settings
+        above are used.
+    '''
 
-            plt.title(
-                'Post-Filter Straight Line Speed By Applied Frequency\n\
-                (Only tracks which WERE included in the final'
-                + 'dataset appear here)')
-            plt.xlabel('Applied Frequency (Hz)')
-            plt.ylabel('Mean Straight Line Speed (Pixels / Frame)')
+    if config is None:
+        config = FilterConfig.from_settings()
 
-            if secondary_save_path is not None:
-                plt.savefig(secondary_save_path + '/' +
-                            name_fixer.get_cwd() + '_filtered_scatter.png')
-            plt.savefig(name_fixer.get_cwd() + '_filtered_scatter.png')
+    with open(folder + sep + results_name, encoding='utf8') as file:
+        results: Dict[str, Any] = json.load(file)
 
-            plt.close()
+    frequencies: List[str] = [entry['frequency']
+                              for entry in results['files']]
 
-            # Other other one
-            plt.clf()
+    out_csv: pd.DataFrame = pd.read_csv(
+        folder + sep + 'track_data_summary.csv', index_col=0)
+    out_csv.index = pd.Index(frequencies)
 
-            plt.figure(figsize=(6, 4), dpi=400)
+    std_csv: pd.DataFrame = pd.read_csv(
+        folder + sep + 'track_data_summary_stds.csv', index_col=0)
 
-            plt.scatter(only_lost_x, only_lost_y, c=[
-                        'b' for _ in only_lost_y], sizes=[
-                            5 for _ in only_lost_x])
+    tracks: pd.DataFrame = pd.read_csv(folder + sep + 'all_tracks.csv',
+                                       index_col=0,
+                                       dtype={'FREQUENCY': str})
 
-            plt.title(
-                'Filtered Out Straight Line Speed By Applied Frequency\n\
-                (Only tracks which were NOT included in the final dataset'
-                + 'appear here)')
-            plt.xlabel('Applied Frequency (Hz)')
-            plt.ylabel('Mean Straight Line Speed (Pixels / Frame)')
+    for i, entry in enumerate(results['files']):
+        file_tracks: pd.DataFrame = tracks[tracks['FILE'] == entry['name']]
+
+        if config.save_filtering_data:
+            plot_filtering_histogram(folder, entry['name'], entry['number'],
+                                     file_tracks, entry['speed_threshold'],
+                                     config)
+
+        if config.do_filter_scatter_plots:
+            # Brownian line
+            if entry['speed_threshold'] != 0.0:
+                plot_track_scatter(folder, entry['name'], entry['number'],
+                                   file_tracks, entry['speed_threshold'],
+                                   'Brownian Mean + '
+                                   + str(results['brownian_multiplier'])
+                                   + ' Standard Deviations', config)
+
+            # Brownian mean + some amount of std explicit line
+            else:
+                value: float = (
+                    out_csv['MEAN_STRAIGHT_LINE_SPEED'].iloc[i]
+                    + results['brownian_multiplier']
+                    * std_csv['MEAN_STRAIGHT_LINE_SPEED_STD'].iloc[i])
+
+                plot_track_scatter(folder, entry['name'], entry['number'],
+                                   file_tracks, value,
+                                   'Mean + '
+                                   + str(results['brownian_multiplier'])
+                                   + ' Standard Deviations', config)
+
+    plot_summary(folder, results['label'], out_csv, tracks, config)
+
+
+def run(folder: str,
+        config: Optional[FilterConfig] = None
+        ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Filter every tracks file in a folder, saving the summaries
+    (and, unless compute_only is set, the graphs) in the folder.
+    This does not change the working directory or any
+    module-level state.
+
+    :param folder: The folder to filter.
+    :param config: The settings to use. If None, the settings
+        above are used.
+    :returns: The summary and the standard deviations of the
+        folder, as saved to `track_data_summary.csv` and
+        `track_data_summary_stds.csv`.
+    '''
+
+    if config is None:
+        config = FilterConfig.from_settings()
+
+    folder = realpath(folder)
+
+    if not config.silent:
+        print('Analyzing input data at', folder)
 
-            if secondary_save_path is not None:
-                plt.savefig(secondary_save_path + '/' +
-                            name_fixer.get_cwd() + '_lost_scatter.png')
-            plt.savefig(name_fixer.get_cwd() + '_lost_scatter.png')
+    # Filtered outputs start with `_`, so are not candidates
+    candidates: List[str] = [name for name in listdir(folder)
+                             if not name.startswith('_')]
 
-            plt.close()
+    # Internal string representation of the frequencies
+    names: List[Optional[str]] = [None for _ in patterns]
+    if len(candidates) != 0:
+        names = name_fixer.fix_names(patterns, candidates)
+    has_control: bool = names[0] is not None
+
+    # Use fallback patterns if needed
+    if all(name is None for name in names) and len(candidates) != 0:
+        if not config.silent:
+            print(
+                'Using fallback patterns; \
+                This could lead to picking up spots files instead of tracks.')
+
+        names = name_fixer.fix_names(fallback_patterns, candidates)
+        has_control = names[0] is not None
+
+    # Drop any files which do not exist
+    found: List[str] = [name for name in names if name is not None]
+
+    # Exit if no names remain
+    if len(found) == 0:
+        print(folder)
+        raise RuntimeError('No files could be found.')
 
-    if not silent:
+    # Output array for data
+    array = zeros(shape=(len(found), len(col_names) + len(extra_columns)))
+    std_array = zeros(shape=(len(found), len(col_names)))
+
+    # The Brownian thresholds, once known
+    brownian_speed_threshold: float = 0.0
+    brownian_displacement_threshold: float = 0.0
+    brownian_linearity_threshold: float = 0.0
+
+    # The number of each file, the speed threshold in effect for it,
+    # and its tracks, for rendering
+    numbers: List[int] = [i + 1 for i, _ in enumerate(found)]
+    speed_thresholds: List[float] = [0.0 for _ in found]
+    tracks: List[List[List[Any]]] = [[] for _ in found]
+
+    # Analyze the first file, which the others' thresholds depend on
+    start: float = time()
+
+    if has_control:
+        try:
+            array[0], std_array[0], tracks[0] = do_file(
+                folder + sep + found[0], 0.0, 0.0, 0.0,
+                config.do_std_filter_flags, config.do_iqr_filter_flags,
+                number=1, config=config)
+        except RuntimeError:
+            print("ERROR DURING COLLECTION OF FILE",
+                  folder + sep + found[0])
+            array[0] = [None for i in range(len(array[0]))]
+            std_array[0] = [None for i in range(len(std_array[0]))]
+
+        # Uses updated brownian standards:
+        # In order to pass the filter, it must be more than 2 std from
+        # brownian
+        brownian_speed_threshold = array[0][5] + \
+            config.brownian_multiplier * std_array[0][5]
+
+        brownian_displacement_threshold = array[0][0]
+        brownian_linearity_threshold = array[0][6]
+
+    else:
+        array[0], std_array[0], tracks[0] = do_file(
+            folder + sep + found[0],
+            brownian_displacement_threshold,
+            brownian_speed_threshold,
+            brownian_linearity_threshold,
+            config.do_std_filter_flags, config.do_iqr_filter_flags,
+            number=1, config=config)
+
+        if config.do_speed_thresh_fallback:
+            brownian_speed_threshold = \
+                config.brownian_speed_threshold_fallback
+
+    end: float = time()
+
+    if not config.silent:
+        print(found[0], 'took', round(end - start, 5), 'seconds.')
+
+    # The remaining files are independent of each other
+    rest: List[int] = list(range(1, len(found)))
+    for i in rest:
+        speed_thresholds[i] = brownian_speed_threshold
+
+    per_file: List[List[Any]] = [
+        [folder + sep + found[i] for i in rest],
+        [brownian_displacement_threshold for _ in rest],
+        [brownian_speed_threshold for _ in rest],
+        [brownian_linearity_threshold for _ in rest],
+        [config.do_std_filter_flags for _ in rest],
+        [config.do_iqr_filter_flags for _ in rest],
+        [False for _ in rest],
+        [numbers[i] for i in rest],
+        [config for _ in rest]]
+
+    start = time()
+
+    if config.jobs <= 1:
+        for i, *values in zip(rest, *per_file):
+            file_start: float = time()
+            array[i], std_array[i], tracks[i] = do_file(*values)
+
+            if not config.silent:
+                print(found[i], 'took', round(time() - file_start, 5),
+                      'seconds.')
+
+    else:
+        # Results are collected in file order, regardless of which
+        # worker finishes first.
+        with ProcessPoolExecutor(max_workers=config.jobs) as pool:
+            for i, result in zip(rest, pool.map(do_file, *per_file)):
+                array[i], std_array[i], tracks[i] = result
+
+        if not config.silent:
+            print(len(rest), 'files took', round(time() - start, 5),
+                  'seconds on', config.jobs, 'workers.')
+
+    if not config.silent:
+        print('Generating output .csv file...')
+
+    label: str = name_fixer.get_cwd(folder)
+    floated_names: List[str] = [
+        str(name_fixer.path_to_hz(item)) for item in found]
+
+    out_csv: pd.DataFrame = pd.DataFrame(array,
+                                         columns=(
+                                             col_names + extra_columns),
+                                         index=floated_names)
+    out_csv.to_csv(join(folder, 'track_data_summary.csv'))
+
+    std_csv: pd.DataFrame = pd.DataFrame(std_array,
+                                         columns=(
+                                             [name + '_STD'
+                                              for name in col_names]),
+                                         index=floated_names)
+    std_csv.to_csv(join(folder, 'track_data_summary_stds.csv'))
+
+    if config.secondary_save_path is not None:
+        out_csv.to_csv(config.secondary_save_path + '/' +
+                       label + 'track_data_summary.csv')
+        std_csv.to_csv(config.secondary_save_path + '/' +
+                       label + 'track_data_summary_stds.csv')
+
+    everything_labels: List[str] = [
+        'FREQUENCY', 'ORIGINAL_POSITION', 'MEAN_STRAIGHT_LINE_SPEED',
+        'WAS_FILTERED', 'REASON', 'FILE']
+    everything: List[List[Any]] = []
+
+    for i, freq in enumerate(tracks):
+        for item in freq:
+            # item is a single track's info
+            # = (name, sls, was_filtered, reason)
+            everything.append([floated_names[i]] + item
+                              + [folder + sep + found[i]])
+
+    # Save as csv
+
+    # Sort data such that its primary sort in frequency, and secondary is
+    # track number. This is just aesthetic
+    everything.sort(key=lambda i: float(i[0]) * 1000 + float(i[1]))
+
+    csv: pd.DataFrame = pd.DataFrame(everything, columns=everything_labels)
+    if config.secondary_save_path is not None:
+        csv.to_csv(config.secondary_save_path + '/all_tracks.csv')
+    csv.to_csv(join(folder, 'all_tracks.csv'))
+
+    # Everything else `render` needs to draw the graphs later
+    results: Dict[str, Any] = {
+        'label': label,
+        'brownian_multiplier': config.brownian_multiplier,
+        'files': [{'name': folder + sep + name,
+                   'frequency': floated_names[i],
+                   'number': numbers[i],
+                   'speed_threshold': speed_thresholds[i]}
+                  for i, name in enumerate(found)]}
+
+    with open(join(folder, results_name), 'w', encoding='utf8') as file:
+        json.dump(results, file, indent=2)
+
+    if not config.compute_only:
+        render(folder, config)
+
+    if not config.silent:
         print('Done.')
 
+    return out_csv, std_csv
+
+
+def run_folder(folder: str, config: FilterConfig) -> pd.DataFrame:
+    '''
+    Filter a folder as part of a batch. Any error is caught and
+    reported, so that one bad folder never stops the others.
+
+    :param folder: The folder to filter.
+    :param config: The settings to use.
+    :returns: The folder's summary and standard deviations side
+        by side, with FOLDER and ERROR columns. If the folder
+        could not be filtered, this is a single row with the
+        error.
+    '''
+
+    try:
+        out_csv, std_csv = run(folder, config)
+    except Exception as e:
+        error: str = type(e).__name__ + (f': {e}' if str(e) else '')
+        print(f'Failed to filter {folder}: {error}')
+
+        # No frequency applies to a failed folder
+        return pd.DataFrame({'FOLDER': [realpath(folder)],
+                             'ERROR': [error]}, index=[''])
+
+    summary: pd.DataFrame = pd.concat([out_csv, std_csv], axis=1)
+    summary.insert(0, 'FOLDER', realpath(folder))
+    summary.insert(1, 'ERROR', '')
+
+    return summary
+
+
+def run_batch(folders: List[str],
+              config: Optional[FilterConfig] = None,
+              workers: int = 1,
+              summary_path: str = batch_summary_name) -> pd.DataFrame:
+    '''
+    Filter many folders in one process, or across a pool of
+    worker processes, and save a combined summary. Folders which
+    cannot be filtered are skipped, with their errors recorded
+    in the summary.
+
+    :param folders: The folders to filter.
+    :param config: The settings to use for every folder. If
+        None, the settings above are used.
+    :param workers: The number of folders to filter at once.
+        When this is greater than 1, the files within each folder
+        are filtered one at a time.
+    :param summary_path: Where to save the combined summary.
+    :returns: The combined summary, with one row per frequency
+        per folder (or one per failed folder), in the order of
+        the given folders.
+    '''
+
+    if config is None:
+        config = FilterConfig.from_settings()
+
+    summaries: List[pd.DataFrame] = []
+
+    if workers <= 1:
+        summaries = [run_folder(folder, config) for folder in folders]
+
+    else:
+        # Results are collected in folder order, regardless of which
+        # worker finishes first.
+        single: FilterConfig = replace(config, jobs=1)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(run_folder, folders,
+                                      [single for _ in folders]))
+
+    filtered: int = sum(1 for summary in summaries
+                        if (summary['ERROR'] == '').all())
+
+    combined: pd.DataFrame = pd.concat(summaries) if len(summaries) != 0 \
+        else pd.DataFrame()
+    combined.to_csv(summary_path, index_label='FREQUENCY')
+
+    print(f'Filtered {filtered} of {len(folders)} folders.')
+
+    return combined
+
+
+def main() -> int:
+    '''
+    This is what will be executed when the script is run;
+    Everything above here is just meta stuff.
+
+    Pass `--compute-only` to skip rendering graphs, or
+    `--render` to only render the graphs of a folder which has
+    already been filtered. Pass `--jobs N` to filter the files
+    after the control on N worker processes. Pass `--batch` to
+    filter every folder given as an argument, saving a combined
+    summary in the current directory; `--jobs N` then filters N
+    folders at once.
+    '''
+
+    config: FilterConfig = FilterConfig.from_settings()
+    argv: List[str] = sys.argv[1:]
+
+    if '--jobs' in argv:
+        where: int = argv.index('--jobs')
+        assert where + 1 < len(argv), 'Please provide a number of jobs.'
+        config.jobs = int(argv[where + 1])
+        argv = argv[:where] + argv[where + 2:]
+
+    arguments: List[str] = [arg for arg in argv if not arg.startswith('--')]
+
+    if '--compute-only' in argv:
+        config.compute_only = True
+
+    if '--batch' in argv:
+        run_batch(arguments, replace(config, jobs=1), config.jobs)
+        return 0
+
+    target: str = folder
+    if target == '' or target is None:
+        target = arguments[0] if len(arguments) != 0 else getcwd()
+
+    if '--render' in argv:
+        render(realpath(target), config)
+        return 0
+
+    run(target, config)
+
     return 0
 
 
@@ -9,8 +9,13 @@ index in the output is None.
 
 import re
 import os
-from typing import List, Union, Optional
+from typing import List, Match, Optional, Pattern, Union
 import sys
+from speckle.matching import PatternMatcher, matcher_for
+
+
+# A run of digits and dots, as used by `path_to_hz`
+NUMBER: Pattern[str] = re.compile(r'[0-9.]+')
 
 
 def fix_names(patterns: List[str],
@@ -30,26 +35,27 @@ def fix_names(patterns: List[str],
 
     # Initialize output array
     out: List[Union[str, None]] = [None for _ in patterns]
+    remaining: int = len(patterns)
 
-    # Iterate
-    if given_names is None or len(given_names) == 0:
-        for name in os.listdir():
-            for i, pattern in enumerate(patterns):
-                if out[i] is not None:
-                    continue
+    # All patterns are checked at once, compiling them only once
+    matcher: PatternMatcher = matcher_for(tuple(patterns))
+
+    # Names from the current directory must not start with `_`
+    from_listing: bool = given_names is None or len(given_names) == 0
+    names: List[str] = given_names if given_names else os.listdir()
 
-                if re.search(pattern,
-                             name) and name[-4:] == '.csv' and name[0] != '_':
-                    out[i] = name
+    # Iterate
+    for name in names:
+        if name[-4:] != '.csv' or (from_listing and name[0] == '_'):
+            continue
 
-    else:
-        for name in given_names:
-            for i, pattern in enumerate(patterns):
-                if out[i] is not None:
-                    continue
+        for i in matcher.matches(name):
+            if out[i] is None:
+                out[i] = name
+                remaining -= 1
 
-                if re.search(pattern, name) and name[-4:] == '.csv':
-                    out[i] = name
+        if remaining == 0:
+            break
 
     # Return results
     return out
@@ -76,16 +82,13 @@ def path_to_hz(path: str) -> float:
 
     in_khz: bool = path.find('khz') != -1
 
-    numbers: str = '0123456789.'
-    i: int = 0
+    # The first run of digits and dots
+    number: Optional[Match[str]] = NUMBER.search(path_temp)
 
-    while path_temp[0] not in numbers:
-        path_temp = path_temp[1:]
+    if number is None:
+        raise ValueError(f'No frequency found in {path}')
 
-    while path_temp[i] in numbers:
-        i += 1
-
-    output: float = float(path_temp[:i])
+    output: float = float(number[0])
 
     if in_khz:
         output *= 1000.0
@@ -165,12 +168,15 @@ def find_all_recursive(pattern: str) -> List[str]:
     return output
 
 
-def get_cwd() -> str:
+def get_cwd(folder: Optional[str] = None) -> str:
     '''
     Gets the cleaned cwd as a string
+
+    :param folder: The folder to clean instead of the cwd, if
+        any. It should be absolute, like the cwd.
     '''
 
-    out: str = os.getcwd()
+    out: str = os.getcwd() if folder is None else folder
 
     out = out.replace('/', '_')
     out = out.replace('\\', '_')
@@ -5,20 +5,42 @@ is a valid descriptor of the file (no points fall outside it,
 and it is not the case that all points fall inside one quarter
 section of it).
 
+Rather than trial-validating each file at every width, each
+file's coordinate bounds are found once and used to classify it
+as needing rescaling or not. The bounds are recorded in a
+sidecar (`.speckle_resolutions.json` in the root folder), keyed
+by each file's fingerprint, so later runs need not reparse.
+
+Pass `--jobs N` to rescale on N worker processes. Either way, a
+summary of every rescaled, skipped and failed file (with the
+reason) is printed in file order at the end.
+
+To rescale without modifying any files, pass `scale` to
+`speckle.load_frequency_file` instead.
+
 Jordan Dehmel, 2024
 jdehmel@outlook.com
 '''
 
 import os
+import io
 import sys
-from io import StringIO
-from typing import Set, Tuple, List
-import pandas as pd
+import json
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Set, Tuple, List, Optional
+import numpy as np
 import speckle as s
+from speckle import freq_file
+from speckle import speckle as sp
+from speckle.manifest import fingerprint
 
 
 validated: Set[Tuple[str, int]] = set()
 
+# The name of the sidecar file recording each file's bounds
+RESOLUTIONS_NAME: str = '.speckle_resolutions.json'
+
 
 def approx_eq(l: float, r: float) -> bool:
     '''
@@ -38,206 +60,380 @@ def approx_eq(l: float, r: float) -> bool:
     return False
 
 
-def validate_dimensions_for_data(filepath: str,
-                                 old_w: int) -> None:
-    '''
-    Asserts that the given dimensions accurately describe the
-    data. If this is not the case, throws an error.
+def load_points(filepath: str) -> Optional[s.SpeckleArrays]:
     '''
+    Loads the given speckle file into columns, in one pass.
 
-    assert old_w > 0
-
-    data_falls_outside_quartile: bool = False
+    :param filepath: The file to load.
+    :returns: The (x, y, frames, offsets) of the file, or None
+        if this is not a speckle file.
+    '''
 
-    # Load input
-    text: str = ''
+    raw: bytes = b''
     with open(filepath, 'rb') as file:
-        text = file.read().decode()
+        raw = file.read()
 
-    if 'speckle' not in text:
+    if b'speckle' not in raw:
         print(f'SKIPPING NON-SPECKLE FILE {filepath}')
-        return
+        return None
 
-    # Process
-    text = text.replace('\t', ',')
-    text = text.replace('\n', ',\n')
+    return s.parse_speckle_bytes(raw)
 
-    while ',,' in text:
-        text = text.replace(',,', ',')
 
-    # Load data
-    frame: pd.DataFrame = pd.read_csv(StringIO(text))
+def check_dimensions(x: np.ndarray, y: np.ndarray, old_w: int) -> None:
+    '''
+    Asserts that the given dimensions accurately describe the
+    given points: None fall outside of the frame, and not all
+    fall inside its top-left quarter.
 
-    is_first: bool = True
-    for row in frame.iterrows():
-        if is_first:
-            is_first = False
-            continue
+    :param x: The x coordinates of every point.
+    :param y: The y coordinates of every point.
+    :param old_w: The width of the frame.
+    '''
 
-        if 'stop speckle' in row[0][0]:
-            continue
+    assert old_w > 0
 
-        if 'start speckle' in row[0][0]:
-            continue
+    if len(x) == 0:
+        return
+
+    low: float = min(float(x.min()), float(y.min()))
+    high: float = max(float(x.max()), float(y.max()))
+
+    assert high <= old_w, 'Invalid old dimension!'
+    assert low >= 0.0, 'Invalid old dimension!'
+
+    assert high * 2.0 > old_w, 'Too large of a description!'
 
-        # cur_track.append(
-        #     float(row[0][0]),  # x
-        #     float(row[0][1]),  # y
-        #     int(row[0][2]))    # t (unused here)
 
-        x: float = float(row[0][0])
-        y: float = float(row[0][1])
+def validate_dimensions_for_data(filepath: str,
+                                 old_w: int) -> None:
+    '''
+    Asserts that the given dimensions accurately describe the
+    data. If this is not the case, throws an error.
+    '''
 
-        assert x <= old_w, 'Invalid old dimension!'
-        assert y <= old_w, 'Invalid old dimension!'
-        assert x >= 0.0, 'Invalid old dimension!'
-        assert y >= 0.0, 'Invalid old dimension!'
+    arrays: Optional[s.SpeckleArrays] = load_points(filepath)
 
-        if x * 2.0 > old_w or y * 2.0 > old_w:
-            data_falls_outside_quartile = True
+    if arrays is None:
+        return
 
-    assert data_falls_outside_quartile, \
-        'Too large of a description!'
+    check_dimensions(arrays[0], arrays[1], old_w)
 
     validated.add((filepath, old_w))
 
 
-def adjust_file(input_filepath: str,
-                output_filepath: str,
-                old_w: int,
-                new_w: int) -> None:
+def scale_points(x: np.ndarray,
+                 y: np.ndarray,
+                 old_w: int,
+                 new_w: int) -> Tuple[np.ndarray, np.ndarray]:
     '''
-    RUN VALIDATION BEFORE THIS!
+    Scales the given points from the old width to the new one,
+    checking that the result is in bounds and reversible.
+
+    :param x: The x coordinates of every point.
+    :param y: The y coordinates of every point.
+    :param old_w: The current width of the frame.
+    :param new_w: The width to scale to.
+    :returns: The scaled x and y coordinates.
     '''
 
-    output_text: str = ''
-
-    # Write the following:
-    output_text += '#speckles csv ver 1.2\n'
-    output_text += '#x(double)\ty(double)\tsize(double)\t' + \
-        'frame(int)\ttype(int)\n'
-
-    assert (input_filepath, old_w) in validated, \
-        'Cannot adjust unvalidated data'
     assert new_w > old_w
     assert new_w > 0
 
     coefficient: float = new_w / old_w
 
-    # Load input
-    text: str = ''
-    with open(input_filepath, 'rb') as file:
-        text = file.read().decode()
+    new_x: np.ndarray = x * coefficient
+    new_y: np.ndarray = y * coefficient
 
-    # Process
-    text = text.replace('\t', ',')
-    text = text.replace('\n', ',\n')
+    if len(x) != 0:
+        assert max(float(new_x.max()), float(new_y.max())) <= new_w
+        assert min(float(new_x.min()), float(new_y.min())) >= 0.0
 
-    while ',,' in text:
-        text = text.replace(',,', ',')
+        assert np.all(np.abs(new_x * (old_w / new_w) - x) < 0.0001)
+        assert np.all(np.abs(new_y * (old_w / new_w) - y) < 0.0001)
 
-    # Load data
-    frame: pd.DataFrame = pd.read_csv(StringIO(text))
+    return new_x, new_y
 
-    is_first: bool = True
-    for row in frame.iterrows():
-        if is_first:
-            is_first = False
-            continue
 
-        if 'stop speckle' in row[0][0]:
-            output_text += '#%stop speckle%\n'
-            continue
+def format_speckles(arrays: s.SpeckleArrays) -> str:
+    '''
+    Formats the given columns as the text of a speckle file.
 
-        if 'start speckle' in row[0][0]:
-            output_text += '#%start speckle%\n'
-            continue
+    :param arrays: The (x, y, frames, offsets) to write.
+    :returns: The contents of the speckle file.
+    '''
+
+    x, y, frames, offsets = arrays
+
+    lines: List[str] = ['#speckles csv ver 1.2',
+                        '#x(double)\ty(double)\tsize(double)\t'
+                        'frame(int)\ttype(int)']
+    points: List[str] = [f'{a}\t{b}\t{t}' for a, b, t in
+                         zip(x.tolist(), y.tolist(), frames.tolist())]
+
+    for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        lines.append('#%start speckle%')
+        lines += points[start:stop]
+        lines.append('#%stop speckle%')
 
-        # cur_track.append(
-        #     float(row[0][0]),  # x
-        #     float(row[0][1]),  # y
-        #     int(row[0][2]))    # t (unused here)
+    return '\n'.join(lines) + '\n'
 
-        x_old: float = float(row[0][0])
-        y_old: float = float(row[0][1])
-        t: int = int(row[0][2])
 
-        x: float = x_old * coefficient
-        y: float = y_old * coefficient
+def adjust_file(input_filepath: str,
+                output_filepath: str,
+                old_w: int,
+                new_w: int) -> None:
+    '''
+    RUN VALIDATION BEFORE THIS!
+    '''
 
-        assert x <= new_w
-        assert y <= new_w
-        assert x >= 0.0
-        assert y >= 0.0
+    assert (input_filepath, old_w) in validated, \
+        'Cannot adjust unvalidated data'
 
-        assert approx_eq(y * (old_w / new_w), y_old)
-        assert approx_eq(x * (old_w / new_w), x_old)
+    arrays: Optional[s.SpeckleArrays] = load_points(input_filepath)
+    assert arrays is not None
 
-        output_text += f'{x}\t{y}\t{t}\n'
+    x, y = scale_points(arrays[0], arrays[1], old_w, new_w)
 
     with open(output_filepath, 'w', encoding='utf-8') as file:
-        file.write(output_text)
+        file.write(format_speckles((x, y, arrays[2], arrays[3])))
+
+
+def sls_mean_std(arrays: s.SpeckleArrays) -> Tuple[float, float]:
+    '''
+    :param arrays: The (x, y, frames, offsets) of a file.
+    :returns: The SLS mean and std of the file, as
+        `load_frequency_file` would compute them.
+    '''
+
+    sls: np.ndarray = s.TrackTable(*s.threshold_durations(
+        arrays, freq_file.duration_threshold)).metrics().sls
+
+    return float(np.mean(sls)), float(np.std(sls))
 
 
 def validate_and_adjust_file(inp_fp: str,
                              out_fp: str,
                              inp_w: int,
-                             out_w: int) -> None:
+                             out_w: int) -> bool:
     '''
     Validates the input data, adjusts it to the output filepath,
-    then validates the output dataTuple. If any of these steps
-    fail, an assertion error will be thrown.
+    then validates the output data. If any of these steps
+    fail, an assertion error will be thrown. The file is only
+    parsed once: All checks are done on the parsed columns.
+
+    :returns: True if the file was rescaled, False if it was
+        skipped.
     '''
 
     print(f'Rescaling {inp_fp}')
 
+    arrays: Optional[s.SpeckleArrays] = load_points(inp_fp)
+    if arrays is None:
+        return False
+
+    x, y, frames, offsets = arrays
+
     try:
-        validate_dimensions_for_data(inp_fp, out_w)
+        check_dimensions(x, y, out_w)
         print(f'SKIPPING FILE {inp_fp}, as it is already at',
               f'{out_w}p')
-        return
+        return False
     except AssertionError:
         pass
 
     # Ensure good data going in
-    validate_dimensions_for_data(inp_fp, inp_w)
-    before_tracks: s.FreqFile = \
-        s.load_frequency_file(inp_fp, 'speckles')
+    check_dimensions(x, y, inp_w)
+    validated.add((inp_fp, inp_w))
 
     # Adjust the file
-    adjust_file(inp_fp, out_fp, inp_w, out_w)
+    new_x, new_y = scale_points(x, y, inp_w, out_w)
+    adjusted: s.SpeckleArrays = (new_x, new_y, frames, offsets)
 
-    # Ensure the output was good
-    validate_dimensions_for_data(out_fp, out_w)
-    after_tracks: s.FreqFile = \
-        s.load_frequency_file(out_fp, 'speckles')
+    # Ensure the output is good
+    check_dimensions(new_x, new_y, out_w)
 
     # Assert scaling factors affected tracks in the correct way
-    assert approx_eq(before_tracks.sls_mean()
-                     * (out_w / inp_w), after_tracks.sls_mean())
-    assert approx_eq(before_tracks.sls_std()
-                     * (out_w / inp_w), after_tracks.sls_std())
+    before_mean, before_std = sls_mean_std(arrays)
+    after_mean, after_std = sls_mean_std(adjusted)
+
+    assert approx_eq(before_mean * (out_w / inp_w), after_mean)
+    assert approx_eq(before_std * (out_w / inp_w), after_std)
+
+    with open(out_fp, 'w', encoding='utf-8') as file:
+        file.write(format_speckles(adjusted))
+
+    validated.add((out_fp, out_w))
 
     # Update user
     print(f'Rescaled from {inp_fp} at {inp_w}p to',
           f'{out_fp} at {out_w}p')
 
+    return True
+
+
+def load_resolutions(folder: str) -> Dict[str, Dict[str, Any]]:
+    '''
+    :param folder: The root folder being rescaled.
+    :returns: The recorded bounds of each file, or nothing if
+        no sidecar exists.
+    '''
+
+    try:
+        with open(os.path.join(folder, RESOLUTIONS_NAME),
+                  encoding='utf8') as file:
+            entries: Dict[str, Dict[str, Any]] = json.load(file)
+            return entries
+    except (OSError, ValueError):
+        return {}
+
+
+def save_resolutions(folder: str,
+                     entries: Dict[str, Dict[str, Any]]) -> None:
+    '''
+    Save the recorded bounds of each file.
+
+    :param folder: The root folder being rescaled.
+    :param entries: The bounds to save.
+    '''
+
+    with open(os.path.join(folder, RESOLUTIONS_NAME), 'w',
+              encoding='utf8') as file:
+        json.dump(entries, file, indent=1, sort_keys=True)
+
+
+def record_bounds(filepath: str,
+                  bounds: Optional[Tuple[float, float]],
+                  known: Dict[str, Dict[str, Any]]) -> None:
+    '''
+    Records the bounds of the file as it currently is.
+
+    :param filepath: The speckle file.
+    :param bounds: Its (lowest, highest) coordinates, or None
+        if it has no points or is not a speckle file.
+    :param known: The recorded bounds to update.
+    '''
+
+    known[os.path.realpath(filepath)] = {
+        'fingerprint': fingerprint(filepath),
+        'bounds': list(bounds) if bounds is not None else None}
+
+
+def coordinate_bounds(filepath: str,
+                      known: Dict[str, Dict[str, Any]]) \
+        -> Optional[Tuple[float, float]]:
+    '''
+    Finds the lowest and highest coordinates in the given file,
+    from the recorded bounds if the file has not changed since.
+
+    :param filepath: The speckle file.
+    :param known: The recorded bounds, which are updated.
+    :returns: The (lowest, highest) coordinate, or None if it
+        has no points or is not a speckle file.
+    '''
+
+    entry: Optional[Dict[str, Any]] = known.get(os.path.realpath(filepath))
+
+    if entry is not None and entry['fingerprint'] == fingerprint(filepath):
+        return tuple(entry['bounds']) if entry['bounds'] else None
+
+    bounds: Optional[Tuple[float, float]] = None
+    arrays: Optional[s.SpeckleArrays] = load_points(filepath)
+
+    if arrays is not None and len(arrays[0]) != 0:
+        x, y = arrays[0], arrays[1]
+        bounds = (min(float(x.min()), float(y.min())),
+                  max(float(x.max()), float(y.max())))
+
+    record_bounds(filepath, bounds, known)
+    return bounds
+
+
+def fits_width(bounds: Tuple[float, float], w: int) -> bool:
+    '''
+    The same condition as `check_dimensions`, from precomputed
+    bounds.
+
+    :param bounds: The (lowest, highest) coordinate of a file.
+    :param w: The frame width to check.
+    :returns: True iff the file is described by the width.
+    '''
+
+    low, high = bounds
+    return low >= 0.0 and high <= w and high * 2.0 > w
+
+
+def classify(bounds: Optional[Tuple[float, float]],
+             inp_w: int,
+             out_w: int) -> str:
+    '''
+    :param bounds: The (lowest, highest) coordinate of a file.
+    :param inp_w: The width of un-rescaled files.
+    :param out_w: The width of rescaled files.
+    :returns: 'rescale' if the file is at the input width,
+        'done' if it is at the output width, 'empty' if it has
+        no points, or 'invalid' otherwise.
+    '''
+
+    if bounds is None:
+        return 'empty'
+    if fits_width(bounds, out_w):
+        return 'done'
+    if fits_width(bounds, inp_w):
+        return 'rescale'
+    return 'invalid'
+
+
+def rescale_file(inp_fp: str, inp_w: int, out_w: int) -> Tuple[str, str]:
+    '''
+    Rescales a single file in place. This is at module level so
+    that it can be sent to worker processes. Anything the file
+    would print is captured rather than printed, so that output
+    from several workers does not interleave.
+
+    :param inp_fp: The speckle file to rescale.
+    :param inp_w: The width of un-rescaled files.
+    :param out_w: The width of rescaled files.
+    :returns: The outcome ('rescaled', 'skipped' or 'failed'),
+        and a reason or log of what was done.
+    '''
+
+    log: io.StringIO = io.StringIO()
+
+    try:
+        with contextlib.redirect_stdout(log):
+            rescaled: bool = validate_and_adjust_file(inp_fp, inp_fp,
+                                                      inp_w, out_w)
+
+    except AssertionError as e:
+        return 'failed', str(e) or 'Rescaled data did not validate'
+
+    return ('rescaled' if rescaled else 'skipped'), log.getvalue().strip()
+
 
 def main(argv: List[str]) -> int:
     '''
     Main function.
     '''
 
-    print('Speckle rescalar. This may take a very long time, '
-          'due to the extensive validation it does. This takes',
+    print('Speckle rescalar. This validates every file before',
+          'and after rescaling. This takes',
           'either 1 command line argument (the folder) or 3',
           '(the folder, the input pixel width, and the output',
-          'pixel width).\n')
+          'pixel width). Add `--jobs N` to rescale on N worker',
+          'processes.\n')
 
-    inp_w: int = 256
-    out_w: int = 1192
+    inp_w: int = sp.processed_w
+    out_w: int = sp.original_w
+    jobs: int = 1
 
     # Load from args
+    if '--jobs' in argv:
+        where: int = argv.index('--jobs')
+        assert where + 1 < len(argv), 'Please provide a number of jobs.'
+        jobs = int(argv[where + 1])
+        argv = argv[:where] + argv[where + 2:]
+
     assert len(argv) in (2, 4), \
         'Please provide 1 or 3 arguments.'
     folder: str = argv[1]
@@ -252,41 +448,78 @@ def main(argv: List[str]) -> int:
     assert input('Is this okay (if so, type "YES, DO IT"): ') \
         == 'YES, DO IT', 'Aborting...'
 
-    count: int = 0
+    # Discover all files up front, in a deterministic order
+    print(f'Operating on folder {folder}...')
+
+    names: List[str] = []
+    s.for_each_file(names.append, folder, r'.*speckle.*\.csv$')
+    names.sort()
+
+    known: Dict[str, Dict[str, Any]] = load_resolutions(folder)
+    outcomes: Dict[str, Tuple[str, str]] = {}
+
+    # Classify each file from its bounds, without validating
+    stale: Dict[str, Tuple[float, float]] = {}
+    for name in names:
+        bounds: Optional[Tuple[float, float]] = \
+            coordinate_bounds(name, known)
+        kind: str = classify(bounds, inp_w, out_w)
 
-    def rescale_wrapper(inp_fp: str) -> None:
+        if kind == 'rescale' and bounds is not None:
+            stale[name] = bounds
+        else:
+            outcomes[name] = ('skipped', kind)
+
+    def report(name: str, outcome: Tuple[str, str]) -> None:
         '''
-        Rescale the given file
+        Record the outcome of a file, and the bounds of the file
+        as it is now. These follow from its bounds before, since
+        scaling by a positive coefficient preserves the extremes
+        (as in `scale_points`), so the file is not reparsed.
         '''
 
-        nonlocal count
+        outcomes[name] = outcome
+        low, high = stale[name]
 
-        # Recurse if this is a directory
-        if os.path.isdir(inp_fp):
-            s.for_each_file(rescale_wrapper, inp_fp)
-            return
+        if outcome[0] == 'rescaled':
+            coefficient: float = out_w / inp_w
+            low, high = low * coefficient, high * coefficient
 
-        # Ignore non-csv files
-        if inp_fp[-4:] != '.csv':
-            return
+        record_bounds(name, (low, high), known)
 
-        if 'speckle' not in inp_fp:
-            return
+    try:
+        if jobs <= 1:
+            for name in stale:
+                report(name, rescale_file(name, inp_w, out_w))
+
+        else:
+            # Results are reported in submission order,
+            # regardless of which worker finishes first.
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for name, outcome in zip(stale, pool.map(
+                        rescale_file, list(stale),
+                        [inp_w] * len(stale), [out_w] * len(stale))):
+                    report(name, outcome)
+
+    finally:
+        save_resolutions(folder, known)
+
+    # Summarize, in file order
+    totals: Dict[str, int] = {'rescaled': 0, 'skipped': 0, 'failed': 0}
+    for name in names:
+        if name not in outcomes:
+            continue
 
-        # Otherwise, adjust this file
-        try:
-            validate_and_adjust_file(inp_fp,
-                                     inp_fp,
-                                     inp_w,
-                                     out_w)
-            count += 1
+        status, reason = outcomes[name]
+        totals[status] += 1
 
-        except AssertionError:
-            pass
+        if status == 'rescaled':
+            print(f'RESCALED {name}')
+        else:
+            print(f'{status.upper()} {name}: {reason}')
 
-    print(f'Operating on folder {folder}...')
-    s.for_each_file(rescale_wrapper, folder)
-    print(f'Reformatted {count} speckle files.')
+    print(f'Reformatted {totals["rescaled"]} speckle files',
+          f'({totals["skipped"]} skipped, {totals["failed"]} failed).')
 
     return 0
 
@@ -10,3 +10,5 @@ jdehmel@outlook.com
 
 from .speckle import *
 from .freq_file import *
+from .parsing import *
+from .track_table import *
@@ -0,0 +1,277 @@
+'''
+A persistent, on-disk cache of parsed speckle and tracks files.
+Parsed columns are stored as `.npz` archives in `cache_folder`,
+keyed by the real path of the source file. Each archive records
+the size and modification time (and optionally a hash of the
+contents) of the file it was parsed from, and is ignored and
+rebuilt whenever these no longer match.
+
+Set `use_cache` to False to always parse from scratch, or
+`hash_contents` to True to also detect changes which preserve
+the size and modification time.
+
+The cache is kept under `cache_limit` bytes by evicting the
+least recently used archives whenever one is written. `prune`
+also removes archives whose source files no longer exist.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+import os
+import hashlib
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from speckle.parsing import SpeckleArrays, parse_speckle_file, \
+    parse_tracks_file
+
+
+# Where cached archives are stored. Can be overridden by the
+# SPECKLE_CACHE environment variable.
+cache_folder: str = os.environ.get(
+    'SPECKLE_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'speckle'))
+
+# If False, the cache is neither read nor written
+use_cache: bool = True
+
+# The most bytes the cache may take up, or None for no limit
+cache_limit: Optional[int] = 1 << 30
+
+# If True, the contents of each file are hashed as part of its
+# fingerprint. This is slower, but catches edits which do not
+# change the size or modification time.
+hash_contents: bool = False
+
+# Increment this whenever the format of cached data changes
+CACHE_VERSION: int = 2
+
+# The names under which speckle arrays are stored
+SPECKLE_KEYS: Tuple[str, ...] = ('x', 'y', 'frames', 'offsets')
+
+# The name under which the track count of a tracks file is stored
+TRACKS_COUNT_KEY: str = '_count'
+
+# The name under which the fingerprint is stored
+FINGERPRINT_KEY: str = '_fingerprint'
+
+# The name under which the real path of the source is stored
+SOURCE_KEY: str = '_source'
+
+
+def fingerprint(path: str, kind: str) -> str:
+    '''
+    Computes a fingerprint of the given file, which changes
+    whenever the file does.
+
+    :param path: The file to fingerprint.
+    :param kind: What the file is being parsed as.
+    :returns: A string identifying the current file contents.
+    '''
+
+    info: os.stat_result = os.stat(path)
+    out: str = f'{CACHE_VERSION}:{kind}:{info.st_size}:{info.st_mtime_ns}'
+
+    if hash_contents:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        out += ':' + digest.hexdigest()
+
+    return out
+
+
+def cache_path(path: str, kind: str) -> str:
+    '''
+    :param path: The source file.
+    :param kind: What the file is being parsed as.
+    :returns: Where the cached archive for this file lives.
+    '''
+
+    key: str = hashlib.sha1(
+        (kind + ':' + os.path.realpath(path)).encode()).hexdigest()
+
+    return os.path.join(cache_folder, key + '.npz')
+
+
+def cached(path: str,
+           kind: str,
+           parse: Callable[[str], Dict[str, np.ndarray]]) \
+        -> Dict[str, np.ndarray]:
+    '''
+    Returns the parsed arrays for the given file, from the cache
+    if possible. Otherwise, parses it and saves the result.
+    Failures to read or write the cache are never fatal.
+
+    :param path: The source file.
+    :param kind: What the file is being parsed as.
+    :param parse: Parses the file into named arrays.
+    :returns: The parsed arrays.
+    '''
+
+    if not use_cache:
+        return parse(path)
+
+    current: str = fingerprint(path, kind)
+    where: str = cache_path(path, kind)
+
+    # Try to load from the cache
+    found: Optional[Dict[str, np.ndarray]] = None
+    try:
+        with np.load(where, allow_pickle=False) as archive:
+            if str(archive[FINGERPRINT_KEY]) == current:
+                found = {name: archive[name] for name in archive.files
+                         if name not in (FINGERPRINT_KEY, SOURCE_KEY)}
+
+        # Mark it as recently used, for eviction
+        if found is not None:
+            os.utime(where)
+            return found
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        pass
+
+    out: Dict[str, np.ndarray] = parse(path)
+
+    # Save atomically, so concurrent runs never see partial files
+    tmp: Optional[str] = None
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_folder, suffix='.tmp')
+        contents: Dict[str, Any] = {
+            **out, FINGERPRINT_KEY: np.array(current),
+            SOURCE_KEY: np.array(os.path.realpath(path))}
+        with os.fdopen(fd, 'wb') as file:
+            np.savez(file, **contents)
+        os.replace(tmp, where)
+        tmp = None
+
+        if cache_limit is not None:
+            evict(cache_limit)
+    except OSError:
+        pass
+    finally:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+    return out
+
+
+def evict(limit: int) -> int:
+    '''
+    Removes the least recently used archives until the cache
+    takes up at most the given number of bytes.
+
+    :param limit: The most bytes to keep.
+    :returns: The number of archives removed.
+    '''
+
+    entries: List[Tuple[float, int, str]] = []
+
+    with os.scandir(cache_folder) as found:
+        for entry in found:
+            if entry.name.endswith('.npz'):
+                info: os.stat_result = entry.stat()
+                entries.append((info.st_mtime, info.st_size, entry.path))
+
+    total: int = sum(size for _, size, _ in entries)
+    removed: int = 0
+
+    for _, size, where in sorted(entries):
+        if total <= limit:
+            break
+
+        try:
+            os.remove(where)
+        except OSError:
+            continue
+
+        total -= size
+        removed += 1
+
+    return removed
+
+
+def prune(limit: Optional[int] = None) -> int:
+    '''
+    Removes every archive whose source file no longer exists,
+    or which cannot be read or is of an old version, and then
+    evicts archives down to the given size.
+
+    :param limit: The most bytes to keep. If None,
+        `cache_limit` is used.
+    :returns: The number of archives removed.
+    '''
+
+    if not os.path.isdir(cache_folder):
+        return 0
+
+    removed: int = 0
+
+    with os.scandir(cache_folder) as found:
+        names: List[str] = [entry.path for entry in found
+                            if entry.name.endswith('.npz')]
+
+    for where in names:
+        try:
+            with np.load(where, allow_pickle=False) as archive:
+                source: str = str(archive[SOURCE_KEY])
+                version: str = str(archive[FINGERPRINT_KEY]).split(':')[0]
+
+            stale: bool = version != str(CACHE_VERSION) \
+                or not os.path.exists(source)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            stale = True
+
+        if stale:
+            try:
+                os.remove(where)
+                removed += 1
+            except OSError:
+                pass
+
+    if limit is None:
+        limit = cache_limit
+    if limit is not None:
+        removed += evict(limit)
+
+    return removed
+
+
+def load_speckle_arrays(path: str) -> SpeckleArrays:
+    '''
+    Cached version of `parse_speckle_file`. Duration
+    thresholding is not applied, so the cache is valid for any
+    threshold.
+
+    :param path: The speckle file to load.
+    :returns: A 4-tuple of (x, y, frames, offsets).
+    '''
+
+    def parse(where: str) -> Dict[str, np.ndarray]:
+        return dict(zip(SPECKLE_KEYS, parse_speckle_file(where)))
+
+    arrays: Dict[str, np.ndarray] = cached(path, 'speckles', parse)
+
+    return (arrays['x'], arrays['y'], arrays['frames'], arrays['offsets'])
+
+
+def load_tracks_columns(path: str) -> Tuple[int, Dict[str, np.ndarray]]:
+    '''
+    Cached version of `parse_tracks_file`.
+
+    :param path: The tracks file to load.
+    :returns: The number of tracks, and the present columns.
+    '''
+
+    def parse(where: str) -> Dict[str, np.ndarray]:
+        count, columns = parse_tracks_file(where)
+        return {TRACKS_COUNT_KEY: np.array(count), **columns}
+
+    columns: Dict[str, np.ndarray] = cached(path, 'tracks', parse)
+    count: int = int(columns.pop(TRACKS_COUNT_KEY))
+
+    return count, columns
@@ -0,0 +1,327 @@
+'''
+A catalog of the files in an experiment folder. The folder is
+walked once, and every file's path is classified by combined
+RegExes into its chamber height, voltage, frequency,
+replicate index and kind (speckles, tracks, filtered or avi).
+Scripts can then query the catalog instead of re-walking the
+folder once per pattern.
+
+For instance, `x/9010/8v/t0.5khz2_tracks.csv` has height
+'9010', voltage 8.0, frequency 500.0 (in Hz), replicate 2 and
+kind 'tracks'. Control files have frequency 0.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+import os
+import re
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, \
+    Pattern, Tuple, Union
+import pandas as pd
+from speckle.speckle import walk
+from speckle.matching import PatternMatcher
+
+
+# The set of all possible chamber heights, as (pattern, label).
+# A file should match only one: If it matches several, the
+# first in this list is used. Labels sort in this order.
+HEIGHTS: List[Tuple[str, str]] = [
+    (r'8940', '8940'), (r'8960', '8960'), (r'8965', '8965'),
+    (r'8980', '8980'), (r'8985', '8985'), (r'8990', '8990'),
+    (r'9010', '9010'), (r'9015', '9015'), (r'9035', '9035'),
+    (r'9040', '9040'), (r'9060', '9060'), (r'9080', '9080'),
+    (r'9090', '9090'), (r'9115', '9115'), (r'9140', '9140'),
+    (r'9180', '9180'), (r'9197', '9197'), (r'9205', '9205'),
+    (r'9230', '9230'), (r'9240', '9240'), (r'9255', '9255'),
+    (r'9265', '9265'), (r'9280', '9280'), (r'9290', '9290'),
+    (r'9305', '9305'), (r'9315', '9315'), (r'9340', '9340'),
+    (r'top-195', 'top-195'), (r'top-165', 'top-165'),
+    (r'top-135', 'top-135'), (r'top-100', 'top-100'),
+    (r'top-97', 'top-97'), (r'top-75', 'top-75'), (r'top-50', 'top-50'),
+    (r'top-25', 'top-25'), (r'top(?!-)', 'top'), (r'bot(?!\+)', 'bot'),
+    (r'bot\+25', 'bot+25'), (r'bot\+50', 'bot+50'),
+    (r'bot\+70', 'bot+70'), (r'bot\+75', 'bot+75'),
+    (r'bot\+100', 'bot+100'), (r'bot\+135', 'bot+135'),
+    (r'bot\+165', 'bot+165'), (r'bot\+190', 'bot+190'),
+    (r'bot\+195', 'bot+195'), (r'bot\+210', 'bot+210')]
+
+# A voltage, such as `8v`, `12V` or `5_v`
+VOLTAGE_PATTERN: str = r'(?<![0-9.])(?P<volts>[0-9]+) ?_?[vV](?![a-zA-Z])'
+
+# A frequency, such as `0.5khz`, `800 hz` or `t1khz`, followed by
+# an optional replicate index
+FREQUENCY_PATTERN: str = \
+    r'(?<![.0-9])(?P<number>[0-9]+(?:\.[0-9]+)?) ?(?P<kilo>[kK]?)[hH][zZ]' \
+    r'(?P<replicate>[0-9]*)'
+
+# A control (zero frequency) file, followed by an optional
+# replicate index
+CONTROL_PATTERN: str = r'[cC]ontrol(?P<control_replicate>[0-9]*)'
+
+# The kind of a file, by its name. The first match is used.
+KINDS: List[Tuple[str, str]] = [(r'.*filtered.*\.csv$', 'filtered'),
+                                (r'.*speckle.*\.csv$', 'speckles'),
+                                (r'.*track.*\.csv$', 'tracks'),
+                                (r'.*\.avi$', 'avi')]
+
+# Every height, checked at once
+HEIGHT_MATCHER: PatternMatcher = PatternMatcher(
+    [pattern for pattern, _ in HEIGHTS])
+
+# Every other field of every file, in one pattern
+COMBINED: Pattern[str] = re.compile('|'.join(
+    [VOLTAGE_PATTERN, FREQUENCY_PATTERN, CONTROL_PATTERN]))
+
+KIND_PATTERNS: List[Tuple[Pattern[str], str]] = [
+    (re.compile(pattern), kind) for pattern, kind in KINDS]
+
+
+class CatalogEntry(NamedTuple):
+    '''
+    A single classified file. Any field which could not be
+    found in the path is None.
+    '''
+
+    path: str
+    height: Optional[str]
+    voltage: Optional[float]
+    frequency: Optional[float]
+    replicate: int
+    kind: str
+    mtime: float
+
+
+def parse_frequency(text: str) -> Optional[Tuple[float, int]]:
+    '''
+    Finds the frequency in the given text, such as a file name
+    or a label like `'0.5khz'`.
+
+    :param text: The text to search.
+    :returns: The frequency in Hz and the replicate index, or
+        None if there is no frequency.
+    '''
+
+    for found in COMBINED.finditer(text):
+        if found['control_replicate'] is not None:
+            return 0.0, int(found['control_replicate'] or 0)
+
+        if found['number'] is not None:
+            hz: float = float(found['number'])
+            if found['kilo']:
+                hz *= 1000.0
+
+            return hz, int(found['replicate'] or 0)
+
+    return None
+
+
+def frequency_label(hz: float) -> str:
+    '''
+    :param hz: A frequency in Hz.
+    :returns: The frequency as it is written in file names, such
+        as `'0khz'` or `'0.5khz'`.
+    '''
+
+    return f'{hz / 1000.0:g}khz'
+
+
+def height_order(label: Optional[str]) -> int:
+    '''
+    :param label: A height label from a CatalogEntry.
+    :returns: The position of the height in `HEIGHTS`, for
+        sorting. Unknown heights sort last.
+    '''
+
+    for i, (_, known) in enumerate(HEIGHTS):
+        if known == label:
+            return i
+
+    return len(HEIGHTS)
+
+
+def classify(path: str, mtime: float = 0.0) -> Optional[CatalogEntry]:
+    '''
+    Classifies a single file by its path.
+
+    :param path: The path of the file.
+    :param mtime: The modification time of the file.
+    :returns: The classified file, or None if it is not of a
+        known kind.
+    '''
+
+    name: str = os.path.basename(path)
+
+    kind: Optional[str] = None
+    for pattern, option in KIND_PATTERNS:
+        if pattern.match(name):
+            kind = option
+            break
+
+    if kind is None:
+        return None
+
+    name_start: int = len(path) - len(name)
+
+    height: Optional[int] = HEIGHT_MATCHER.first(path)
+    voltage: Optional[float] = None
+    frequency: Optional[Tuple[float, int]] = None
+
+    for found in COMBINED.finditer(path):
+        if found['volts'] is not None:
+            # The closest to the file wins
+            voltage = float(found['volts'])
+
+        # Frequencies are only taken from the file name
+        elif frequency is None and found.start() >= name_start:
+            frequency = parse_frequency(found[0])
+
+    return CatalogEntry(path=path,
+                        height=HEIGHTS[height][1] if height is not None
+                        else None,
+                        voltage=voltage,
+                        frequency=frequency[0] if frequency else None,
+                        replicate=frequency[1] if frequency else 0,
+                        kind=kind,
+                        mtime=mtime)
+
+
+class Catalog:
+    '''
+    A queryable set of classified files.
+    '''
+
+    def __init__(self, entries: Optional[List[CatalogEntry]] = None) -> None:
+        '''
+        Initialize a catalog from already-classified files.
+
+        :param entries: The files in the catalog.
+        '''
+
+        self.entries: List[CatalogEntry] = entries if entries else []
+
+    @staticmethod
+    def scan(root: str) -> 'Catalog':
+        '''
+        Walks the given folder once, classifying every file.
+
+        :param root: The folder to recursively walk.
+        :returns: A catalog of every file of a known kind, in
+            walk order.
+        '''
+
+        entries: List[CatalogEntry] = []
+
+        for path in walk(root):
+            try:
+                mtime: float = os.path.getmtime(path)
+            except OSError:
+                continue
+
+            entry: Optional[CatalogEntry] = classify(path, mtime)
+            if entry is not None:
+                entries.append(entry)
+
+        return Catalog(entries)
+
+    def __len__(self) -> int:
+        '''
+        :returns: The number of files in this catalog.
+        '''
+
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[CatalogEntry]:
+        '''
+        :returns: An iterator over the files in this catalog.
+        '''
+
+        return iter(self.entries)
+
+    def select(self,
+               kind: Union[str, Tuple[str, ...], None] = None,
+               height: Optional[str] = None,
+               voltage: Optional[float] = None,
+               frequency: Optional[float] = None,
+               within: Optional[str] = None,
+               directly: bool = False,
+               matching: Optional[str] = None) -> 'Catalog':
+        '''
+        Selects the files with all of the given properties. Any
+        which are None are not checked.
+
+        :param kind: A kind, or a tuple of kinds.
+        :param height: A height label.
+        :param voltage: A voltage.
+        :param frequency: A frequency in Hz.
+        :param within: A folder which the files must be in.
+        :param directly: If True, the files must be directly
+            within the folder, rather than in a subfolder of it.
+        :param matching: A RegEx pattern which the paths must
+            match (as in `speckle.for_each_file`).
+        :returns: A catalog of only the matching files.
+        '''
+
+        kinds: Tuple[str, ...] = (kind,) if isinstance(kind, str) \
+            else kind if kind is not None else ()
+
+        prefix: str = os.path.join(os.path.realpath(within), '') \
+            if within is not None else ''
+        pattern: Optional[Pattern[str]] = \
+            re.compile(matching) if matching is not None else None
+
+        def keep(entry: CatalogEntry) -> bool:
+            if kinds and entry.kind not in kinds:
+                return False
+            if height is not None and entry.height != height:
+                return False
+            if voltage is not None and entry.voltage != voltage:
+                return False
+            if frequency is not None and entry.frequency != frequency:
+                return False
+            if within is not None:
+                if not entry.path.startswith(prefix):
+                    return False
+                if directly and os.sep in entry.path[len(prefix):]:
+                    return False
+            if pattern is not None and not pattern.match(entry.path):
+                return False
+            return True
+
+        return Catalog([entry for entry in self.entries if keep(entry)])
+
+    def paths(self) -> List[str]:
+        '''
+        :returns: The path of every file in this catalog.
+        '''
+
+        return [entry.path for entry in self.entries]
+
+    def folders(self) -> List[str]:
+        '''
+        :returns: Every folder which directly contains a file in
+            this catalog, in order of first appearance.
+        '''
+
+        return list(dict.fromkeys(
+            os.path.dirname(entry.path) for entry in self.entries))
+
+    def frequencies(self) -> List[float]:
+        '''
+        :returns: Every frequency in this catalog, ascending.
+        '''
+
+        return sorted({entry.frequency for entry in self.entries
+                       if entry.frequency is not None})
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        :returns: This catalog as a table, with one row per file.
+        '''
+
+        columns: Dict[str, List[Any]] = {
+            field: [getattr(entry, field) for entry in self.entries]
+            for field in CatalogEntry._fields}
+
+        return pd.DataFrame(columns)
@@ -1,14 +1,24 @@
 '''
 Some essential filters for the speckle package.
 
+Besides the per-track filters (see `FreqFile.filter`), this
+defines filters which work on whole columns of metrics at once
+(as from `FreqFile.metrics`). Like the per-track filters, these
+return True for each track to remove, so their masks can be
+passed straight to `FreqFile.erase`. They implement the protocol
+described at the head of `filterer.py`: Iterative sigma-clipping
+and IQR fences, a Brownian threshold from a clipped control, and
+the mobility filter built from them.
+
 Jordan Dehmel, 2024
 jedehmel@mavs.coloradomesa.edu
 jdehmel@outlook.com
 '''
 
-from typing import Union, Dict, Any
+from typing import Callable, Union, Dict, Any, Optional, Tuple
+import numpy as np
 import speckle as s
-from speckle import speckle_filter
+from speckle import speckle_filter, column_filter
 
 
 class OverFilteringError(RuntimeError):
@@ -42,3 +52,237 @@ def sls_threshold_filter(track: Union[s.Track, s.BasicTrack],
 
     # Otherwise, keep it
     return False
+
+
+@column_filter
+def sls_threshold_columns(metrics: s.TrackMetrics,
+                          **kwargs: Any) -> np.ndarray:
+    '''
+    The columnar form of `sls_threshold_filter`, which checks
+    every track at once. Expects a definition for
+    'sls_threshold' in kwargs.
+
+    :param metrics: The metrics of the tracks in question.
+    :param kwargs: Additional keyword arguments.
+    :returns: A mask which is True for each track to remove.
+    '''
+
+    assert 'sls_threshold' in kwargs, 'Must provide `threshold` as a kwarg'
+    sls_threshold: float = kwargs['sls_threshold']
+
+    return np.asarray(metrics.sls < sls_threshold)
+
+
+# Computes the lower and upper bounds of each column, given the
+# kept rows of the values
+Bounds = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+def _clip(values: np.ndarray,
+          bounds: Bounds,
+          iterations: Optional[int],
+          tolerance: float,
+          removed: Optional[np.ndarray]) -> np.ndarray:
+    '''
+    Iteratively drops rows outside of the given bounds, which
+    are recomputed from the remaining rows each iteration.
+
+    :param values: A column, or a 2D array with one column per
+        metric.
+    :param bounds: Computes the bounds of each column.
+    :param iterations: The maximum number of iterations, or None
+        to iterate until convergence.
+    :param tolerance: Stop once no bound moves by more than
+        this between iterations.
+    :param removed: A mask of rows which are already removed,
+        and so are not considered. If None, every row is.
+    :returns: A mask of the rows which are removed.
+    '''
+
+    columns: np.ndarray = np.asarray(values, dtype=float)
+    if columns.ndim == 1:
+        columns = columns[:, np.newaxis]
+
+    kept: np.ndarray = np.isfinite(columns).all(axis=1)
+    if removed is not None:
+        kept &= ~np.asarray(removed, dtype=bool)
+
+    previous: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    done: int = 0
+
+    while (iterations is None or done < iterations) and kept.any():
+        lower, upper = bounds(columns[kept])
+
+        # Converged if the bounds have stopped moving
+        if previous is not None \
+                and np.all(np.abs(lower - previous[0]) <= tolerance) \
+                and np.all(np.abs(upper - previous[1]) <= tolerance):
+            break
+
+        inside: np.ndarray = np.all((columns >= lower)
+                                    & (columns <= upper), axis=1)
+
+        # Converged if nothing more would be dropped
+        if not (kept & ~inside).any():
+            break
+
+        kept &= inside
+        previous = (lower, upper)
+        done += 1
+
+    return ~kept
+
+
+def sigma_clip(values: np.ndarray,
+               lower: Optional[float] = 2.0,
+               upper: Optional[float] = 2.0,
+               iterations: Optional[int] = 1,
+               tolerance: float = 0.0,
+               removed: Optional[np.ndarray] = None) -> np.ndarray:
+    '''
+    Removes outliers more than some number of standard
+    deviations from the mean. Each iteration recomputes the mean
+    and the (population) standard deviation of the remaining
+    rows, and stops early once no more rows are removed. Rows
+    with any non-finite value are always removed.
+
+    :param values: A column of metrics (e.g. `metrics().sls`),
+        or a 2D array with one column per metric, in which case
+        each column is clipped against its own statistics and a
+        row is removed if any of its values is.
+    :param lower: Remove values more than this many standard
+        deviations below the mean. If None, none are.
+    :param upper: Remove values more than this many standard
+        deviations above the mean. If None, none are.
+    :param iterations: The maximum number of iterations, or None
+        to iterate until convergence.
+    :param tolerance: Also stop once neither bound moves by more
+        than this between iterations.
+    :param removed: A mask of rows which are already removed,
+        such as the result of a previous filter. These are not
+        considered, and stay removed. If None, every row is
+        considered.
+    :returns: A boolean mask which is True for each row to
+        remove.
+    '''
+
+    def bounds(kept: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        :param kept: The remaining rows.
+        :returns: The bounds of each column.
+        '''
+
+        mean: np.ndarray = kept.mean(axis=0)
+        std: np.ndarray = kept.std(axis=0)
+
+        return (mean - lower * std if lower is not None
+                else np.full_like(mean, -np.inf),
+                mean + upper * std if upper is not None
+                else np.full_like(mean, np.inf))
+
+    return _clip(values, bounds, iterations, tolerance, removed)
+
+
+def iqr_clip(values: np.ndarray,
+             lower: Optional[float] = 1.5,
+             upper: Optional[float] = 1.5,
+             iterations: Optional[int] = 1,
+             tolerance: float = 0.0,
+             removed: Optional[np.ndarray] = None) -> np.ndarray:
+    '''
+    Removes outliers beyond Tukey's fences: More than some number
+    of inter-quartile ranges below the first quartile or above
+    the third. Otherwise, this works just like `sigma_clip`.
+
+    :param values: A column of metrics, or a 2D array with one
+        column per metric.
+    :param lower: Remove values more than this many IQRs below
+        the first quartile. If None, none are.
+    :param upper: Remove values more than this many IQRs above
+        the third quartile. If None, none are.
+    :param iterations: The maximum number of iterations, or None
+        to iterate until convergence.
+    :param tolerance: Also stop once neither bound moves by more
+        than this between iterations.
+    :param removed: A mask of rows which are already removed.
+        If None, every row is considered.
+    :returns: A boolean mask which is True for each row to
+        remove.
+    '''
+
+    def bounds(kept: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        :param kept: The remaining rows.
+        :returns: The bounds of each column.
+        '''
+
+        q1, q3 = np.percentile(kept, [25.0, 75.0], axis=0)
+        iqr: np.ndarray = q3 - q1
+
+        return (q1 - lower * iqr if lower is not None
+                else np.full_like(q1, -np.inf),
+                q3 + upper * iqr if upper is not None
+                else np.full_like(q3, np.inf))
+
+    return _clip(values, bounds, iterations, tolerance, removed)
+
+
+def brownian_threshold(control_sls: np.ndarray,
+                       k: float = 2.0,
+                       sigma: Optional[float] = 2.0,
+                       iterations: Optional[int] = 1) -> float:
+    '''
+    Finds the Brownian SLS threshold from a control file: Its
+    outliers are sigma-clipped (on both sides), and the mean
+    and standard deviation recalculated from what remains.
+
+    :param control_sls: The SLS of every control track.
+    :param k: The number of standard deviations above the
+        Brownian mean to place the threshold.
+    :param sigma: The clipping distance, in standard deviations,
+        or None to skip clipping.
+    :param iterations: The maximum number of clipping iterations,
+        or None to iterate until convergence.
+    :returns: The Brownian mean plus k standard deviations.
+    '''
+
+    sls: np.ndarray = np.asarray(control_sls, dtype=float)
+    kept: np.ndarray = np.isfinite(sls)
+
+    if sigma is not None:
+        kept = ~sigma_clip(sls, sigma, sigma, iterations)
+
+    if not kept.any():
+        raise OverFilteringError('No control tracks remain')
+
+    return float(np.mean(sls[kept]) + k * np.std(sls[kept]))
+
+
+def mobility_mask(sls: np.ndarray,
+                  threshold: float,
+                  sigma: Optional[float] = 2.0,
+                  iterations: Optional[int] = 1) -> np.ndarray:
+    '''
+    Filters a file under an applied field: Any track slower
+    than the Brownian threshold is removed (as by
+    `sls_threshold_filter`), then outliers are sigma-clipped
+    from those which remain.
+
+    :param sls: The SLS of every track.
+    :param threshold: The Brownian threshold, as from
+        `brownian_threshold`.
+    :param sigma: The clipping distance, in standard deviations,
+        or None to skip clipping.
+    :param iterations: The maximum number of clipping iterations,
+        or None to iterate until convergence.
+    :returns: A boolean mask which is True for each track to
+        remove.
+    '''
+
+    values: np.ndarray = np.asarray(sls, dtype=float)
+    slow: np.ndarray = ~(values >= threshold)
+
+    if sigma is None:
+        return slow
+
+    return sigma_clip(values, sigma, sigma, iterations, removed=slow)
@@ -10,11 +10,15 @@ jedehmel@mavs.coloradomesa.edu
 jdehmel@outlook.com
 '''
 
-from io import StringIO
-from typing import List, Optional, Union, Dict, Protocol, Any, Tuple, Literal
+from itertools import compress
+from typing import List, Optional, Union, Dict, Protocol, Any, Tuple, \
+    Literal
 import pandas as pd
 import numpy as np
 from speckle.speckle import Track, duration_threshold
+from speckle.parsing import threshold_durations
+from speckle.cache import load_speckle_arrays, load_tracks_columns
+from speckle.track_table import TrackTable, TrackView, TrackMetrics
 
 
 class BasicTrack:
@@ -91,6 +95,32 @@ def speckle_filter(fn: FilterFunction) -> FilterFunction:
     return fn
 
 
+class ColumnFilter(Protocol):
+    '''
+    A type denoting a valid columnar filtering function. Rather
+    than being called once per track, this is given the metrics
+    of every track at once (see `FreqFile.metrics`), and returns
+    a boolean mask which is True for each track to remove.
+    '''
+
+    def __call__(self,
+                 metrics: TrackMetrics,
+                 **kwargs: Any) -> np.ndarray:
+        pass
+
+
+def column_filter(fn: ColumnFilter) -> ColumnFilter:
+    '''
+    Decorator marking a function as a ColumnFilter, so that
+    `FreqFile.filter` passes it metric columns instead of
+    tracks. This will fail type checking if the decorated
+    function is not a valid ColumnFilter.
+    '''
+
+    setattr(fn, '_columnar', True)
+    return fn
+
+
 class FreqFile:
     '''
     A file from a single frequency. Has a set of tracks, as well
@@ -102,18 +132,122 @@ class FreqFile:
                  path: Optional[str] = None,
                  pattern: Optional[str] = None,
                  label: Optional[str] = None,
-                 tags: Optional[List[str]] = None) -> None:
+                 tags: Optional[List[str]] = None,
+                 table: Optional[TrackTable] = None) -> None:
         '''
-        Initialize a frequency file.
+        Initialize a frequency file. If a columnar `table` is
+        given instead of `tracks`, the tracks are views into it.
         '''
 
-        self.tracks: List[Union[Track, BasicTrack]] = tracks if tracks else []
-        self.erased: List[Union[Track, BasicTrack]] = []
+        self.table: Optional[TrackTable] = table
+        self.__tracks: List[Union[Track, BasicTrack]] = \
+            tracks if tracks else []
+
+        if table is not None and not tracks:
+            self.__tracks = list(table)
+
+        # Erased tracks are kept as the tracks each erasure was
+        # applied to, with a mask of those it removed. They are
+        # only gathered into a list when asked for.
+        self.__erased: List[Tuple[Tuple[Union[Track, BasicTrack], ...],
+                                  np.ndarray]] = []
+
+        # Erasures which have been restored, but not yet appended
+        # back onto the tracks
+        self.__restored: List[Tuple[Tuple[Union[Track, BasicTrack], ...],
+                                    np.ndarray]] = []
+
         self.path: str = path if path else ''
         self.pattern: str = pattern if pattern else ''
         self.frequency_label: str = label if label else ''
         self.tags: List[str] = tags if tags else []
 
+    @property
+    def tracks(self) -> List[Union[Track, BasicTrack]]:
+        '''
+        The tracks which have not been erased. This is a plain
+        list, which may be edited or replaced as usual.
+        '''
+
+        if self.__restored:
+            self.__tracks += _gather(self.__restored)
+            self.__restored = []
+
+        return self.__tracks
+
+    @tracks.setter
+    def tracks(self, tracks: List[Union[Track, BasicTrack]]) -> None:
+        '''
+        Replaces the tracks which have not been erased.
+        '''
+
+        self.__tracks = tracks
+        self.__restored = []
+
+    @property
+    def erased(self) -> List[Union[Track, BasicTrack]]:
+        '''
+        The tracks which have been erased by filters, in the
+        order they were erased.
+        '''
+
+        return _gather(self.__erased)
+
+    def metrics(self) -> TrackMetrics:
+        '''
+        Computes the metrics of every (non-erased) track at
+        once. If the tracks are views into this file's table,
+        the table's cached metrics are used directly. Otherwise,
+        `Track`s are batched into a temporary table, and
+        `BasicTrack`s contribute their loaded values (with -1
+        for MDTS and MV, which they do not have).
+
+        :returns: The metrics of each track, in order.
+        '''
+
+        table: Optional[TrackTable] = self.table
+
+        # Fast path: Everything is a view into our table
+        if table is not None and all(isinstance(track, TrackView)
+                                     and track.table is table
+                                     for track in self.tracks):
+            indices: np.ndarray = np.array(
+                [track.index for track in self.tracks  # type: ignore
+                 ], dtype=np.int64)
+            return table.metrics().take(indices)
+
+        is_basic: np.ndarray = np.array(
+            [isinstance(track, BasicTrack) for track in self.tracks],
+            dtype=bool)
+
+        computed: TrackMetrics = TrackTable.from_tracks(
+            [track for track in self.tracks
+             if isinstance(track, Track)]).metrics()
+
+        if not is_basic.any():
+            return computed
+
+        basic: List[BasicTrack] = [track for track in self.tracks
+                                   if isinstance(track, BasicTrack)]
+        loaded: TrackMetrics = TrackMetrics(
+            np.array([track.duration() for track in basic], dtype=np.int64),
+            np.array([track.displacement() for track in basic], dtype=float),
+            np.array([track.sls() for track in basic], dtype=float),
+            np.full(len(basic), -1.0),
+            np.full(len(basic), -1.0),
+            np.array([track.msd() for track in basic], dtype=float))
+
+        # Interleave the two back into the original order
+        merged: List[np.ndarray] = []
+        for ours, theirs in zip(computed, loaded):
+            column: np.ndarray = np.empty(len(self.tracks),
+                                          dtype=theirs.dtype)
+            column[~is_basic] = ours
+            column[is_basic] = theirs
+            merged.append(column)
+
+        return TrackMetrics(*merged)
+
     def save_tracks(self, where: str) -> None:
         '''
         Save this object as a tracks.csv file.
@@ -121,17 +255,16 @@ class FreqFile:
         :param where: The filepath to save at.
         '''
 
+        metrics: TrackMetrics = self.metrics()
+
         # Construct dictionary
         d: Dict[str, List[Any]] = {}
         dummy: List[Any] = ['_', '_', '_']
 
-        d['TRACK_INDEX'] = dummy + [i for i, _ in enumerate(self.tracks)]
-        d['TRACK_DURATION'] = dummy + [track.duration()
-                                       for track in self.tracks]
-        d['TRACK_DISPLACEMENT'] = dummy + [track.displacement()
-                                           for track in self.tracks]
-        d['MEAN_STRAIGHT_LINE_SPEED'] = dummy + [track.sls()
-                                                 for track in self.tracks]
+        d['TRACK_INDEX'] = dummy + list(range(len(self.tracks)))
+        d['TRACK_DURATION'] = dummy + metrics.duration.tolist()
+        d['TRACK_DISPLACEMENT'] = dummy + metrics.displacement.tolist()
+        d['MEAN_STRAIGHT_LINE_SPEED'] = dummy + metrics.sls.tolist()
 
         # Construct DataFrame
         df: pd.DataFrame = pd.DataFrame(d)
@@ -158,11 +291,12 @@ class FreqFile:
 
     def restore_erased(self) -> None:
         '''
-        Restore all items from erased.
+        Restore all items from erased. They are appended after
+        the remaining tracks when those are next used.
         '''
 
-        self.tracks += self.erased
-        self.erased = []
+        self.__restored += self.__erased
+        self.__erased = []
 
     def purge_erased(self) -> List[Union[Track, BasicTrack]]:
         '''
@@ -172,38 +306,67 @@ class FreqFile:
             don't need it.
         '''
 
-        to_return = self.erased[:]
-        self.erased = []
+        to_return: List[Union[Track, BasicTrack]] = self.erased
+        self.__erased = []
 
         return to_return
 
+    def erase(self, mask: np.ndarray) -> Tuple[int, int]:
+        '''
+        Erases tracks by a boolean mask over the current
+        (non-erased) tracks, which is True for each track to
+        remove. Erased tracks can be brought back with
+        `restore_erased`.
+
+        :param mask: The tracks to erase.
+        :returns: A 2-tuple which is (number erased, number
+            remaining).
+        '''
+
+        remove: np.ndarray = np.array(mask, dtype=bool)
+        tracks: List[Union[Track, BasicTrack]] = self.tracks
+
+        assert len(remove) == len(tracks), 'Mask length mismatch'
+
+        erased: int = int(np.count_nonzero(remove))
+
+        if erased:
+            self.__erased.append((tuple(tracks), remove))
+            self.__tracks = list(compress(tracks, ~remove))
+
+        return (erased, len(remove) - erased)
+
     def filter(self,
-               whether_to_remove: FilterFunction,
+               whether_to_remove: Union[FilterFunction, ColumnFilter],
                **kwargs: Any) -> Tuple[int, int]:
         '''
-        Filters the tracks according to the given function. The
-        list of tracks is iterated over, and any track for which
-        `whether_to_remove(track)` is `True` is moved to the
-        erased track list.
-
-        :param whether_to_remove: A lambda filter function.
+        Filters the tracks according to the given function, and
+        erases (see `erase`) every track it selects. A
+        `ColumnFilter` (marked with `column_filter`) is called
+        once, with the metrics of every track. A per-track
+        `FilterFunction` is called on each track in turn, and
+        any track for which `whether_to_remove(track)` is `True`
+        is erased.
+
+        :param whether_to_remove: A filter function.
         :returns: A 2-tuple which is (number erased, number
             remaining).
         '''
 
-        new_tracks: List[Union[Track, BasicTrack]] = []
-        erased: int = 0
+        remove: np.ndarray
 
-        for track in self.tracks:
-            if whether_to_remove(track, **kwargs):
-                self.erased.append(track)
-                erased += 1
-            else:
-                new_tracks.append(track)
+        if getattr(whether_to_remove, '_columnar', False):
+            columnar: ColumnFilter = whether_to_remove  # type: ignore
+            remove = columnar(self.metrics(), **kwargs)
 
-        self.tracks = new_tracks
+        else:
+            per_track: FilterFunction = whether_to_remove  # type: ignore
+            tracks: List[Union[Track, BasicTrack]] = self.tracks
+            remove = np.fromiter((bool(per_track(track, **kwargs))
+                                  for track in tracks),
+                                 dtype=bool, count=len(tracks))
 
-        return (erased, len(self.tracks))
+        return self.erase(remove)
 
     def msd_mean(self) -> float:
         '''
@@ -211,8 +374,7 @@ class FreqFile:
             within.
         '''
 
-        msd_values: List[float] = [track.msd() for track in self.tracks]
-        return float(np.mean(msd_values))
+        return float(np.mean(self.metrics().msd))
 
     def msd_std(self) -> float:
         '''
@@ -220,8 +382,7 @@ class FreqFile:
             within.
         '''
 
-        msd_values: List[float] = [track.msd() for track in self.tracks]
-        return float(np.std(msd_values))
+        return float(np.std(self.metrics().msd))
 
     def sls_mean(self) -> float:
         '''
@@ -230,8 +391,7 @@ class FreqFile:
         :returns: The mean of the SLS's of the tracks within.
         '''
 
-        sls_values: List[float] = [track.sls() for track in self.tracks]
-        return float(np.mean(sls_values))
+        return float(np.mean(self.metrics().sls))
 
     def sls_std(self) -> float:
         '''
@@ -240,20 +400,41 @@ class FreqFile:
         :returns: The STD of the SLS's of the tracks within.
         '''
 
-        sls_values: List[float] = [track.sls() for track in self.tracks]
-        return float(np.std(sls_values))
+        return float(np.std(self.metrics().sls))
+
+
+def _gather(erasures: List[Tuple[Tuple[Union[Track, BasicTrack], ...],
+                                 np.ndarray]]
+            ) -> List[Union[Track, BasicTrack]]:
+    '''
+    :param erasures: Tracks, each with a mask of those erased.
+    :returns: The erased tracks, in order.
+    '''
+
+    return [track for tracks, mask in erasures
+            for track in compress(tracks, mask)]
 
 
 def load_frequency_file(path: str,
                         file_format: Literal['tracks', 'speckles'] = 'tracks',
                         pattern: Optional[str] = None,
-                        label: Optional[str] = None) -> FreqFile:
+                        label: Optional[str] = None,
+                        scale: float = 1.0) -> FreqFile:
     '''
     Loads a given `csv` file into a FreqFile object. The target
     file should be in the "tracks" format. The return object is
-    easily filterable.
+    easily filterable. Parsed files are cached on disk (see
+    `speckle.cache`), so reloading an unchanged file is fast.
+
+    If `scale` is given, all lengths are multiplied by it as
+    they are loaded, leaving the file itself untouched. This can
+    be used instead of rewriting files with `rescale_speckles`
+    (e.g. `1192 / 256`), or to convert pixels to physical units
+    (e.g. `filterer.conversion`).
 
     :param path: The path to the csv file to load.
+    :param scale: The number of output units per unit of length
+        in the file.
     :returns: A FreqFile object with the given data.
     '''
 
@@ -262,84 +443,47 @@ def load_frequency_file(path: str,
     # Load a "track"-formatted file.
     if file_format == 'tracks':
 
-        # Load initial dataframe
-        tracks: pd.DataFrame = pd.read_csv(path)
-
-        # Trim garbage rows
-        tracks.drop([0, 1, 2], inplace=True)
-
-        # Iterate over rows
-        for row in tracks.iterrows():
-
-            # Get relevant series
-            row = row[1]
-
-            # Setup default values for if these keys are not
-            # present
-            duration: int = -1
-            displacement: float = -1.0
-            sls: float = -1.0
-            msd: float = -1.0
-
-            # Check for each key's presence in the row, and if
-            # it is there, use that value.
-            if 'TRACK_DURATION' in row:
-                duration = int(row['TRACK_DURATION'])
-
-            if 'TRACK_DISPLACEMENT' in row:
-                displacement = float(row['TRACK_DISPLACEMENT'])
-
-            if 'MEAN_STRAIGHT_LINE_SPEED' in row:
-                sls = float(row['MEAN_STRAIGHT_LINE_SPEED'])
-
-            if 'MEAN_SQUARED_DISPLACEMENT' in row:
-                msd = float(row['MEAN_SQUARED_DISPLACEMENT'])
-
-            # Construct BasicTrack with read params
-            to_append: BasicTrack = BasicTrack(duration,
-                                               displacement,
-                                               sls,
-                                               msd)
-
-            # Append this data
-            out.tracks.append(to_append)
+        # Load typed columns, filling any absent ones with -1
+        count, columns = load_tracks_columns(path)
+        missing: np.ndarray = np.full(count, -1)
+
+        duration: List[int] = columns.get('TRACK_DURATION',
+                                          missing).tolist()
+        displacement: List[float] = columns.get('TRACK_DISPLACEMENT',
+                                                missing).astype(float).tolist()
+        sls: List[float] = columns.get('MEAN_STRAIGHT_LINE_SPEED',
+                                       missing).astype(float).tolist()
+        msd: List[float] = columns.get('MEAN_SQUARED_DISPLACEMENT',
+                                       missing).astype(float).tolist()
+
+        # Scale the present columns, leaving missing values at -1
+        if scale != 1.0:
+            if 'TRACK_DISPLACEMENT' in columns:
+                displacement = (np.array(displacement) * scale).tolist()
+            if 'MEAN_STRAIGHT_LINE_SPEED' in columns:
+                sls = (np.array(sls) * scale).tolist()
+            if 'MEAN_SQUARED_DISPLACEMENT' in columns:
+                msd = (np.array(msd) * scale ** 2).tolist()
+
+        out.tracks = [BasicTrack(*row)
+                      for row in zip(duration, displacement, sls, msd)]
 
     # Load a "speckle"-formatted file.
     else:
 
-        # Load input
-        text: str = ''
-        with open(path, 'rb') as file:
-            text = file.read().decode()
-
-        # Process
-        text = text.replace('\t', ',')
-        text = text.replace('\n', ',\n')
-
-        while ',,' in text:
-            text = text.replace(',,', ',')
-
-        # Load data
-        frame: pd.DataFrame = pd.read_csv(StringIO(text))
-
-        cur_track: Track = Track([], [], [])
+        # Parse straight into columns, dropping tracks below the
+        # duration threshold
+        x, y, frames, offsets = threshold_durations(
+            load_speckle_arrays(path), duration_threshold)
 
-        is_first: bool = True
-        for row in frame.iterrows():
-            if is_first:
-                is_first = False
-                continue
+        # Scale the coordinates, so all metrics are scaled too
+        if scale != 1.0:
+            x = x * scale
+            y = y * scale
 
-            if 'stop speckle' in row[0][0]:
-                out.tracks.append(cur_track)
-            elif 'start speckle' in row[0][0]:
-                cur_track = Track([], [], [])
-            else:
-                cur_track.append(float(row[0][0]), float(
-                    row[0][1]), int(row[0][2]))
+        table: TrackTable = TrackTable(x, y, frames, offsets)
 
-        # Remove tracks below the duration threshold
-        out.tracks = [track for track in out.tracks
-                      if track.duration() >= duration_threshold]
+        out.table = table
+        out.tracks = list(table)
 
     return out
@@ -0,0 +1,244 @@
+'''
+A persistent index of the tracks files in an experiment folder,
+with summary statistics for each, stored as an SQLite database
+in the folder itself. Each file's entry records its size and
+modification time, and is only recomputed when these change, so
+collating an already-indexed folder does not reread any CSVs.
+
+For each tracks (or filtered) file, the index holds the fields
+found by `speckle.catalog`, the number of tracks, and the mean,
+sample standard deviation and quartiles of the SLS, MSD and
+displacement columns. Statistics of absent columns are NULL.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+import os
+import sqlite3
+from types import TracebackType
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+import numpy as np
+from speckle.cache import load_tracks_columns
+from speckle.catalog import CatalogEntry
+
+
+# The name of the index file within a root folder
+INDEX_NAME: str = '.speckle_index.sqlite'
+
+# Increment this whenever the schema or statistics change
+INDEX_VERSION: int = 1
+
+# The kinds of file which are indexed
+INDEXED_KINDS: Tuple[str, ...] = ('tracks', 'filtered')
+
+# The summarized columns of a tracks file, by short name
+STATISTICS: Dict[str, str] = {'sls': 'MEAN_STRAIGHT_LINE_SPEED',
+                              'msd': 'MEAN_SQUARED_DISPLACEMENT',
+                              'displacement': 'TRACK_DISPLACEMENT'}
+
+# The summaries of each column
+SUMMARIES: Tuple[str, ...] = ('mean', 'std', 'q25', 'median', 'q75')
+
+# Every column of the index, with its SQL type
+COLUMNS: List[Tuple[str, str]] = [
+    ('path', 'TEXT PRIMARY KEY'), ('size', 'INTEGER'),
+    ('mtime_ns', 'INTEGER'), ('kind', 'TEXT'), ('height', 'TEXT'),
+    ('voltage', 'REAL'), ('frequency', 'REAL'), ('replicate', 'INTEGER'),
+    ('source', 'TEXT'), ('count', 'INTEGER')] + [
+    (f'{name}_{summary}', 'REAL')
+    for name in STATISTICS for summary in SUMMARIES]
+
+
+def summarize(values: np.ndarray) -> List[Optional[float]]:
+    '''
+    :param values: A column of a tracks file.
+    :returns: Its summaries, in the order of `SUMMARIES`. The
+        standard deviation is the sample one, as pandas
+        computes it, and is None for fewer than 2 values.
+    '''
+
+    if len(values) == 0:
+        return [None] * len(SUMMARIES)
+
+    q25, median, q75 = np.percentile(values, [25.0, 50.0, 75.0])
+    std: Optional[float] = \
+        float(np.std(values, ddof=1)) if len(values) > 1 else None
+
+    return [float(np.mean(values)), std, float(q25), float(median),
+            float(q75)]
+
+
+class FileIndex:
+    '''
+    An SQLite index of the tracks files in a folder.
+    '''
+
+    def __init__(self, root: str, where: Optional[str] = None) -> None:
+        '''
+        Open (or create) the index for the given root folder.
+
+        :param root: The folder being indexed.
+        :param where: The database file. If None, it is stored
+            in the root folder.
+        '''
+
+        self.path: str = where if where is not None \
+            else os.path.join(root, INDEX_NAME)
+        self.connection: sqlite3.Connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+
+        version: int = self.connection.execute(
+            'PRAGMA user_version').fetchone()[0]
+
+        # Rebuild from scratch if the schema is out of date
+        if version != INDEX_VERSION:
+            with self.connection:
+                self.connection.execute('DROP TABLE IF EXISTS files')
+                self.connection.execute(
+                    'CREATE TABLE files ('
+                    + ', '.join(f'"{name}" {kind}' for name, kind in COLUMNS)
+                    + ')')
+                self.connection.execute(
+                    f'PRAGMA user_version = {INDEX_VERSION}')
+
+    def __enter__(self) -> 'FileIndex':
+        '''
+        :returns: This index, which is closed on exit.
+        '''
+
+        return self
+
+    def __exit__(self,
+                 kind: Optional[Type[BaseException]],
+                 value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        '''
+        Close the database on leaving a `with` block.
+        '''
+
+        self.close()
+
+    def close(self) -> None:
+        '''
+        Close the database.
+        '''
+
+        self.connection.close()
+
+    def refresh(self,
+                entries: Iterable[CatalogEntry],
+                prune: bool = True) -> int:
+        '''
+        Brings the index up to date with the given files. Only
+        files whose size or modification time has changed since
+        they were last indexed are reread.
+
+        :param entries: The files to index, as from
+            `Catalog.scan`. Files of kinds other than
+            `INDEXED_KINDS` are ignored.
+        :param prune: If True, forgets any indexed file which is
+            not among the given ones.
+        :returns: The number of files which were reread.
+        '''
+
+        known: Dict[str, Tuple[int, int]] = {
+            row['path']: (row['size'], row['mtime_ns'])
+            for row in self.connection.execute(
+                'SELECT path, size, mtime_ns FROM files')}
+
+        present: List[str] = []
+        rows: List[List[Any]] = []
+
+        for entry in entries:
+            if entry.kind not in INDEXED_KINDS:
+                continue
+
+            try:
+                info: os.stat_result = os.stat(entry.path)
+            except OSError:
+                continue
+
+            present.append(entry.path)
+
+            if known.get(entry.path) == (info.st_size, info.st_mtime_ns):
+                continue
+
+            try:
+                count, columns = load_tracks_columns(entry.path)
+            except (OSError, ValueError) as e:
+                print(f'Failed to index {entry.path}: {e}')
+                continue
+
+            source: Optional[str] = None
+            if entry.kind == 'filtered':
+                source = entry.path.removesuffix('.filtered.csv')
+
+            row: List[Any] = [entry.path, info.st_size, info.st_mtime_ns,
+                              entry.kind, entry.height, entry.voltage,
+                              entry.frequency, entry.replicate, source,
+                              count]
+
+            for column in STATISTICS.values():
+                if column in columns:
+                    row += summarize(columns[column].astype(float))
+                else:
+                    row += [None] * len(SUMMARIES)
+
+            rows.append(row)
+
+        with self.connection:
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO files VALUES '
+                f'({", ".join("?" for _ in COLUMNS)})', rows)
+
+            if prune:
+                self.connection.executemany(
+                    'DELETE FROM files WHERE path = ?',
+                    [(path,) for path in set(known) - set(present)])
+
+        return len(rows)
+
+    def summary(self, path: str) -> Optional[Dict[str, Any]]:
+        '''
+        :param path: An indexed file.
+        :returns: Its entry in the index, as a dictionary with
+            keys as in `COLUMNS`, or None if it is not indexed.
+        '''
+
+        row: Optional[sqlite3.Row] = self.connection.execute(
+            'SELECT * FROM files WHERE path = ?', (path,)).fetchone()
+
+        return dict(row) if row is not None else None
+
+    def query(self, where: str = '1',
+              parameters: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+        '''
+        Selects indexed files with an SQL condition, such as
+        `'kind = ? AND frequency = ?'`.
+
+        :param where: The condition files must meet.
+        :param parameters: The values of any `?` in the
+            condition.
+        :returns: The entries of the matching files, in path
+            order.
+        '''
+
+        return [dict(row) for row in self.connection.execute(
+            f'SELECT * FROM files WHERE {where} ORDER BY path', parameters)]
+
+    def survival(self, path: str) -> Optional[Tuple[int, int]]:
+        '''
+        :param path: An indexed filtered file.
+        :returns: The number of its tracks which survived
+            filtering, and the number of tracks in the file it
+            was filtered from. None if either is not indexed.
+        '''
+
+        row: Optional[sqlite3.Row] = self.connection.execute(
+            'SELECT filtered.count, original.count FROM files AS filtered '
+            'JOIN files AS original ON filtered.source = original.path '
+            'WHERE filtered.path = ?', (path,)).fetchone()
+
+        return (row[0], row[1]) if row is not None else None
@@ -0,0 +1,135 @@
+'''
+Make-style dependency tracking for the processing scripts. A
+Manifest records, for each output file, the fingerprints of the
+inputs and the parameters which produced it. A stage can then
+skip any output which is up to date, rather than rebuilding
+everything on every run.
+
+The manifest is stored as JSON in the root folder being
+processed. Deleting it forces a full rebuild.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+import os
+import json
+import tempfile
+from typing import Any, Dict, List, Optional
+
+
+# The name of the manifest file within a root folder
+MANIFEST_NAME: str = '.speckle_manifest.json'
+
+
+def fingerprint(path: str) -> Optional[str]:
+    '''
+    :param path: The file to fingerprint.
+    :returns: A string which changes whenever the file does, or
+        None if the file does not exist.
+    '''
+
+    try:
+        info: os.stat_result = os.stat(path)
+    except OSError:
+        return None
+
+    return f'{info.st_size}:{info.st_mtime_ns}'
+
+
+class Manifest:
+    '''
+    A record of which inputs and parameters produced each
+    output file.
+    '''
+
+    def __init__(self, root: str) -> None:
+        '''
+        Load the manifest for the given root folder, if one
+        exists.
+
+        :param root: The folder being processed.
+        '''
+
+        self.path: str = os.path.join(root, MANIFEST_NAME)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        try:
+            with open(self.path, encoding='utf8') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def up_to_date(self,
+                   output: str,
+                   inputs: List[str],
+                   params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        '''
+        Checks whether the given output was produced from the
+        current versions of the given inputs with the same
+        parameters, and has not changed since.
+
+        :param output: The output file.
+        :param inputs: The files it depends on.
+        :param params: The parameters it depends on.
+        :returns: The results recorded with the output if it is
+            up to date, otherwise None.
+        '''
+
+        entry: Optional[Dict[str, Any]] = \
+            self.entries.get(os.path.realpath(output))
+
+        if entry is None:
+            return None
+
+        current: Dict[str, Optional[str]] = {
+            os.path.realpath(path): fingerprint(path) for path in inputs}
+
+        if entry['inputs'] != current or entry['params'] != params \
+                or entry['output'] != fingerprint(output) \
+                or entry['output'] is None:
+            return None
+
+        results: Dict[str, Any] = entry['results']
+        return results
+
+    def record(self,
+               output: str,
+               inputs: List[str],
+               params: Dict[str, Any],
+               results: Optional[Dict[str, Any]] = None) -> None:
+        '''
+        Records that the given output was just produced. Call
+        `save` afterwards to persist this.
+
+        :param output: The output file.
+        :param inputs: The files it depends on.
+        :param params: The parameters it depends on. These must
+            be JSON-serializable.
+        :param results: Anything else to remember about this
+            output, such as statistics printed when it was made.
+        '''
+
+        self.entries[os.path.realpath(output)] = {
+            'inputs': {os.path.realpath(path): fingerprint(path)
+                       for path in inputs},
+            'params': params,
+            'output': fingerprint(output),
+            'results': results if results is not None else {}}
+
+    def save(self) -> None:
+        '''
+        Atomically write the manifest to disk.
+        '''
+
+        folder: str = os.path.dirname(self.path) or '.'
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as file:
+                json.dump(self.entries, file, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
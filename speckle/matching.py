@@ -0,0 +1,179 @@
+'''
+Defines the class PatternMatcher, which finds which of a set of
+RegEx patterns a name contains. Rather than calling `re.search`
+once per pattern, the set is compiled once into combined
+patterns:
+
+- For `first`, a single alternation of every member. Searching
+  it finds, at each position, the first member which matches
+  there, so one pass along the name finds the first member
+  found anywhere in it. The member is then identified by
+  matching an alternation with one named group per member at
+  that position only, since named groups keep the RegEx engine
+  from skipping positions where no member can start.
+- For `matches`, one optional lookahead per member, so that a
+  single match reports every member found (each as `re.search`
+  would). Each lookahead searches the name on its own, so this
+  still scans the name once per member, but within one call
+  into the RegEx engine.
+
+Results are cached per name, up to `CACHE_SIZE` names.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Match, Optional, Pattern, Sequence, Tuple, \
+    TypeVar
+
+
+# The most names whose results are cached by each matcher
+CACHE_SIZE: int = 4096
+
+T = TypeVar('T')
+
+
+class PatternMatcher:
+    '''
+    A compiled set of RegEx patterns.
+    '''
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        '''
+        Compile the given patterns.
+
+        :param patterns: The patterns to match, in order of
+            priority.
+        '''
+
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self.__matches: Dict[str, Tuple[int, ...]] = {}
+        self.__firsts: Dict[str, Optional[int]] = {}
+
+        self.__alternation: Optional[Pattern[str]] = None
+        self.__grouped: Optional[Pattern[str]] = None
+        self.__combined: Optional[Pattern[str]] = None
+        self.__each: List[Pattern[str]] = []
+
+        try:
+            # Each member is tried in order at each position
+            self.__alternation = re.compile(
+                '|'.join(f'(?:{pattern})' for pattern in self.patterns))
+            self.__grouped = re.compile(
+                '|'.join(f'(?P<_{i}>{pattern})'
+                         for i, pattern in enumerate(self.patterns)))
+
+            # Each member is found anywhere in the name, or skipped.
+            # Only the skipping may cross lines, as the members
+            # themselves are matched as `re.search` would.
+            self.__combined = re.compile(
+                ''.join(f'(?:(?=(?s:.)*?(?P<_{i}>{pattern})))?'
+                        for i, pattern in enumerate(self.patterns)))
+        except re.error:
+            # Members which cannot be combined (e.g. with their
+            # own named groups) are searched for one by one.
+            self.__alternation = None
+            self.__grouped = None
+            self.__combined = None
+            self.__each = [re.compile(pattern) for pattern in self.patterns]
+
+    def __len__(self) -> int:
+        '''
+        :returns: The number of patterns.
+        '''
+
+        return len(self.patterns)
+
+    def matches(self, name: str) -> Tuple[int, ...]:
+        '''
+        :param name: The name to check.
+        :returns: The index of every pattern which `re.search`
+            would find in the name, ascending.
+        '''
+
+        found: Optional[Tuple[int, ...]] = self.__matches.get(name)
+        if found is not None:
+            return found
+
+        if self.__combined is not None:
+            # Every member is optional, so this always matches
+            match: Optional[Match[str]] = self.__combined.match(name)
+            assert match is not None
+
+            found = tuple(i for i in range(len(self.patterns))
+                          if match[f'_{i}'] is not None)
+        else:
+            found = tuple(i for i, pattern in enumerate(self.__each)
+                          if pattern.search(name))
+
+        _remember(self.__matches, name, found)
+        return found
+
+    def first(self, name: str) -> Optional[int]:
+        '''
+        :param name: The name to check.
+        :returns: The index of the first pattern found in the
+            name, or None if there is none.
+        '''
+
+        if name in self.__firsts:
+            return self.__firsts[name]
+
+        best: Optional[int] = None
+
+        if self.__alternation is None or self.__grouped is None:
+            found: Tuple[int, ...] = self.matches(name)
+            best = found[0] if found else None
+
+        else:
+            # Each search resumes just after the last, so this is
+            # one pass along the name. A member found later may
+            # still come before one found earlier in priority.
+            position: int = 0
+            match: Optional[Match[str]] = \
+                self.__alternation.search(name, position)
+
+            while match is not None and best != 0:
+                member: Optional[Match[str]] = \
+                    self.__grouped.match(name, match.start())
+                assert member is not None and member.lastgroup is not None
+                index: int = int(member.lastgroup[1:])
+
+                if best is None or index < best:
+                    best = index
+
+                position = match.start() + 1
+                match = self.__alternation.search(name, position)
+
+        _remember(self.__firsts, name, best)
+        return best
+
+
+def _remember(cache: Dict[str, T], name: str, value: T) -> None:
+    '''
+    Caches the result for a name, forgetting the oldest result
+    once the cache holds `CACHE_SIZE`.
+
+    :param cache: The results so far.
+    :param name: The name checked.
+    :param value: The result for it.
+    '''
+
+    if len(cache) >= CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+    cache[name] = value
+
+
+@lru_cache(maxsize=64)
+def matcher_for(patterns: Tuple[str, ...]) -> PatternMatcher:
+    '''
+    :param patterns: A set of patterns.
+    :returns: A shared matcher for them, so that repeated calls
+        with the same patterns only compile them once.
+    '''
+
+    return PatternMatcher(patterns)
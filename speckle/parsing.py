@@ -0,0 +1,279 @@
+'''
+A fast, single-pass parser for "speckle"-formatted files as
+produced by Speckle TrackerJ. Rather than rewriting the text
+into a real `csv` and handing it to `pandas`, this splits the
+raw bytes directly on the start/stop speckle markers and
+converts all coordinates at once.
+
+The results are returned in columnar form: flat x, y and frame
+arrays, plus an offsets array such that track `i` occupies the
+half-open range `offsets[i]:offsets[i + 1]` of the others.
+
+For files too large to hold in memory, `iter_speckle_tracks`
+instead streams the file, yielding one track at a time.
+
+This module also loads "tracks"-formatted files straight into
+typed per-track columns.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+from speckle.speckle import Track
+
+
+# The markers which Speckle TrackerJ places around each track
+START_MARKER: bytes = b'#%start speckle%'
+STOP_MARKER: bytes = b'#%stop speckle%'
+
+# Number of header lines at the top of every speckle file
+HEADER_LINES: int = 2
+
+# Columnar speckle data: (x, y, frames, offsets)
+SpeckleArrays = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+# The per-track columns of a "tracks" file which we use, and the
+# type each is loaded as
+TRACK_COLUMNS: Dict[str, type] = {'TRACK_DURATION': np.int64,
+                                  'TRACK_DISPLACEMENT': np.float64,
+                                  'MEAN_STRAIGHT_LINE_SPEED': np.float64,
+                                  'MEAN_SQUARED_DISPLACEMENT': np.float64}
+
+# "Tracks" files have 3 dummy rows after the header
+TRACKS_DUMMY_ROWS: List[int] = [1, 2, 3]
+
+
+def _track_tokens(body: bytes) -> List[bytes]:
+    '''
+    Splits the body of a single track into a flat list of
+    (x, y, frame) tokens. Any columns past the third are
+    ignored, as they are in the original loader.
+
+    :param body: The bytes between a start and stop marker.
+    :returns: A flat list of 3 tokens per point.
+    '''
+
+    tokens: List[bytes] = body.split()
+    lines: List[bytes] = [line for line in body.split(b'\n')
+                          if line.strip()]
+
+    # Fast path: Every line is exactly (x, y, frame)
+    if len(tokens) == 3 * len(lines):
+        return tokens
+
+    # Slow path: Trim each line individually
+    out: List[bytes] = []
+    for line in lines:
+        fields: List[bytes] = line.split()
+        assert len(fields) >= 3, f'Malformed speckle line {line!r}'
+        out += fields[:3]
+
+    return out
+
+
+def parse_speckle_bytes(data: bytes) -> SpeckleArrays:
+    '''
+    Parses the raw contents of a speckle file into columnar
+    arrays. Only tracks which are terminated with a stop marker
+    are kept, and empty tracks are discarded.
+
+    :param data: The raw bytes of the speckle file.
+    :returns: A 4-tuple of (x, y, frames, offsets).
+    '''
+
+    # Skip the header lines
+    for _ in range(HEADER_LINES):
+        newline: int = data.find(b'\n')
+        data = data[newline + 1:] if newline != -1 else b''
+
+    tokens: List[bytes] = []
+    lengths: List[int] = [0]
+
+    # Everything after the last stop marker is an unfinished
+    # track, so it is dropped.
+    for chunk in data.split(STOP_MARKER)[:-1]:
+
+        # A start marker resets the current track
+        body: bytes = chunk.rpartition(START_MARKER)[2]
+
+        cur: List[bytes] = _track_tokens(body)
+        if not cur:
+            continue
+
+        tokens += cur
+        lengths.append(len(cur) // 3)
+
+    points: np.ndarray = np.array(tokens, dtype=np.float64).reshape(-1, 3)
+    offsets: np.ndarray = np.cumsum(lengths, dtype=np.int64)
+
+    return (np.ascontiguousarray(points[:, 0]),
+            np.ascontiguousarray(points[:, 1]),
+            points[:, 2].astype(np.int64),
+            offsets)
+
+
+def parse_speckle_file(path: str) -> SpeckleArrays:
+    '''
+    Loads and parses the speckle file at the given path.
+
+    :param path: The speckle file to load.
+    :returns: A 4-tuple of (x, y, frames, offsets).
+    '''
+
+    with open(path, 'rb') as file:
+        return parse_speckle_bytes(file.read())
+
+
+def _skip_header(file: BinaryIO, block_size: int) -> bytes:
+    '''
+    Reads past the header lines of an open speckle file.
+
+    :param file: The file to read from.
+    :param block_size: The number of bytes to read at a time.
+    :returns: Whatever was read past the end of the header.
+    '''
+
+    buffer: bytes = b''
+    skipped: int = 0
+
+    while skipped < HEADER_LINES:
+        newline: int = buffer.find(b'\n')
+
+        if newline != -1:
+            buffer = buffer[newline + 1:]
+            skipped += 1
+            continue
+
+        block: bytes = file.read(block_size)
+        if not block:
+            return b''
+
+        buffer += block
+
+    return buffer
+
+
+def iter_speckle_tracks(path: str,
+                        threshold: int = 0,
+                        block_size: int = 1 << 16) -> Iterator[Track]:
+    '''
+    Streams the speckle file at the given path, yielding each
+    track as soon as its stop marker is read. Only the current
+    track is ever held in memory, so peak memory is proportional
+    to the longest track rather than the file. Yields the same
+    tracks as `parse_speckle_file`.
+
+    :param path: The speckle file to stream.
+    :param threshold: Tracks with a duration below this are
+        skipped without ever being converted.
+    :param block_size: The number of bytes to read at a time.
+    :returns: An iterator over the tracks in the file.
+    '''
+
+    with open(path, 'rb') as file:
+        buffer: bytes = _skip_header(file, block_size)
+
+        # Where to resume searching for a stop marker. This
+        # avoids rescanning long tracks on every block.
+        searched: int = 0
+
+        while True:
+            stop: int = buffer.find(STOP_MARKER, searched)
+
+            if stop == -1:
+                block: bytes = file.read(block_size)
+
+                # Anything left is an unfinished track
+                if not block:
+                    return
+
+                searched = max(0, len(buffer) - len(STOP_MARKER) + 1)
+                buffer += block
+                continue
+
+            # A start marker resets the current track
+            body: bytes = buffer[:stop].rpartition(START_MARKER)[2]
+            buffer = buffer[stop + len(STOP_MARKER):]
+            searched = 0
+
+            tokens: List[bytes] = _track_tokens(body)
+            if not tokens:
+                continue
+
+            # Check the duration before converting anything
+            if int(tokens[-1]) - int(tokens[2]) + 1 < threshold:
+                continue
+
+            points: np.ndarray = np.array(tokens,
+                                          dtype=np.float64).reshape(-1, 3)
+
+            yield Track(points[:, 0].tolist(),
+                        points[:, 1].tolist(),
+                        points[:, 2].astype(np.int64).tolist())
+
+
+def track_durations(frames: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    '''
+    Computes the duration (last frame - first frame + 1) of
+    every track at once.
+
+    :param frames: The flat frame array.
+    :param offsets: The track offsets array.
+    :returns: An array with one duration per track.
+    '''
+
+    if len(offsets) < 2:
+        return np.zeros(0, dtype=np.int64)
+
+    durations: np.ndarray = frames[offsets[1:] - 1] - frames[offsets[:-1]] + 1
+    return durations
+
+
+def threshold_durations(arrays: SpeckleArrays,
+                        threshold: int) -> SpeckleArrays:
+    '''
+    Drops all tracks whose duration is below the given
+    threshold.
+
+    :param arrays: The (x, y, frames, offsets) to filter.
+    :param threshold: The minimum duration to keep.
+    :returns: The filtered (x, y, frames, offsets).
+    '''
+
+    x, y, frames, offsets = arrays
+
+    keep: np.ndarray = track_durations(frames, offsets) >= threshold
+    if keep.all():
+        return arrays
+
+    lengths: np.ndarray = np.diff(offsets)
+    points: np.ndarray = np.repeat(keep, lengths)
+
+    return (x[points], y[points], frames[points],
+            np.concatenate(([0], np.cumsum(lengths[keep]))).astype(np.int64))
+
+
+def parse_tracks_file(path: str) -> Tuple[int, Dict[str, np.ndarray]]:
+    '''
+    Loads the useful columns of a "tracks"-formatted file into
+    typed arrays. The dummy rows are skipped while parsing, so
+    the columns are never loaded as strings.
+
+    :param path: The tracks file to load.
+    :returns: The number of tracks, and a dictionary mapping
+        each of `TRACK_COLUMNS` which is present in the file to
+        its values. Absent columns are omitted.
+    '''
+
+    frame: pd.DataFrame = pd.read_csv(path,
+                                      skiprows=TRACKS_DUMMY_ROWS,
+                                      usecols=lambda c: c in TRACK_COLUMNS,
+                                      float_precision='round_trip')
+
+    return (len(frame),
+            {name: frame[name].to_numpy(dtype=dtype)
+             for name, dtype in TRACK_COLUMNS.items() if name in frame})
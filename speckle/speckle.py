@@ -16,12 +16,39 @@ Capable of dropping any speckle track w/ duration under a
 certain threshold if so desired.
 '''
 
-from re import match
+from re import compile as compile_re, sub, Pattern
 import os
 import subprocess
-from typing import List, Union, Callable, Tuple
+from functools import wraps
+from typing import List, Union, Callable, Dict, Optional, Iterator, Set, \
+    Tuple
 from numpy import hypot
-import pandas as pd
+
+
+def memoized_metric(method: Callable[['Track'], float]) \
+        -> Callable[['Track'], float]:
+    '''
+    Decorator which caches the result of a Track metric until
+    the track is next modified via `Track.append` (or
+    `Track.clear_cache`).
+
+    :param method: The metric method to cache.
+    :returns: The caching version of the method.
+    '''
+
+    name: str = method.__name__
+
+    @wraps(method)
+    def wrapper(self: 'Track') -> float:
+        if self._cache is None:
+            self._cache = {}
+
+        if name not in self._cache:
+            self._cache[name] = method(self)
+
+        return self._cache[name]
+
+    return wrapper
 
 
 class Track:
@@ -30,12 +57,20 @@ class Track:
     This is the type of Track loaded from a "speckles"-formatted
     `csv` file- That is to say, NOT a "tracks" file. There is a
     similar class for "tracks" files in `./freq_file.py`.
+
+    Derived metrics are cached after their first computation.
+    If you modify the point lists directly rather than through
+    `append`, call `clear_cache` afterwards.
     '''
 
+    # No per-object __dict__, so the cache costs one slot
+    __slots__ = ('x_values', 'y_values', 'frames', '_cache')
+
     def __init__(self, x: List[float], y: List[float], f: List[int]):
         self.x_values: List[float] = x[:]
         self.y_values: List[float] = y[:]
         self.frames: List[int] = f[:]
+        self._cache: Optional[Dict[str, float]] = None
 
     def append(self, x: float, y: float, t: int) -> None:
         '''
@@ -45,7 +80,17 @@ class Track:
         self.x_values.append(x)
         self.y_values.append(y)
         self.frames.append(t)
+        self._cache = None
 
+    def clear_cache(self) -> None:
+        '''
+        Forget all cached metrics. Only needed if the point
+        lists were modified directly.
+        '''
+
+        self._cache = None
+
+    @memoized_metric
     def sls(self) -> float:
         '''
         Returns the mean straight line speed
@@ -63,6 +108,7 @@ class Track:
 
         return distance / df
 
+    @memoized_metric
     def mdts(self) -> float:
         '''
         Returns the mean distance traveled speed
@@ -87,6 +133,7 @@ class Track:
 
         return sum(distances) / df
 
+    @memoized_metric
     def mv(self) -> float:
         '''
         Mean of the magnitude of the velocity vectors
@@ -115,6 +162,7 @@ class Track:
 
         return self.frames[-1] - self.frames[0] + 1
 
+    @memoized_metric
     def displacement(self) -> float:
         '''
         Straight line distance from first to last point
@@ -126,6 +174,7 @@ class Track:
 
         return distance
 
+    @memoized_metric
     def msd(self) -> float:
         '''
         Return the mean squared displacement for this particle.
@@ -137,26 +186,14 @@ class Track:
             return 0.0
 
         # Compute displacements as a list
-        displacements: List[float] = []
-
         first_x: float = self.x_values[0]
         first_y: float = self.y_values[0]
 
-        # Easier iteration
-        zipped: List[Tuple[float, float]] = [
-            (self.x_values[i], self.y_values[i])
-            for i, _ in enumerate(self.frames)
+        displacements: List[float] = [
+            hypot(abs(x - first_x), abs(y - first_y))
+            for x, y in zip(self.x_values[1:], self.y_values[1:])
         ]
 
-        for x, y in zipped[1:]:
-
-            dx: float = x - first_x
-            dy: float = y - first_y
-
-            distance: float = hypot(abs(dx), abs(dy))
-
-            displacements.append(distance)
-
         # Compute sum of squares of that list
         sos: float = sum(d ** 2 for d in displacements)
 
@@ -170,7 +207,7 @@ class Track:
 # processed_w is the width in pixels of the speckle-tracked footage.
 # These may be different, as downsizing the footage for speckle tracking
 # significantly improves speed.
-original_w: int = 1028
+original_w: int = 1192
 processed_w: int = 256
 
 encoding: str = 'mjpeg'
@@ -180,6 +217,94 @@ encoding: str = 'mjpeg'
 # value.
 duration_threshold: int = 10
 
+# Directories with names matching this RegEx are skipped when
+# walking a folder: Hidden folders, and the output of graphing.
+# If None, nothing is skipped.
+pruned_dirs: Optional[str] = r'\..*|graphs'
+
+
+def walk(folder: str = '.',
+         matching: str = '.*',
+         directories: bool = False,
+         prune: Optional[str] = None) -> Iterator[str]:
+    '''
+    Lazily yields the real path of each file (or directory)
+    recursively in `folder` which matches the given RegEx
+    `matching`. Each file is yielded at most once, even if it
+    is reachable by several paths. Symbolic links to directories
+    are not followed.
+
+    :param folder: The folder to recursively walk.
+    :param matching: The RegEx pattern which designates a match.
+        This is matched against the start of the real path.
+    :param directories: If True, yields directories instead of
+        files.
+    :param prune: A RegEx pattern. Directories whose names fully
+        match this are neither entered nor yielded. If None,
+        uses `pruned_dirs`.
+    :returns: An iterator over matching paths, in the same order
+        as `os.walk`.
+    '''
+
+    if prune is None:
+        prune = pruned_dirs
+
+    pattern: Pattern[str] = compile_re(matching)
+    pruned: Optional[Pattern[str]] = \
+        compile_re(prune) if prune is not None else None
+
+    seen: Set[Tuple[int, int]] = set()
+
+    # Folders still to list, with the last to list on top
+    stack: List[str] = [os.path.realpath(folder)]
+
+    while stack:
+        here: str = stack.pop()
+        subdirs: List[str] = []
+
+        try:
+            with os.scandir(here) as entries:
+                listed: List[os.DirEntry[str]] = list(entries)
+        except OSError:
+            continue
+
+        for entry in listed:
+            try:
+                is_dir: bool = entry.is_dir()
+                is_link: bool = entry.is_symlink()
+            except OSError:
+                continue
+
+            if is_dir and pruned is not None \
+                    and pruned.fullmatch(entry.name):
+                continue
+
+            if directories and not is_dir:
+                continue
+
+            # Only links need resolving: Everything else is
+            # already beneath a real path.
+            full_name: str = os.path.realpath(entry.path) \
+                if is_link else entry.path
+
+            if is_dir and not is_link:
+                subdirs.append(full_name)
+
+            if is_dir != directories or not pattern.match(full_name):
+                continue
+
+            try:
+                info: os.stat_result = entry.stat()
+            except OSError:
+                continue
+
+            key: Tuple[int, int] = (info.st_dev, info.st_ino)
+            if key not in seen:
+                seen.add(key)
+                yield full_name
+
+        stack.extend(reversed(subdirs))
+
 
 def for_each_file(apply: Callable[[str], None],
                   folder: str = '.',
@@ -187,26 +312,15 @@ def for_each_file(apply: Callable[[str], None],
     '''
     For each file recursively in `folder` which
     matches the given RegEx `matching`, apply the given
-    function.
+    function. See `walk` for details.
 
     :param apply: The function / lambda to call on a match.
     :param folder: The folder to recursively walk.
     :param matching: The RegEx pattern which designates a match.
     '''
 
-    visited: List[str] = []
-
-    # Walk all files recursively in the current directory
-    for root, _, files in os.walk(folder):
-
-        # For each file (not directory) in the cwd
-        for file in files:
-
-            full_name: str = os.path.realpath(root + '/' + file)
-
-            if match(matching, full_name) and full_name not in visited:
-                apply(full_name)
-                visited.append(full_name)
+    for full_name in walk(folder, matching):
+        apply(full_name)
 
 
 def for_each_dir(apply: Callable[[str], None],
@@ -215,26 +329,15 @@ def for_each_dir(apply: Callable[[str], None],
     '''
     For each directory recursively in `folder` which
     matches the given RegEx `matching`, apply the given
-    function.
+    function. See `walk` for details.
 
     :param apply: The function / lambda to call on a match.
     :param folder: The folder to recursively walk.
     :param matching: The RegEx pattern which designates a match.
     '''
 
-    visited: List[str] = []
-
-    # Walk all files recursively in the current directory
-    for root, dirnames, _ in os.walk(folder):
-
-        # For each directory in the cwd
-        for dir_name in dirnames:
-
-            full_name: str = os.path.realpath(root + '/' + dir_name)
-
-            if match(matching, full_name) and full_name not in visited:
-                apply(full_name)
-                visited.append(full_name)
+    for full_name in walk(folder, matching, directories=True):
+        apply(full_name)
 
 
 def reformat_avi(to_format_filepath: str,
@@ -269,16 +372,19 @@ def reformat_avi(to_format_filepath: str,
           f'with the result saved at {save_filepath}')
 
 
-def process_file(input_filepath: str, spots_filepath: str,
+def process_file(input_filepath: str,
+                 spots_filepath: Optional[str] = None,
                  tracks_filepath: Union[str, None] = None,
                  adjustment_coefficient: float = 1.0) -> None:
     '''
     Performs preprocessing on speckle output files to put them
-    into real .csv format.
+    into real .csv format. Everything is done in memory: The
+    spots file is only written if requested, and is never read
+    back.
 
     :param in_filepath: The filepath to process from
-    :param spots_filepath: The filepath to save to when done as
-        a spots file.
+    :param spots_filepath: The filepath (or None) to save to
+        when done as a spots file.
     :param tracks_filepath: The filepath (or None) to as a
         tracks file.
     :param adjustment_coefficient: The amount that the loaded
@@ -286,79 +392,69 @@ def process_file(input_filepath: str, spots_filepath: str,
         match the original file.
     '''
 
-    # Load input
-    text: str = ''
-    with open(input_filepath, 'rb') as file:
-        text = file.read().decode()
+    # Deferred, since these modules depend on this one
+    from speckle.parsing import parse_speckle_bytes, threshold_durations, \
+        SpeckleArrays
+    from speckle.track_table import TrackTable, TrackMetrics
+    from speckle.cache import load_speckle_arrays
 
-    # Process
-    text = text.replace('\t', ',')
-    text = text.replace('\n', ',\n')
+    arrays: Optional[SpeckleArrays] = None
 
-    while ',,' in text:
-        text = text.replace(',,', ',')
+    # If requested, save spots
+    if spots_filepath is not None:
 
-    # print(text,'\n\n')
+        # Load input
+        raw: bytes = b''
+        with open(input_filepath, 'rb') as file:
+            raw = file.read()
 
-    # Save spots
-    with open(spots_filepath, 'w', encoding='utf8') as file:
-        file.write(text)
+        # Process: Tabs become commas, each line ends in a comma,
+        # and runs of commas are collapsed.
+        text: str = raw.decode()
+        text = text.replace('\t', ',')
+        text = text.replace('\n', ',\n')
+        text = sub(',,+', ',', text)
 
-    # If requested, save tracks
-    if tracks_filepath is not None:
+        with open(spots_filepath, 'w', encoding='utf8') as file:
+            file.write(text)
 
-        # Load data
-        frame: pd.DataFrame = pd.read_csv(spots_filepath)
+        arrays = parse_speckle_bytes(raw)
 
-        tracks: List[Track] = []
-        cur_track: Track = Track([], [], [])
-
-        is_first: bool = True
-        for row in frame.iterrows():
-            if is_first:
-                is_first = False
-                continue
+    # If requested, save tracks
+    if tracks_filepath is not None:
 
-            if 'stop speckle' in row[0][0]:
-                tracks.append(cur_track)
-            elif 'start speckle' in row[0][0]:
-                cur_track = Track([], [], [])
-            else:
-                cur_track.append(float(row[0][0]), float(
-                    row[0][1]), int(row[0][2]))
+        if arrays is None:
+            arrays = load_speckle_arrays(input_filepath)
 
         # Remove tracks below the duration threshold
-        tracks = [track for track in tracks if track.duration() >=
-                  duration_threshold]
+        table: TrackTable = TrackTable(*threshold_durations(
+            arrays, duration_threshold))
 
-        # Process into array
-        arr: List[List[Union[str, float, int]]] = []
-        cur: List[Union[str, float, int]] = []
+        # Refuse to save an empty tracks file
+        if len(table) == 0:
+            raise RuntimeError(f'File {tracks_filepath} (from',
+                               f'{input_filepath}) is empty!')
+
+        # Compute all metrics at once
+        metrics: TrackMetrics = table.metrics()
 
         labels: List[str] = ['TRACK_INDEX', 'TRACK_DURATION',
                              'TRACK_DISPLACEMENT', 'MEAN_STRAIGHT_LINE_SPEED',
                              'MEAN_SQUARED_DISPLACEMENT']
 
-        # And 3 dummy rows (see above)
-        dummy: List[Union[str, float, int]] = ['_' for _ in labels]
-        arr.append(dummy)
-        arr.append(dummy)
-        arr.append(dummy)
-
-        # Followed by real track data
-        if not tracks:
-            raise RuntimeError(f'File {tracks_filepath} (from',
-                               f'{input_filepath}) is empty!')
-
-        for k, cur_track in enumerate(tracks):
-            cur = [k,
-                   cur_track.duration(),
-                   cur_track.displacement() * adjustment_coefficient,
-                   cur_track.sls() * adjustment_coefficient,
-                   cur_track.msd() * (adjustment_coefficient ** 2)]
-
-            arr.append(cur)
+        # A header, 3 dummy rows (see above), then the real track
+        # data. Rows are numbered as `pandas.DataFrame.to_csv`
+        # would.
+        lines: List[str] = [',' + ','.join(labels)]
+        lines += [f'{i},' + ','.join('_' for _ in labels) for i in range(3)]
+        lines += [
+            f'{k + 3},{k},{duration},{displacement},{sls},{msd}'
+            for k, (duration, displacement, sls, msd) in enumerate(zip(
+                metrics.duration.tolist(),
+                (metrics.displacement * adjustment_coefficient).tolist(),
+                (metrics.sls * adjustment_coefficient).tolist(),
+                (metrics.msd * (adjustment_coefficient ** 2)).tolist()))]
 
         # Save as csv
-        df: pd.DataFrame = pd.DataFrame(arr, columns=labels)
-        df.to_csv(tracks_filepath)
+        with open(tracks_filepath, 'w', encoding='utf8') as file:
+            file.write('\n'.join(lines) + '\n')
@@ -0,0 +1,216 @@
+'''
+An out-of-core, memory-mapped columnar store for many speckle
+files at once. Each column is a flat binary file in the store's
+folder:
+
+- `x.f64`, `y.f64`: The coordinates of every point
+- `frames.i64`: The frame number of every point
+- `offsets.i64`: The start of every track, plus the total number
+    of points (as in `TrackTable`)
+- `file_ids.i32`: The index of the source file of every track
+- `files.txt`: The source file paths, one per line
+
+These are opened with `numpy.memmap`, so an entire experiment
+folder can be analysed without loading it into memory. Tables
+and FreqFiles taken from a store are zero-copy views of the
+mapped columns.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+import os
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from speckle import speckle as sp
+from speckle.cache import load_speckle_arrays
+from speckle.parsing import threshold_durations
+from speckle.track_table import TrackTable, TrackMetrics
+from speckle.freq_file import FreqFile
+
+
+# The file name and type of each column
+COLUMNS: Dict[str, type] = {'x.f64': np.float64,
+                            'y.f64': np.float64,
+                            'frames.i64': np.int64,
+                            'offsets.i64': np.int64,
+                            'file_ids.i32': np.int32}
+
+FILES_LIST: str = 'files.txt'
+
+
+def build_store(where: str,
+                root: str,
+                matching: str = r'.*_speckles\.csv',
+                threshold: Optional[int] = None) -> int:
+    '''
+    Builds a store from every speckle file under `root`. Files
+    are parsed and written one at a time, so this never holds
+    more than one file in memory.
+
+    :param where: The folder to create the store in.
+    :param root: The folder to recursively search.
+    :param matching: The RegEx pattern which designates a
+        speckle file.
+    :param threshold: The duration threshold to apply. If None,
+        uses `speckle.speckle.duration_threshold`.
+    :returns: The number of files stored.
+    '''
+
+    if threshold is None:
+        threshold = sp.duration_threshold
+
+    os.makedirs(where, exist_ok=True)
+
+    paths: List[str] = []
+    sp.for_each_file(paths.append, root, matching)
+    paths.sort()
+
+    handles: Dict[str, BinaryIO] = {
+        name: open(os.path.join(where, name), 'wb') for name in COLUMNS}
+
+    try:
+        total: int = 0
+        handles['offsets.i64'].write(np.zeros(1, dtype=np.int64).tobytes())
+
+        for file_id, path in enumerate(paths):
+            x, y, frames, offsets = threshold_durations(
+                load_speckle_arrays(path), threshold)
+
+            handles['x.f64'].write(x.tobytes())
+            handles['y.f64'].write(y.tobytes())
+            handles['frames.i64'].write(frames.tobytes())
+            handles['offsets.i64'].write((offsets[1:] + total).tobytes())
+            handles['file_ids.i32'].write(
+                np.full(len(offsets) - 1, file_id, dtype=np.int32).tobytes())
+
+            total += int(offsets[-1])
+
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    with open(os.path.join(where, FILES_LIST), 'w', encoding='utf8') as file:
+        file.writelines(path + '\n' for path in paths)
+
+    return len(paths)
+
+
+class TrackStore:
+    '''
+    A read-only, memory-mapped view of a store built by
+    `build_store`.
+    '''
+
+    def __init__(self, where: str) -> None:
+        '''
+        Open the store in the given folder.
+
+        :param where: The folder of the store.
+        '''
+
+        self.where: str = where
+
+        columns: Dict[str, np.ndarray] = {}
+        for name, dtype in COLUMNS.items():
+            path: str = os.path.join(where, name)
+
+            # Zero-length files cannot be mapped
+            if os.path.getsize(path) == 0:
+                columns[name] = np.zeros(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(path, dtype=dtype, mode='r')
+
+        self.table: TrackTable = TrackTable(columns['x.f64'],
+                                            columns['y.f64'],
+                                            columns['frames.i64'],
+                                            columns['offsets.i64'])
+        self.file_ids: np.ndarray = columns['file_ids.i32']
+
+        with open(os.path.join(where, FILES_LIST), encoding='utf8') as file:
+            self.files: List[str] = file.read().splitlines()
+
+    def __len__(self) -> int:
+        '''
+        :returns: The number of files in this store.
+        '''
+
+        return len(self.files)
+
+    def track_range(self, file_id: int) -> Tuple[int, int]:
+        '''
+        :param file_id: The index of a source file.
+        :returns: The half-open range of its tracks.
+        '''
+
+        start, stop = np.searchsorted(self.file_ids, [file_id, file_id + 1])
+        return int(start), int(stop)
+
+    def sub_table(self, start: int, stop: int) -> TrackTable:
+        '''
+        Returns the given contiguous range of tracks as a table.
+        The point columns are views of the mapped files; only
+        the offsets are copied.
+
+        :param start: The first track to include.
+        :param stop: One past the last track to include.
+        :returns: A table of the given tracks.
+        '''
+
+        offsets: np.ndarray = self.table.offsets[start:stop + 1]
+        first: int = int(offsets[0])
+        last: int = int(offsets[-1])
+
+        return TrackTable(self.table.x[first:last],
+                          self.table.y[first:last],
+                          self.table.frames[first:last],
+                          offsets - first)
+
+    def freq_file(self, file_id: int) -> FreqFile:
+        '''
+        :param file_id: The index of a source file.
+        :returns: That file's tracks as a FreqFile.
+        '''
+
+        return FreqFile(path=self.files[file_id],
+                        table=self.sub_table(*self.track_range(file_id)))
+
+    def __iter__(self) -> Iterator[FreqFile]:
+        '''
+        :returns: An iterator over each file as a FreqFile.
+        '''
+
+        for file_id in range(len(self)):
+            yield self.freq_file(file_id)
+
+    def metrics(self, chunk_points: int = 1 << 22) -> TrackMetrics:
+        '''
+        Computes the metrics of every track in the store. This
+        is done a chunk of tracks at a time, so the temporary
+        arrays stay bounded regardless of the store's size.
+
+        :param chunk_points: The approximate number of points to
+            process at once.
+        :returns: The metrics of every track in the store.
+        '''
+
+        offsets: np.ndarray = self.table.offsets
+        parts: List[TrackMetrics] = []
+
+        start: int = 0
+        while start < len(self.table):
+
+            # Take whole tracks until the chunk is full
+            stop: int = int(np.searchsorted(
+                offsets, offsets[start] + chunk_points, side='right')) - 1
+            stop = min(max(stop, start + 1), len(self.table))
+
+            parts.append(self.sub_table(start, stop).metrics())
+            start = stop
+
+        if not parts:
+            return TrackTable().metrics()
+
+        return TrackMetrics(*(np.concatenate(columns)
+                              for columns in zip(*parts)))
@@ -0,0 +1,37 @@
+'''
+Shared pytest setup for the speckle tests.
+
+Jordan Dehmel, 2024
+'''
+
+import os
+from typing import Iterator, Optional
+import pytest
+from speckle import cache
+
+
+@pytest.fixture(autouse=True, scope='session')
+def private_cache(tmp_path_factory: pytest.TempPathFactory) -> Iterator[str]:
+    '''
+    Points the parse cache (see `speckle.cache`) at a temporary
+    folder for the whole session, so that testing never writes
+    to the user's real cache. Subprocesses inherit it via the
+    SPECKLE_CACHE environment variable.
+
+    :returns: The temporary cache folder.
+    '''
+
+    old_folder: str = cache.cache_folder
+    old_environ: Optional[str] = os.environ.get('SPECKLE_CACHE')
+
+    folder: str = str(tmp_path_factory.mktemp('cache'))
+    cache.cache_folder = folder
+    os.environ['SPECKLE_CACHE'] = folder
+
+    yield folder
+
+    cache.cache_folder = old_folder
+    if old_environ is None:
+        del os.environ['SPECKLE_CACHE']
+    else:
+        os.environ['SPECKLE_CACHE'] = old_environ
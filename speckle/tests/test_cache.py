@@ -0,0 +1,141 @@
+'''
+Tests the speckle.cache module, which caches parsed files on
+disk.
+
+Jordan Dehmel, 2024
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import speckle as s
+from speckle import cache
+
+
+class TestCache(unittest.TestCase):
+    '''
+    Tests the on-disk parse cache.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Point the cache at a fresh folder, and copy the testing
+        files somewhere they can be modified.
+        '''
+
+        self.__old_folder: str = cache.cache_folder
+        self.__root: str = tempfile.mkdtemp()
+
+        cache.cache_folder = os.path.join(self.__root, 'cache')
+
+        self.speckles: str = os.path.join(self.__root, 'a_speckles.csv')
+        self.tracks: str = os.path.join(self.__root, 'a_tracks.csv')
+
+        shutil.copy('tests/test.speckles.csv.testcase', self.speckles)
+        shutil.copy('tests/test.tracks.csv.testcase', self.tracks)
+
+    def tearDown(self) -> None:
+        '''
+        Restore the cache settings and erase the testing files.
+        '''
+
+        cache.cache_folder = self.__old_folder
+        cache.hash_contents = False
+        shutil.rmtree(self.__root)
+
+    def test_speckles(self) -> None:
+        '''
+        Tests that speckle arrays are cached and match a fresh
+        parse.
+        '''
+
+        first = cache.load_speckle_arrays(self.speckles)
+
+        self.assertTrue(os.path.exists(
+            cache.cache_path(self.speckles, 'speckles')))
+
+        second = cache.load_speckle_arrays(self.speckles)
+
+        for fresh, loaded in zip(s.parse_speckle_file(self.speckles),
+                                 second):
+            self.assertTrue(np.array_equal(fresh, loaded))
+
+        self.assertEqual(len(first[3]), len(second[3]))
+
+    def test_invalidation(self) -> None:
+        '''
+        Tests that modifying a file invalidates its cache entry.
+        '''
+
+        count, _ = cache.load_tracks_columns(self.tracks)
+        self.assertEqual(count, 46)
+
+        # Drop the last line of the file
+        with open(self.tracks, 'rb') as file:
+            lines = file.readlines()
+        with open(self.tracks, 'wb') as file:
+            file.writelines(lines[:-1])
+
+        count, columns = cache.load_tracks_columns(self.tracks)
+        self.assertEqual(count, 45)
+        self.assertEqual(len(columns['TRACK_DURATION']), 45)
+
+    def test_hash_contents(self) -> None:
+        '''
+        Tests that content hashing changes the fingerprint.
+        '''
+
+        plain: str = cache.fingerprint(self.tracks, 'tracks')
+        cache.hash_contents = True
+        hashed: str = cache.fingerprint(self.tracks, 'tracks')
+
+        self.assertTrue(hashed.startswith(plain))
+        self.assertNotEqual(hashed, plain)
+
+    def test_corrupt(self) -> None:
+        '''
+        Tests that a corrupt cache entry is silently rebuilt.
+        '''
+
+        os.makedirs(cache.cache_folder)
+        with open(cache.cache_path(self.tracks, 'tracks'), 'wb') as file:
+            file.write(b'garbage')
+
+        count, _ = cache.load_tracks_columns(self.tracks)
+        self.assertEqual(count, 46)
+
+    def test_prune(self) -> None:
+        '''
+        Tests that archives of removed files are pruned, and that
+        the size cap evicts the least recently used archives.
+        '''
+
+        cache.load_tracks_columns(self.tracks)
+        cache.load_speckle_arrays(self.speckles)
+
+        tracks_cache: str = cache.cache_path(self.tracks, 'tracks')
+        speckles_cache: str = cache.cache_path(self.speckles, 'speckles')
+
+        self.assertEqual(cache.prune(), 0)
+        sizes: int = os.path.getsize(tracks_cache) \
+            + os.path.getsize(speckles_cache)
+
+        os.remove(self.speckles)
+        self.assertEqual(cache.prune(), 1)
+        self.assertTrue(os.path.exists(tracks_cache))
+        self.assertFalse(os.path.exists(speckles_cache))
+
+        # Writing past the cap evicts the oldest archive
+        shutil.copy('tests/test.speckles.csv.testcase', self.speckles)
+        os.utime(tracks_cache, (0, 0))
+        cache.cache_limit = sizes - 1
+
+        try:
+            cache.load_speckle_arrays(self.speckles)
+        finally:
+            cache.cache_limit = 1 << 30
+
+        self.assertFalse(os.path.exists(tracks_cache))
+        self.assertTrue(os.path.exists(speckles_cache))
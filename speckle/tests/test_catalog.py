@@ -0,0 +1,125 @@
+'''
+Tests the speckle.catalog module, which classifies the files in
+an experiment folder.
+
+Jordan Dehmel, 2024
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from typing import List, Optional, Tuple
+from speckle import catalog
+
+
+class TestClassify(unittest.TestCase):
+    '''
+    Tests the classification of single paths.
+    '''
+
+    def test_classify(self) -> None:
+        '''
+        Tests that every field is found in a path.
+        '''
+
+        entry: Optional[catalog.CatalogEntry] = catalog.classify(
+            '/data/9010/8v/t0.5khz2_tracks.csv', 1.0)
+
+        self.assertEqual(entry, catalog.CatalogEntry(
+            '/data/9010/8v/t0.5khz2_tracks.csv', '9010', 8.0, 500.0, 2,
+            'tracks', 1.0))
+
+        entry = catalog.classify('/data/bot+25/12V/control3_speckles.csv')
+        assert entry is not None
+
+        self.assertEqual(entry.height, 'bot+25')
+        self.assertEqual(entry.voltage, 12.0)
+        self.assertEqual(entry.frequency, 0.0)
+        self.assertEqual(entry.replicate, 3)
+        self.assertEqual(entry.kind, 'speckles')
+
+        entry = catalog.classify('/data/top/1khz_tracks.csv.filtered.csv')
+        assert entry is not None
+
+        self.assertEqual(entry.height, 'top')
+        self.assertIsNone(entry.voltage)
+        self.assertEqual(entry.frequency, 1000.0)
+        self.assertEqual(entry.kind, 'filtered')
+
+        self.assertIsNone(catalog.classify('/data/top/notes.txt'))
+
+    def test_frequencies(self) -> None:
+        '''
+        Tests frequency parsing and labelling.
+        '''
+
+        self.assertEqual(catalog.parse_frequency('0.5khz'), (500.0, 0))
+        self.assertEqual(catalog.parse_frequency('800 hz'), (800.0, 0))
+        self.assertEqual(catalog.parse_frequency('Control2'), (0.0, 2))
+        self.assertIsNone(catalog.parse_frequency('nothing'))
+
+        for label in ['0khz', '0.5khz', '1khz', '100khz']:
+            parsed: Optional[Tuple[float, int]] = \
+                catalog.parse_frequency(label)
+            assert parsed is not None
+            self.assertEqual(catalog.frequency_label(parsed[0]), label)
+
+
+class TestCatalog(unittest.TestCase):
+    '''
+    Tests scanning and querying a folder.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Create an experiment folder.
+        '''
+
+        self.__root: str = os.path.realpath(tempfile.mkdtemp())
+        self.files: List[str] = ['top/8v/control_tracks.csv',
+                                 'top/8v/1khz_tracks.csv',
+                                 'top/8v/1khz_speckles.csv',
+                                 'bot/8v/1khz_tracks.csv',
+                                 'bot/8v/readme.txt',
+                                 'graphs/1khz_tracks.csv']
+
+        for name in self.files:
+            path: str = os.path.join(self.__root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(path, 'w', encoding='utf8') as file:
+                file.write('foobar')
+
+    def tearDown(self) -> None:
+        '''
+        Erase the testing files.
+        '''
+
+        shutil.rmtree(self.__root)
+
+    def test_scan(self) -> None:
+        '''
+        Tests that scanning finds every known file, and that
+        queries select the right ones.
+        '''
+
+        found: catalog.Catalog = catalog.Catalog.scan(self.__root)
+
+        self.assertEqual(len(found), 4)
+        self.assertEqual(found.frequencies(), [0.0, 1000.0])
+
+        tracks: catalog.Catalog = found.select(kind='tracks', frequency=1000.0)
+        self.assertEqual(sorted(entry.height for entry in tracks),
+                         ['bot', 'top'])
+
+        top: catalog.Catalog = found.select(
+            within=os.path.join(self.__root, 'top'))
+        self.assertEqual(len(top), 3)
+        self.assertEqual(top.folders(),
+                         [os.path.join(self.__root, 'top', '8v')])
+        self.assertEqual(len(top.select(within=os.path.join(self.__root,
+                                                            'top'),
+                                        directly=True)), 0)
+
+        self.assertEqual(len(found.to_frame()), 4)
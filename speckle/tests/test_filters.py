@@ -6,7 +6,8 @@ Jordan Dehmel, 2024
 '''
 
 import unittest
-from speckle import Track, BasicTrack, FreqFile
+import numpy as np
+from speckle import Track, BasicTrack, FreqFile, TrackMetrics
 from speckle import filters as f
 
 
@@ -68,3 +69,105 @@ class TestFilters(unittest.TestCase):
 
         self.assertEqual(self.basic.sls_mean(), self.normal.sls_mean())
         self.assertEqual(self.basic.sls_std(), self.normal.sls_std())
+
+    def test_sls_threshold_columns(self) -> None:
+        '''
+        Tests that the columnar sls threshold filter removes the
+        same tracks as the per-track one.
+        '''
+
+        self.assertEqual(
+            self.basic.filter(f.sls_threshold_columns, sls_threshold=10.0),
+            self.normal.filter(f.sls_threshold_filter, sls_threshold=10.0))
+
+        self.assertEqual([track.sls() for track in self.basic.tracks],
+                         [track.sls() for track in self.normal.tracks])
+
+
+class TestClipping(unittest.TestCase):
+    '''
+    Tests the column-vectorized filters in speckle.filters.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Setup for each test case.
+        '''
+
+        # The 10 is only an outlier once the 1000 is gone
+        self.values: np.ndarray = np.array([0.0] * 20 + [10.0, 1000.0])
+
+    def test_sigma_clip(self) -> None:
+        '''
+        Tests iteration, convergence and one-sided clipping.
+        '''
+
+        once: np.ndarray = f.sigma_clip(self.values)
+        self.assertEqual(once.tolist(), [False] * 21 + [True])
+
+        converged: np.ndarray = f.sigma_clip(self.values, iterations=None)
+        self.assertEqual(converged.tolist(), [False] * 20 + [True] * 2)
+
+        # A large tolerance stops as soon as the bounds settle
+        self.assertEqual(f.sigma_clip(self.values, iterations=None,
+                                      tolerance=1e9).tolist(),
+                         once.tolist())
+
+        self.assertFalse(f.sigma_clip(self.values, upper=None).any())
+
+        # Non-finite and already removed rows are always removed
+        values: np.ndarray = np.array([1.0, 2.0, np.nan, 3.0])
+        self.assertEqual(
+            f.sigma_clip(values, removed=values == 1.0).tolist(),
+            [True, False, True, False])
+
+    def test_columns(self) -> None:
+        '''
+        Tests that each column is clipped on its own statistics.
+        '''
+
+        columns: np.ndarray = np.stack([self.values,
+                                        self.values[::-1]], axis=1)
+        removed: np.ndarray = f.sigma_clip(columns)
+
+        self.assertEqual(removed.tolist(), [True] + [False] * 20 + [True])
+
+    def test_iqr_clip(self) -> None:
+        '''
+        Tests the IQR fences.
+        '''
+
+        values: np.ndarray = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0,
+                                       7.0, 8.0, 100.0, -100.0])
+
+        self.assertEqual(f.iqr_clip(values).tolist(),
+                         [False] * 8 + [True] * 2)
+        self.assertEqual(f.iqr_clip(values, lower=None).tolist(),
+                         [False] * 8 + [True, False])
+
+    def test_protocol(self) -> None:
+        '''
+        Tests the Brownian threshold and the mobility filter.
+        '''
+
+        control: np.ndarray = np.array([1.0, 3.0] * 5 + [100.0])
+
+        # The 100 is clipped, leaving mean 2 and std 1
+        self.assertEqual(f.brownian_threshold(control, k=2.0), 4.0)
+        self.assertEqual(f.brownian_threshold(control, k=0.0,
+                                              sigma=None), 120.0 / 11.0)
+
+        sls: np.ndarray = np.array([3.0] + [5.0, 6.0] * 5 + [50.0])
+        self.assertEqual(f.mobility_mask(sls, 4.0).tolist(),
+                         [True] + [False] * 10 + [True])
+        self.assertEqual(f.mobility_mask(sls, 4.0, sigma=None).tolist(),
+                         [True] + [False] * 11)
+
+        # The masks agree with the columnar threshold filter
+        metrics: TrackMetrics = TrackMetrics(*([sls] * 6))
+        self.assertEqual(
+            f.mobility_mask(sls, 4.0, sigma=None).tolist(),
+            f.sls_threshold_columns(metrics, sls_threshold=4.0).tolist())
+
+        with self.assertRaises(f.OverFilteringError):
+            f.brownian_threshold(np.array([np.nan]))
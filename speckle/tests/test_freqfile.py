@@ -8,9 +8,10 @@ Jordan Dehmel, 2024
 import unittest
 from hypothesis import given, strategies as some
 import os
-from typing import Any, Union
+from typing import Any, Literal, Tuple, Union
+import numpy as np
 import speckle as s
-from speckle import speckle_filter
+from speckle import speckle_filter, column_filter
 
 
 class TestFreqFile(unittest.TestCase):
@@ -50,6 +51,34 @@ class TestFreqFile(unittest.TestCase):
 
         _: str = repr(self.f)
 
+    def test_load_scale(self) -> None:
+        '''
+        Tests that loading with a scale matches loading without
+        one and scaling afterwards.
+        '''
+
+        folder: str = os.path.dirname(__file__)
+
+        cases: Tuple[Tuple[str, Literal['tracks', 'speckles']], ...] = (
+            ('test.tracks.csv.testcase', 'tracks'),
+            ('test.speckles.csv.testcase', 'speckles'))
+
+        for name, file_format in cases:
+            path: str = os.path.join(folder, name)
+
+            plain: s.FreqFile = s.load_frequency_file(path, file_format)
+            scaled: s.FreqFile = s.load_frequency_file(path, file_format,
+                                                       scale=2.5)
+
+            self.assertEqual(len(plain.tracks), len(scaled.tracks))
+
+            for before, after in zip(plain.tracks, scaled.tracks):
+                self.assertEqual(before.duration(), after.duration())
+                self.assertAlmostEqual(before.sls() * 2.5, after.sls())
+                self.assertAlmostEqual(before.displacement() * 2.5,
+                                       after.displacement())
+                self.assertAlmostEqual(before.msd() * 6.25, after.msd())
+
     def test_erasure(self) -> None:
         '''
         Tests the methods surrounding track erasure for
@@ -82,6 +111,62 @@ class TestFreqFile(unittest.TestCase):
 
         self.assertEqual(len(self.f.tracks), 0)
 
+    def test_masks(self) -> None:
+        '''
+        Tests columnar filters, erasure by mask, and changes to
+        the tracks of a filtered file.
+        '''
+
+        @column_filter
+        def slow(metrics: s.TrackMetrics, **kwargs: Any) -> np.ndarray:
+            return np.asarray(metrics.sls < kwargs['below'])
+
+        backup = self.f.tracks[:]
+
+        self.assertEqual(self.f.filter(slow, below=2.5), (2, 2))
+        self.assertEqual(self.f.tracks, backup[:2])
+        self.assertEqual(self.f.erased, backup[2:])
+
+        # Masks apply to the remaining tracks only
+        self.assertEqual(self.f.erase(np.array([True, False])), (1, 1))
+        self.assertEqual(self.f.tracks, [backup[1]])
+        self.assertEqual(self.f.erased, backup[2:] + [backup[0]])
+
+        # The tracks may be edited in place
+        added: s.BasicTrack = s.BasicTrack(1, 1.0, 1.0, 1.0)
+        self.f.tracks.append(added)
+        self.assertEqual(self.f.sls_mean(), 2.0)
+
+        self.f.tracks[0] = backup[3]
+        self.f.tracks += [backup[1]]
+
+        # Restored tracks are appended, in the order they were
+        # erased
+        self.f.restore_erased()
+        self.assertEqual(self.f.erased, [])
+        self.assertEqual(self.f.tracks, [backup[3], added, backup[1],
+                                         backup[2], backup[3], backup[0]])
+
+        self.f.erase(np.array([False, True, True, False, False, False]))
+        self.assertEqual(self.f.purge_erased(), [added, backup[1]])
+        self.assertEqual(self.f.erased, [])
+
+        self.f.restore_erased()
+        self.assertEqual(self.f.tracks, [backup[3], backup[2], backup[3],
+                                         backup[0]])
+
+        # Replacing the tracks leaves erased ones as they are, and
+        # drops any restored ones not yet used
+        self.f.erase(np.array([True, False, False, False]))
+        self.f.tracks = [added]
+        self.f.restore_erased()
+        self.assertEqual(self.f.tracks, [added, backup[3]])
+
+        self.f.erase(np.array([True, False]))
+        self.f.restore_erased()
+        self.f.tracks = []
+        self.assertEqual(self.f.tracks, [])
+
 
 class TestBasicTrack(unittest.TestCase):
     '''
@@ -0,0 +1,82 @@
+'''
+Tests the speckle.index module, which persists per-file
+statistics in an SQLite database.
+
+Jordan Dehmel, 2024
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional
+import numpy as np
+from speckle import cache
+from speckle.catalog import Catalog
+from speckle.index import FileIndex
+
+
+class TestFileIndex(unittest.TestCase):
+    '''
+    Tests the FileIndex class.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Create a folder with a tracks file and a filtered copy.
+        '''
+
+        self.__root: str = os.path.realpath(tempfile.mkdtemp())
+        self.tracks: str = os.path.join(self.__root, '1khz_tracks.csv')
+        self.filtered: str = self.tracks + '.filtered.csv'
+
+        source: str = os.path.join(os.path.dirname(__file__),
+                                   'test.tracks.csv.testcase')
+        shutil.copy(source, self.tracks)
+
+        with open(source, encoding='utf8') as file:
+            lines: List[str] = file.read().splitlines()
+
+        with open(self.filtered, 'w', encoding='utf8') as file:
+            file.write('\n'.join(lines[:14]) + '\n')
+
+    def tearDown(self) -> None:
+        '''
+        Erase the testing files.
+        '''
+
+        shutil.rmtree(self.__root)
+
+    def test_refresh(self) -> None:
+        '''
+        Tests that statistics match the file, and that files are
+        only reread when they change.
+        '''
+
+        with FileIndex(self.__root) as index:
+            self.assertEqual(index.refresh(Catalog.scan(self.__root)), 2)
+
+        count, columns = cache.load_tracks_columns(self.tracks)
+        speeds: np.ndarray = columns['MEAN_STRAIGHT_LINE_SPEED']
+
+        with FileIndex(self.__root) as index:
+            self.assertEqual(index.refresh(Catalog.scan(self.__root)), 0)
+
+            summary: Optional[Dict[str, Any]] = index.summary(self.tracks)
+            assert summary is not None
+
+            self.assertEqual(summary['count'], count)
+            self.assertEqual(summary['frequency'], 1000.0)
+            self.assertEqual(summary['sls_mean'], float(np.mean(speeds)))
+            self.assertEqual(summary['sls_std'],
+                             float(np.std(speeds, ddof=1)))
+            self.assertEqual(summary['sls_median'],
+                             float(np.median(speeds)))
+
+            self.assertEqual(index.survival(self.filtered), (10, count))
+            self.assertEqual(len(index.query('kind = ?', ('filtered',))), 1)
+
+            # Removed files are forgotten
+            os.remove(self.filtered)
+            self.assertEqual(index.refresh(Catalog.scan(self.__root)), 0)
+            self.assertIsNone(index.summary(self.filtered))
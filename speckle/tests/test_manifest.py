@@ -0,0 +1,78 @@
+'''
+Tests the speckle.manifest module, which tracks the inputs and
+parameters of each output for incremental rebuilds.
+
+Jordan Dehmel, 2024
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from speckle.manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+    '''
+    Tests the Manifest class.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Create an input and an output file.
+        '''
+
+        self.__root: str = tempfile.mkdtemp()
+        self.input: str = os.path.join(self.__root, 'in.csv')
+        self.output: str = os.path.join(self.__root, 'out.csv')
+
+        for path in [self.input, self.output]:
+            with open(path, 'w', encoding='utf8') as file:
+                file.write('foobar')
+
+    def tearDown(self) -> None:
+        '''
+        Erase the testing files.
+        '''
+
+        shutil.rmtree(self.__root)
+
+    def test_up_to_date(self) -> None:
+        '''
+        Tests that outputs are only up to date when nothing they
+        depend on has changed, and that this persists.
+        '''
+
+        manifest: Manifest = Manifest(self.__root)
+
+        self.assertIsNone(manifest.up_to_date(self.output, [self.input],
+                                              {'k': 1}))
+
+        manifest.record(self.output, [self.input], {'k': 1}, {'n': 5})
+        manifest.save()
+
+        reloaded: Manifest = Manifest(self.__root)
+
+        self.assertEqual(reloaded.up_to_date(self.output, [self.input],
+                                             {'k': 1}), {'n': 5})
+        self.assertIsNone(reloaded.up_to_date(self.output, [self.input],
+                                              {'k': 2}))
+
+        # Changing the input invalidates the output
+        with open(self.input, 'a', encoding='utf8') as file:
+            file.write('baz')
+
+        self.assertIsNone(reloaded.up_to_date(self.output, [self.input],
+                                              {'k': 1}))
+
+    def test_missing_output(self) -> None:
+        '''
+        Tests that a deleted output is never up to date.
+        '''
+
+        manifest: Manifest = Manifest(self.__root)
+        manifest.record(self.output, [self.input], {})
+
+        os.remove(self.output)
+
+        self.assertIsNone(manifest.up_to_date(self.output, [self.input], {}))
@@ -0,0 +1,82 @@
+'''
+Tests the speckle.matching module.
+
+Jordan Dehmel, 2024
+'''
+
+import re
+import unittest
+from typing import Dict, List, Optional, Tuple
+from hypothesis import given, strategies as some
+from speckle import matching
+from speckle.matching import PatternMatcher, matcher_for
+
+
+class TestPatternMatcher(unittest.TestCase):
+    '''
+    Tests the PatternMatcher class.
+    '''
+
+    patterns: List[str] = [r'(((?<![0-9])0 ?khz|control).*track|t0 ?khz)',
+                           r'1 ?khz', r'(?<![0-9])5 ?khz', r'top(?!-)',
+                           r'bot\+25']
+
+    def test_matches(self) -> None:
+        '''
+        Tests that every pattern is found as `re.search` would.
+        '''
+
+        matcher: PatternMatcher = PatternMatcher(self.patterns)
+
+        self.assertEqual(matcher.matches('control_tracks.csv'), (0,))
+        self.assertEqual(matcher.matches('t1khz_5khz.csv'), (1, 2))
+        self.assertEqual(matcher.matches('15khz'), ())
+        self.assertEqual(matcher.first('a/top/bot+25/x'), 3)
+        self.assertIsNone(matcher.first('top-25'))
+
+        self.assertIs(matcher_for(tuple(self.patterns)),
+                      matcher_for(tuple(self.patterns)))
+
+        @given(some.text(alphabet='015 khzcontrlaop-+bt/\n'))
+        def test_on_value(value: str) -> None:
+            found: Tuple[int, ...] = tuple(
+                i for i, pattern in enumerate(self.patterns)
+                if re.search(pattern, value))
+
+            self.assertEqual(matcher.matches(value), found)
+            self.assertEqual(matcher.first(value),
+                             found[0] if found else None)
+
+        test_on_value()
+
+    def test_first(self) -> None:
+        '''
+        Tests that the first pattern in the list wins, wherever
+        in the name it is found, and that results are cached
+        only up to the limit.
+        '''
+
+        matcher: PatternMatcher = PatternMatcher(self.patterns)
+
+        self.assertEqual(matcher.first('bot+25/top/5khz'), 2)
+        self.assertEqual(matcher.first('bot+25\ntop'), 3)
+        self.assertEqual(matcher.first('control\ntracks'), None)
+        self.assertEqual(matcher.matches('control\ntracks'), ())
+
+        for i in range(matching.CACHE_SIZE + 10):
+            self.assertEqual(matcher.first(f'top{i}'), 3)
+
+        firsts: Dict[str, Optional[int]] = \
+            getattr(matcher, '_PatternMatcher__firsts')
+        self.assertEqual(len(firsts), matching.CACHE_SIZE)
+
+    def test_uncombinable(self) -> None:
+        '''
+        Tests patterns which cannot be combined into one.
+        '''
+
+        matcher: PatternMatcher = PatternMatcher([r'(?P<x>a)', r'(?P<x>b)'])
+
+        self.assertEqual(matcher.matches('ab'), (0, 1))
+        self.assertEqual(matcher.matches('b'), (1,))
+        self.assertEqual(matcher.first('ba'), 0)
@@ -0,0 +1,111 @@
+'''
+Tests the speckle.parsing module, which parses speckle files
+directly into columnar arrays.
+
+Jordan Dehmel, 2024
+'''
+
+import unittest
+import numpy as np
+import speckle as s
+
+
+class TestParsing(unittest.TestCase):
+    '''
+    Tests the single-pass speckle file parser.
+    '''
+
+    text: bytes = (b'#speckles csv ver 1.2\n'
+                   b'#x(double)\ty(double)\tsize(double)\tframe(int)\t'
+                   b'type(int)\n'
+                   b'#%start speckle%\n'
+                   b'0.0\t0.0\t1\n'
+                   b'3.0\t4.0\t2\n'
+                   b'#%stop speckle%\n'
+                   b'#%start speckle%\n'
+                   b'#%stop speckle%\n'
+                   b'#%start speckle%\n'
+                   b'1.5\t2.5\t7\t0.0\t1\n'
+                   b'#%stop speckle%\n'
+                   b'#%start speckle%\n'
+                   b'9.0\t9.0\t9\n')
+
+    def test_parse_speckle_bytes(self) -> None:
+        '''
+        Tests that points, offsets and extra columns are handled
+        correctly, and that empty or unterminated tracks are
+        dropped.
+        '''
+
+        x, y, frames, offsets = s.parse_speckle_bytes(self.text)
+
+        self.assertEqual(x.tolist(), [0.0, 3.0, 1.5])
+        self.assertEqual(y.tolist(), [0.0, 4.0, 2.5])
+        self.assertEqual(frames.tolist(), [1, 2, 7])
+        self.assertEqual(offsets.tolist(), [0, 2, 3])
+
+    def test_threshold_durations(self) -> None:
+        '''
+        Tests the vectorized duration thresholding.
+        '''
+
+        arrays = s.parse_speckle_bytes(self.text)
+
+        self.assertEqual(s.track_durations(arrays[2],
+                                           arrays[3]).tolist(), [2, 1])
+
+        x, _, frames, offsets = s.threshold_durations(arrays, 2)
+
+        self.assertEqual(x.tolist(), [0.0, 3.0])
+        self.assertEqual(frames.tolist(), [1, 2])
+        self.assertEqual(offsets.tolist(), [0, 2])
+
+        self.assertEqual(len(s.threshold_durations(arrays, 3)[3]), 1)
+
+    def test_empty(self) -> None:
+        '''
+        Tests a file with no tracks at all.
+        '''
+
+        x, _, _, offsets = s.parse_speckle_bytes(b'#a\n#b\n')
+
+        self.assertEqual(len(x), 0)
+        self.assertTrue(np.array_equal(offsets, [0]))
+
+    def test_parse_tracks_file(self) -> None:
+        '''
+        Tests loading a "tracks"-formatted file into typed
+        columns.
+        '''
+
+        count, columns = s.parse_tracks_file(
+            'tests/test.tracks.csv.testcase')
+
+        self.assertEqual(count, 46)
+        self.assertEqual(columns['TRACK_DURATION'].dtype, np.int64)
+        self.assertEqual(columns['MEAN_STRAIGHT_LINE_SPEED'].dtype,
+                         np.float64)
+        self.assertEqual(columns['TRACK_DURATION'][0], 121)
+        self.assertEqual(columns['MEAN_STRAIGHT_LINE_SPEED'][1],
+                         0.47847253417726104)
+        self.assertEqual(len(columns), 4)
+
+    def test_iter_speckle_tracks(self) -> None:
+        '''
+        Tests that streaming yields the same tracks as parsing
+        the whole file, even with tiny blocks.
+        '''
+
+        path: str = 'tests/test.speckles.csv.testcase'
+        table: s.TrackTable = s.TrackTable(
+            *s.threshold_durations(s.parse_speckle_file(path), 100))
+
+        for block_size in [7, 1 << 16]:
+            streamed = list(s.iter_speckle_tracks(path, 100, block_size))
+
+            self.assertEqual(len(streamed), len(table))
+
+            for track, copy in zip(streamed, table.to_tracks()):
+                self.assertEqual(track.x_values, copy.x_values)
+                self.assertEqual(track.y_values, copy.y_values)
+                self.assertEqual(track.frames, copy.frames)
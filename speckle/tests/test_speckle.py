@@ -115,6 +115,30 @@ class TestTrack(unittest.TestCase):
 
         self.assertEqual(s.Track([0.0], [0.0], [0]).msd(), 0.0)
 
+    def test_cache(self) -> None:
+        '''
+        Tests that metrics are cached, and that the cache is
+        cleared when the track is modified.
+        '''
+
+        t: s.Track = s.Track([0.0, 3.0], [0.0, 4.0], [0, 1])
+
+        self.assertFalse(hasattr(t, '__dict__'))
+        self.assertAlmostEqual(t.sls(), 5.0, 5)
+        self.assertAlmostEqual(t.displacement(), 5.0, 5)
+
+        # Direct modification is not noticed until cleared
+        t.x_values[1] = 6.0
+        t.y_values[1] = 8.0
+        self.assertAlmostEqual(t.displacement(), 5.0, 5)
+        t.clear_cache()
+        self.assertAlmostEqual(t.displacement(), 10.0, 5)
+
+        # Appending clears the cache automatically
+        t.append(0.0, 0.0, 2)
+        self.assertAlmostEqual(t.displacement(), 0.0, 5)
+        self.assertAlmostEqual(t.mdts(), 10.0, 5)
+
 
 class TestMiscSpeckleFunctions(unittest.TestCase):
     '''
@@ -206,6 +230,33 @@ class TestMiscSpeckleFunctions(unittest.TestCase):
 
         s.for_each_dir(log_dir)
 
+    def test_walk(self) -> None:
+        '''
+        Tests speckle.walk, including deduplication and pruning
+        '''
+
+        os.mkdir('graphs')
+        os.mkdir('.hidden')
+        for name in ('graphs/g.txt', '.hidden/h.txt'):
+            with open(name, 'wb') as f:
+                f.write(b'foobar')
+
+        os.symlink('a.txt', 'C/D/link.txt')
+
+        files: List[str] = list(s.walk('.', r'.*\.txt'))
+        names: List[str] = [os.path.basename(path) for path in files]
+
+        # The link is the same file as a.txt
+        self.assertEqual(sorted(names), ['a.txt', 'b.txt', 'c.txt'])
+        self.assertTrue(all(os.path.isabs(path) for path in files))
+
+        dirs: List[str] = [os.path.relpath(path)
+                           for path in s.walk('.', directories=True)]
+        self.assertEqual(sorted(dirs), sorted(self.folders))
+
+        # Nothing is pruned if asked
+        self.assertEqual(len(list(s.walk('.', r'.*\.txt', prune='$^'))), 5)
+
     def test_reformat_avi(self) -> None:
         '''
         Tests speckle.reformat_avi
@@ -221,6 +272,15 @@ class TestMiscSpeckleFunctions(unittest.TestCase):
 
         s.process_file(self.speckles_path, 'spots.csv', 'tracks.csv')
 
+        # Without a spots file, the tracks should be identical
+        s.process_file(self.speckles_path, None, 'tracks2.csv')
+
+        with open('tracks.csv', 'rb') as a, open('tracks2.csv', 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+        loaded: s.FreqFile = s.load_frequency_file('tracks.csv')
+        self.assertEqual(len(loaded.tracks), 48)
+
     def test_load_frequency_file(self) -> None:
         '''
         Tests load_frequency_file from freq_file.py.
@@ -0,0 +1,88 @@
+'''
+Tests the speckle.store module, a memory-mapped columnar store
+for many speckle files.
+
+Jordan Dehmel, 2024
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import speckle as s
+from speckle import store
+
+
+class TestStore(unittest.TestCase):
+    '''
+    Tests building and reading a TrackStore.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Create a folder holding two copies of the testing speckle
+        file, and build a store from it.
+        '''
+
+        self.__root: str = tempfile.mkdtemp()
+        self.data: str = os.path.join(self.__root, 'data')
+        self.where: str = os.path.join(self.__root, 'store')
+
+        os.mkdir(self.data)
+        for name in ['a_speckles.csv', 'b_speckles.csv']:
+            shutil.copy('tests/test.speckles.csv.testcase',
+                        os.path.join(self.data, name))
+
+        self.count: int = store.build_store(self.where, self.data,
+                                            threshold=10)
+        self.store: store.TrackStore = store.TrackStore(self.where)
+
+    def tearDown(self) -> None:
+        '''
+        Erase the testing files.
+        '''
+
+        del self.store
+        shutil.rmtree(self.__root)
+
+    def test_layout(self) -> None:
+        '''
+        Tests the contents of the store.
+        '''
+
+        self.assertEqual(self.count, 2)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(len(self.store.table), 96)
+        self.assertEqual(self.store.track_range(1), (48, 96))
+        self.assertFalse(self.store.table.x.flags.owndata)
+
+    def test_freq_file(self) -> None:
+        '''
+        Tests that a stored file matches one loaded directly,
+        and that its points are not copied.
+        '''
+
+        loaded: s.FreqFile = s.load_frequency_file(
+            os.path.join(self.data, 'a_speckles.csv'), 'speckles')
+        stored: s.FreqFile = self.store.freq_file(1)
+
+        self.assertTrue(stored.path.endswith('b_speckles.csv'))
+        self.assertEqual(len(stored.tracks), len(loaded.tracks))
+        self.assertAlmostEqual(stored.sls_mean(), loaded.sls_mean(), 10)
+        self.assertAlmostEqual(stored.msd_std(), loaded.msd_std(), 6)
+
+        assert stored.table is not None
+        self.assertTrue(np.shares_memory(stored.table.x,
+                                         self.store.table.x))
+
+    def test_chunked_metrics(self) -> None:
+        '''
+        Tests that chunked metrics match whole-table metrics.
+        '''
+
+        whole: s.TrackMetrics = self.store.table.metrics()
+        chunked: s.TrackMetrics = self.store.metrics(chunk_points=500)
+
+        for a, b in zip(whole, chunked):
+            self.assertTrue(np.allclose(a, b))
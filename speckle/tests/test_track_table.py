@@ -0,0 +1,159 @@
+'''
+Tests the TrackTable columnar store and its TrackView objects.
+
+Jordan Dehmel, 2024
+'''
+
+import unittest
+from typing import List
+import numpy as np
+import speckle as s
+
+
+class TestTrackTable(unittest.TestCase):
+    '''
+    Tests the TrackTable class from speckle.track_table.
+    '''
+
+    def setUp(self) -> None:
+        '''
+        Set up a few tracks and a table holding copies of them.
+        '''
+
+        self.tracks: List[s.Track] = [
+            s.Track([0.0, -3.0, 3.0], [0.0, -4.0, 4.0], [0, 1, 2]),
+            s.Track([1.0, 2.0], [1.0, 1.0], [5, 7]),
+            s.Track([0.0, -20.0], [0.0, -20.0], [1, 2])]
+
+        self.table = s.TrackTable.from_tracks(self.tracks)
+
+    def test_layout(self) -> None:
+        '''
+        Tests that the points are stored contiguously.
+        '''
+
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(self.table.offsets.tolist(), [0, 3, 5, 7])
+        self.assertEqual(self.table.frames.tolist(), [0, 1, 2, 5, 7, 1, 2])
+        self.assertEqual(len(s.TrackTable()), 0)
+
+    def test_views(self) -> None:
+        '''
+        Tests that views give the same metrics as the original
+        tracks.
+        '''
+
+        for track, view in zip(self.tracks, self.table):
+            self.assertIsInstance(view, s.Track)
+            self.assertEqual(view.duration(), track.duration())
+            self.assertAlmostEqual(view.sls(), track.sls(), 10)
+            self.assertAlmostEqual(view.mdts(), track.mdts(), 10)
+            self.assertAlmostEqual(view.mv(), track.mv(), 10)
+            self.assertAlmostEqual(view.msd(), track.msd(), 10)
+            self.assertAlmostEqual(view.displacement(),
+                                   track.displacement(), 10)
+
+        self.assertEqual(self.table[-1].index, 2)
+
+        with self.assertRaises(IndexError):
+            _ = self.table[3]
+
+        with self.assertRaises(TypeError):
+            self.table[0].append(0.0, 0.0, 0)
+
+    def test_take(self) -> None:
+        '''
+        Tests selecting a subset of the table.
+        '''
+
+        sub: s.TrackTable = self.table.take(np.array([2, 0]))
+
+        self.assertEqual(sub.offsets.tolist(), [0, 2, 5])
+        self.assertEqual(sub.x.tolist(), [0.0, -20.0, 0.0, -3.0, 3.0])
+
+        masked: s.TrackTable = self.table.take(
+            self.table.lengths() == 2)
+
+        self.assertEqual(masked.frames.tolist(), [5, 7, 1, 2])
+
+        copies = masked.to_tracks()
+        self.assertEqual(copies[0].x_values, [1.0, 2.0])
+
+    def test_freq_file(self) -> None:
+        '''
+        Tests that a FreqFile can be built natively from a
+        table, and filtered as usual.
+        '''
+
+        f: s.FreqFile = s.FreqFile(table=self.table)
+
+        self.assertEqual(len(f.tracks), 3)
+        self.assertIs(f.table, self.table)
+        plain: s.FreqFile = s.FreqFile()
+        plain.tracks += self.tracks
+
+        self.assertAlmostEqual(f.sls_mean(), plain.sls_mean(), 10)
+
+    def test_metrics(self) -> None:
+        '''
+        Tests that the batch metrics match the per-track methods,
+        including for single-point tracks.
+        '''
+
+        tracks: List[s.Track] = self.tracks + [s.Track([4.0], [2.0], [9])]
+        metrics: s.TrackMetrics = s.TrackTable.from_tracks(tracks).metrics()
+
+        for i, track in enumerate(tracks):
+            self.assertEqual(metrics.duration[i], track.duration())
+            self.assertAlmostEqual(metrics.sls[i], track.sls(), 10)
+            self.assertAlmostEqual(metrics.mdts[i], track.mdts(), 10)
+            self.assertAlmostEqual(metrics.mv[i], track.mv(), 10)
+            self.assertAlmostEqual(metrics.msd[i], track.msd(), 10)
+            self.assertAlmostEqual(metrics.displacement[i],
+                                   track.displacement(), 10)
+
+        self.assertEqual(len(s.TrackTable().metrics().sls), 0)
+
+    def test_empty_tracks(self) -> None:
+        '''
+        Tests that empty tracks at the start, middle and end of
+        a table do not affect the metrics of the others.
+        '''
+
+        empty: s.Track = s.Track([], [], [])
+        moving: s.Track = s.Track([0.0, 1.0, 3.0], [0.0, 0.0, 0.0],
+                                  [0, 1, 2])
+        tracks: List[s.Track] = [empty, moving, empty, self.tracks[0],
+                                 empty]
+        metrics: s.TrackMetrics = s.TrackTable.from_tracks(tracks).metrics()
+
+        self.assertEqual(metrics.mdts[1], 1.5)
+        self.assertEqual(metrics.mv[1], 1.5)
+
+        for i, track in [(1, moving), (3, self.tracks[0])]:
+            self.assertEqual(metrics.duration[i], track.duration())
+            self.assertAlmostEqual(metrics.sls[i], track.sls(), 10)
+            self.assertAlmostEqual(metrics.mdts[i], track.mdts(), 10)
+            self.assertAlmostEqual(metrics.mv[i], track.mv(), 10)
+            self.assertAlmostEqual(metrics.msd[i], track.msd(), 10)
+
+        for i in [0, 2, 4]:
+            self.assertEqual(metrics.duration[i], 0)
+            self.assertEqual(metrics.mdts[i], 0.0)
+
+    def test_mixed_metrics(self) -> None:
+        '''
+        Tests FreqFile.metrics on a mix of views, plain tracks
+        and BasicTracks.
+        '''
+
+        f: s.FreqFile = s.FreqFile(table=self.table)
+        f.tracks.append(s.BasicTrack(4, 1.0, 0.25, 2.0))
+        f.tracks.append(self.tracks[0])
+
+        metrics: s.TrackMetrics = f.metrics()
+
+        self.assertEqual(metrics.duration.tolist(), [3, 3, 2, 4, 3])
+        self.assertEqual(metrics.sls[3], 0.25)
+        self.assertEqual(metrics.mv[3], -1.0)
+        self.assertAlmostEqual(metrics.sls[4], self.tracks[0].sls(), 10)
@@ -0,0 +1,330 @@
+'''
+Defines the class TrackTable, a columnar (struct-of-arrays)
+store for many speckle tracks at once. Rather than one Python
+`Track` holding three Python lists per particle, a TrackTable
+holds contiguous x, y and frame arrays for the whole file, plus
+a CSR-style offsets array such that track `i` occupies the
+half-open range `offsets[i]:offsets[i + 1]`.
+
+Individual tracks are still available as TrackView objects,
+which are read-only `Track`s backed by slices of the table.
+
+Per-track metrics (SLS, MDTS, MV, MSD, displacement, duration)
+are computed for the whole table at once by `TrackTable.metrics`
+using segment reductions, rather than one track at a time.
+
+Jordan Dehmel, 2024
+jedehmel@mavs.coloradomesa.edu
+jdehmel@outlook.com
+'''
+
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+import numpy as np
+from speckle.speckle import Track
+
+
+class TrackMetrics(NamedTuple):
+    '''
+    Per-track metrics for a set of tracks, with one entry per
+    track in each array. These match the methods of `Track`.
+    '''
+
+    duration: np.ndarray
+    displacement: np.ndarray
+    sls: np.ndarray
+    mdts: np.ndarray
+    mv: np.ndarray
+    msd: np.ndarray
+
+    def take(self, indices: np.ndarray) -> 'TrackMetrics':
+        '''
+        :param indices: The tracks to select (or a boolean
+            mask over them).
+        :returns: The metrics of only the given tracks.
+        '''
+
+        return TrackMetrics(*(column[indices] for column in self))
+
+
+class TrackTable:
+    '''
+    A columnar set of speckle tracks.
+    '''
+
+    def __init__(self,
+                 x: Optional[np.ndarray] = None,
+                 y: Optional[np.ndarray] = None,
+                 frames: Optional[np.ndarray] = None,
+                 offsets: Optional[np.ndarray] = None) -> None:
+        '''
+        Initialize a track table from flat columns. With no
+        arguments, this is an empty table.
+
+        :param x: The x coordinate of every point.
+        :param y: The y coordinate of every point.
+        :param frames: The frame number of every point.
+        :param offsets: The start of each track in the above,
+            followed by the total number of points.
+        '''
+
+        self.x: np.ndarray = np.ascontiguousarray(
+            x if x is not None else [], dtype=np.float64)
+        self.y: np.ndarray = np.ascontiguousarray(
+            y if y is not None else [], dtype=np.float64)
+        self.frames: np.ndarray = np.ascontiguousarray(
+            frames if frames is not None else [], dtype=np.int64)
+        self.offsets: np.ndarray = np.ascontiguousarray(
+            offsets if offsets is not None else [0], dtype=np.int64)
+
+        assert len(self.x) == len(self.y) == len(self.frames), \
+            'Column lengths must match'
+        assert len(self.offsets) >= 1 and self.offsets[0] == 0 \
+            and self.offsets[-1] == len(self.x), 'Invalid offsets'
+
+        self.__metrics: Optional[TrackMetrics] = None
+
+    @staticmethod
+    def from_tracks(tracks: Sequence[Track]) -> 'TrackTable':
+        '''
+        Builds a table by copying the given tracks.
+
+        :param tracks: The tracks to copy.
+        :returns: A table holding the same points.
+        '''
+
+        lengths: List[int] = [0] + [len(track.frames) for track in tracks]
+
+        if not tracks:
+            return TrackTable()
+
+        return TrackTable(
+            np.concatenate([track.x_values for track in tracks]),
+            np.concatenate([track.y_values for track in tracks]),
+            np.concatenate([track.frames for track in tracks]),
+            np.cumsum(lengths))
+
+    def __len__(self) -> int:
+        '''
+        :returns: The number of tracks in this table.
+        '''
+
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> 'TrackView':
+        '''
+        :param index: The index of the track to view.
+        :returns: A read-only view of the given track.
+        '''
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError(f'Track index {index} out of range')
+
+        return TrackView(self, index)
+
+    def __iter__(self) -> Iterator['TrackView']:
+        '''
+        :returns: An iterator over views of every track.
+        '''
+
+        for i in range(len(self)):
+            yield TrackView(self, i)
+
+    def lengths(self) -> np.ndarray:
+        '''
+        :returns: The number of points in each track.
+        '''
+
+        return np.diff(self.offsets)
+
+    def metrics(self) -> TrackMetrics:
+        '''
+        Computes every per-track metric for every track at
+        once. Per-step distances are computed with a single
+        `diff` over the whole table, and then summed within each
+        track with `reduceat`. The result is cached, since the
+        table is never modified.
+
+        :returns: The metrics of every track in this table.
+        '''
+
+        if self.__metrics is not None:
+            return self.__metrics
+
+        lengths: np.ndarray = self.lengths()
+        n: int = len(self)
+
+        # Tracks with fewer than 2 points have zero speeds, and
+        # empty ones are excluded from the reductions entirely.
+        moving: np.ndarray = lengths >= 2
+        nonempty: np.ndarray = lengths > 0
+
+        duration: np.ndarray = np.zeros(n, dtype=np.int64)
+        displacement: np.ndarray = np.zeros(n)
+        sls: np.ndarray = np.zeros(n)
+        mdts: np.ndarray = np.zeros(n)
+        mv: np.ndarray = np.zeros(n)
+        msd: np.ndarray = np.zeros(n)
+
+        if not nonempty.any():
+            self.__metrics = TrackMetrics(duration, displacement, sls,
+                                          mdts, mv, msd)
+            return self.__metrics
+
+        # Endpoints of each track. These are clamped so that
+        # empty tracks index safely, but are masked out below.
+        first: np.ndarray = np.minimum(self.offsets[:-1], len(self.x) - 1)
+        last: np.ndarray = np.maximum(self.offsets[1:] - 1, 0)
+
+        # Whole-track quantities only need the endpoints
+        df: np.ndarray = self.frames[last] - self.frames[first]
+        duration[nonempty] = df[nonempty] + 1
+        displacement[nonempty] = np.sqrt(
+            (self.x[last] - self.x[first])[nonempty] ** 2
+            + (self.y[last] - self.y[first])[nonempty] ** 2)
+        sls[moving] = displacement[moving] / df[moving]
+
+        # Step i goes from point i to point i + 1. Steps which
+        # cross from one track into the next are zeroed. Only
+        # real endpoints are used, since clamped ones from empty
+        # tracks may be the first step of another track.
+        steps: np.ndarray = np.zeros(len(self.x))
+        steps[:-1] = np.sqrt(np.diff(self.x) ** 2 + np.diff(self.y) ** 2)
+        steps[last[nonempty]] = 0.0
+
+        # Squared displacement of each point from its track's
+        # first point
+        origin_x: np.ndarray = np.repeat(self.x[first], lengths)
+        origin_y: np.ndarray = np.repeat(self.y[first], lengths)
+        squared: np.ndarray = np.hypot(self.x - origin_x,
+                                       self.y - origin_y) ** 2
+
+        starts: np.ndarray = first[nonempty]
+        travelled: np.ndarray = np.zeros(n)
+        travelled[nonempty] = np.add.reduceat(steps, starts)
+        squared_sum: np.ndarray = np.zeros(n)
+        squared_sum[nonempty] = np.add.reduceat(squared, starts)
+
+        mdts[moving] = travelled[moving] / df[moving]
+        mv[moving] = travelled[moving] / (lengths[moving] - 1)
+        msd[moving] = squared_sum[moving] / (lengths[moving] - 1)
+
+        self.__metrics = TrackMetrics(duration, displacement, sls,
+                                      mdts, mv, msd)
+        return self.__metrics
+
+    def take(self, indices: np.ndarray) -> 'TrackTable':
+        '''
+        Builds a new table holding only the given tracks, in
+        the given order. Also accepts a boolean mask over the
+        tracks.
+
+        :param indices: The tracks to keep.
+        :returns: A new, compacted table.
+        '''
+
+        indices = np.arange(len(self))[indices]
+        lengths: np.ndarray = self.lengths()[indices]
+
+        # The flat index of every point which is kept
+        starts: np.ndarray = np.repeat(self.offsets[:-1][indices], lengths)
+        within: np.ndarray = np.arange(lengths.sum()) - \
+            np.repeat(np.cumsum(lengths) - lengths, lengths)
+        points: np.ndarray = starts + within
+
+        return TrackTable(self.x[points],
+                          self.y[points],
+                          self.frames[points],
+                          np.concatenate(([0], np.cumsum(lengths))))
+
+    def to_tracks(self) -> List[Track]:
+        '''
+        :returns: Independent, mutable copies of every track.
+        '''
+
+        return [Track(self.x[start:stop].tolist(),
+                      self.y[start:stop].tolist(),
+                      self.frames[start:stop].tolist())
+                for start, stop in zip(self.offsets[:-1], self.offsets[1:])]
+
+
+class TrackView(Track):
+    '''
+    A read-only Track whose points live in a TrackTable. The
+    `x_values`, `y_values` and `frames` members are numpy views
+    into the table, so no points are copied.
+    '''
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: TrackTable, index: int) -> None:
+        '''
+        Set up a view of the given track within a table.
+
+        :param table: The table which owns the points.
+        :param index: The index of the track in the table.
+        '''
+
+        start: int = int(table.offsets[index])
+        stop: int = int(table.offsets[index + 1])
+
+        self.table: TrackTable = table
+        self.index: int = index
+
+        self.x_values = table.x[start:stop]  # type: ignore[assignment]
+        self.y_values = table.y[start:stop]  # type: ignore[assignment]
+        self.frames = table.frames[start:stop]  # type: ignore[assignment]
+        self._cache = None
+
+    def append(self, x: float, y: float, t: int) -> None:
+        '''
+        Views cannot be appended to. Copy the track first.
+        '''
+
+        raise TypeError('Cannot append to a TrackView')
+
+    def sls(self) -> float:
+        '''
+        Returns the mean straight line speed
+        '''
+
+        return float(self.table.metrics().sls[self.index])
+
+    def mdts(self) -> float:
+        '''
+        Returns the mean distance traveled speed
+        '''
+
+        return float(self.table.metrics().mdts[self.index])
+
+    def mv(self) -> float:
+        '''
+        Mean of the magnitude of the velocity vectors
+        '''
+
+        return float(self.table.metrics().mv[self.index])
+
+    def duration(self) -> int:
+        '''
+        Number of frames the track existed for
+        '''
+
+        return int(self.table.metrics().duration[self.index])
+
+    def displacement(self) -> float:
+        '''
+        Straight line distance from first to last point
+        '''
+
+        return float(self.table.metrics().displacement[self.index])
+
+    def msd(self) -> float:
+        '''
+        Return the mean squared displacement for this particle.
+
+        :returns: The mean-squared displacement of the particle.
+        '''
+
+        return float(self.table.metrics().msd[self.index])
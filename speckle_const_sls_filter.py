@@ -11,9 +11,11 @@ jdehmel@outlook.com
 
 import sys
 import os
-from typing import List
+from typing import Any, Dict, List, Optional, Set
 import speckle as s
 from speckle import filters as f
+from speckle.manifest import Manifest
+from speckle.catalog import Catalog
 
 
 def main(args: List[str]) -> int:
@@ -44,78 +46,85 @@ def main(args: List[str]) -> int:
     total_remaining: int = 0
 
     files_skipped: List[str] = []
-    files_done: List[str] = []
+    files_done: Set[str] = set()
 
-    folders_done: List[str] = []
+    # Used to skip files whose filtered output is up to date
+    manifest: Manifest = Manifest(root)
 
-    def filter_folder(dir_path: str) -> None:
+    def filter_single_file(file_path: str) -> None:
         '''
-        Apply filters to all files herein, then save them under
-        a modified name.
+        Apply filters to this path, which is a single
+        frequency file.
         '''
 
-        dir_path = os.path.realpath(dir_path)
+        nonlocal total_dropped, total_remaining
+        nonlocal files_skipped
 
-        if dir_path in folders_done:
-            return
-
-        folders_done.append(dir_path)
-
-        print(f'Filtering directory {dir_path}...')
+        file_path = os.path.realpath(file_path)
 
-        # Recurse on any subfolders which exist
-        s.for_each_dir(filter_folder, dir_path, '[^.].*')
+        print(f'Operating on file "{file_path}"')
 
-        def filter_single_file(file_path: str) -> None:
-            '''
-            Apply filters to this path, which is a single
-            frequency file.
-            '''
+        # Do not operate on already-filtered files
+        if 'filtered' in file_path:
+            return
 
-            nonlocal total_dropped, total_remaining
-            nonlocal files_skipped
+        # IDK why this is necessary?
+        if file_path in files_done:
+            return
 
-            file_path = os.path.realpath(file_path)
+        files_done.add(file_path)
 
-            print(f'Operating on file "{file_path}"')
+        output: str = file_path + '.filtered.csv'
+        inputs: List[str] = [file_path]
+        params: Dict[str, Any] = {'filter': 'constant',
+                                  'sls_threshold': threshold}
 
-            # Do not operate on already-filtered files
-            if 'filtered' in file_path:
-                return
+        # Skip this file if nothing it depends on has changed
+        results: Optional[Dict[str, Any]] = \
+            manifest.up_to_date(output, inputs, params)
 
-            # IDK why this is necessary?
-            if file_path in files_done:
-                return
+        if results is not None:
+            print(f'Skipping up-to-date file "{file_path}"')
+            total_dropped += results['dropped']
+            total_remaining += results['remaining']
+            return
 
-            files_done.append(file_path)
+        # Load file into FreqFile object
+        contents: s.FreqFile = \
+            s.load_frequency_file(file_path)
 
-            # Load file into FreqFile object
-            contents: s.FreqFile = \
-                s.load_frequency_file(file_path)
+        # Apply Brownian filter
+        dropped, remaining = contents.filter(
+            f.sls_threshold_columns, sls_threshold=threshold)
 
-            # Apply Brownian filter
-            dropped, remaining = contents.filter(
-                f.sls_threshold_filter, sls_threshold=threshold)
+        total_dropped += dropped
+        total_remaining += remaining
 
-            total_dropped += dropped
-            total_remaining += remaining
+        if remaining == 0:
+            files_skipped.append(file_path)
+            return
 
-            if remaining == 0:
-                files_skipped.append(file_path)
-                return
+        # Save as modified file
+        contents.save_tracks(output)
+        manifest.record(output, inputs, params,
+                        {'dropped': dropped, 'remaining': remaining})
 
-            # Save as modified file
-            contents.save_tracks(file_path + '.filtered.csv')
+    try:
+        # Walk the tree only once. Files directly within the root
+        # are not filtered.
+        top: str = os.path.realpath(root)
+        current: str = top
 
-        # Call our function which operates on each file
-        s.for_each_file(filter_single_file, dir_path,
-                        r'.*track.*\.csv')
+        for path in Catalog.scan(root).select(kind='tracks').paths():
+            if os.path.dirname(path) != current:
+                current = os.path.dirname(path)
+                print(f'Filtering directory {current}...')
 
-    try:
-        # Call our function which operates on each directory
-        s.for_each_dir(filter_folder, root)
+            if current != top:
+                filter_single_file(path)
 
     finally:
+        manifest.save()
 
         if total_dropped + total_remaining:
             percentage_dropped: float = \
@@ -9,20 +9,42 @@ jdehmel@outlook.com
 
 import sys
 import os
-import re
-from typing import List
+from typing import Any, Dict, List, Optional, Set
 import speckle as s
 from speckle import filters as f
+from speckle.manifest import Manifest
+from speckle.catalog import Catalog
 
 
-# The RegEx pattern used to detect control files
-control_pattern: str = \
-    r'(((?<![0-9])0 ?khz|control).*track|t(0 ?khz|control)).*\.csv'
-
 # The Brownian threshold filter removes any track whose SLS is
 # < BROWNIAN_MEAN_SLS + k * BROWNIAN_STD_SLS
 k: float = 0
 
+# If not None, the full mobility protocol is used instead: The
+# control is sigma-clipped at this many STDs before its threshold
+# is taken, and tracks above the threshold are clipped likewise
+# (see `speckle.filters.mobility_mask`).
+sigma: Optional[float] = None
+
+
+def subfolders(root: str, folders: List[str]) -> List[str]:
+    '''
+    :param root: The root folder.
+    :param folders: Some folders within the root.
+    :returns: The given folders and all their ancestors, up to
+        but not including the root, in order of appearance.
+    '''
+
+    top: str = os.path.realpath(root)
+    out: Dict[str, None] = {}
+
+    for folder in folders:
+        while folder.startswith(os.path.join(top, '')):
+            out[folder] = None
+            folder = os.path.dirname(folder)
+
+    return list(out)
+
 
 def main(args: List[str]) -> int:
     '''
@@ -49,9 +71,16 @@ def main(args: List[str]) -> int:
     total_remaining: int = 0
 
     files_skipped: List[str] = []
-    files_done: List[str] = []
+    files_done: Set[str] = set()
 
-    folders_done: List[str] = []
+    # Used to skip files whose filtered output is up to date
+    manifest: Manifest = Manifest(root)
+
+    # Walk the tree only once. Control files are those with a
+    # frequency of zero (see `speckle.catalog`).
+    tracks: Catalog = Catalog.scan(root).select(kind='tracks')
+    control_files: List[str] = tracks.select(frequency=0.0).paths()
+    track_files: List[str] = tracks.paths()
 
     def filter_folder(dir_path: str) -> None:
         '''
@@ -59,26 +88,16 @@ def main(args: List[str]) -> int:
         a modified name.
         '''
 
-        dir_path = os.path.realpath(dir_path)
-
-        if dir_path in folders_done:
-            return
-
-        folders_done.append(dir_path)
-
         print(f'Filtering directory {dir_path}...')
 
-        # Recurse on any subfolders which exist
-        s.for_each_dir(filter_folder, dir_path, '[^.].*')
+        prefix: str = os.path.join(dir_path, '')
 
-        # Find control
+        # Find control (the last one found in this subtree)
         fq_control_path: str = ''
 
-        def find(path: str) -> None:
-            nonlocal fq_control_path
-            fq_control_path = path
-
-        s.for_each_file(find, dir_path, r'.*' + control_pattern)
+        for path in control_files:
+            if path.startswith(prefix):
+                fq_control_path = path
 
         if not fq_control_path or not fq_control_path.endswith('.csv'):
             print('Failed to find control file.')
@@ -90,6 +109,14 @@ def main(args: List[str]) -> int:
         # Extract brownian threshold
         threshold: float = control.sls_mean() + k * control.sls_std()
 
+        if sigma is not None:
+            try:
+                threshold = f.brownian_threshold(control.metrics().sls,
+                                                 k, sigma)
+            except f.OverFilteringError:
+                print('Control has no tracks left after clipping.')
+                return
+
         def filter_single_file(file_path: str) -> None:
             '''
             Apply filters to this path, which is a single
@@ -106,7 +133,7 @@ def main(args: List[str]) -> int:
             if os.path.samefile(file_path, fq_control_path):
                 return
 
-            if re.findall(control_pattern, file_path):
+            if file_path in control_files:
                 return
 
             # Do not operate on already-filtered files
@@ -121,14 +148,36 @@ def main(args: List[str]) -> int:
             if file_path in files_done:
                 return
 
-            files_done.append(file_path)
+            files_done.add(file_path)
+
+            output: str = file_path + '.filtered.csv'
+            inputs: List[str] = [file_path, fq_control_path]
+            params: Dict[str, Any] = {'filter': 'brownian', 'k': k}
+
+            if sigma is not None:
+                params = {'filter': 'mobility', 'k': k, 'sigma': sigma}
+
+            # Skip this file if nothing it depends on has changed
+            results: Optional[Dict[str, Any]] = \
+                manifest.up_to_date(output, inputs, params)
+
+            if results is not None:
+                print(f'Skipping up-to-date file "{file_path}"')
+                total_dropped += results['dropped']
+                total_remaining += results['remaining']
+                return
 
             # Load file into FreqFile object
             contents: s.FreqFile = s.load_frequency_file(file_path)
 
             # Apply Brownian filter
-            dropped, remaining = contents.filter(f.sls_threshold_filter,
-                                                 sls_threshold=threshold)
+            if sigma is None:
+                dropped, remaining = contents.filter(f.sls_threshold_columns,
+                                                     sls_threshold=threshold)
+
+            else:
+                dropped, remaining = contents.erase(f.mobility_mask(
+                    contents.metrics().sls, threshold, sigma))
 
             total_dropped += dropped
             total_remaining += remaining
@@ -138,18 +187,28 @@ def main(args: List[str]) -> int:
                 return
 
             # Save as modified file
-            contents.save_tracks(file_path + '.filtered.csv')
+            contents.save_tracks(output)
+            manifest.record(output, inputs, params,
+                            {'dropped': dropped, 'remaining': remaining})
 
         # Call our function which operates on each file
-        s.for_each_file(filter_single_file, dir_path, r'.*track.*\.csv')
+        for path in track_files:
+            if path.startswith(prefix):
+                filter_single_file(path)
 
     code: int = 0
 
     try:
-        # Call our function which operates on each directory
-        s.for_each_dir(filter_folder, root)
+        # Subfolders are filtered before the folders containing
+        # them, so each file is filtered against the nearest
+        # control above it.
+        for dir_path in sorted(subfolders(root, tracks.folders()),
+                               key=lambda path: path.count(os.sep),
+                               reverse=True):
+            filter_folder(dir_path)
 
     finally:
+        manifest.save()
 
         if total_dropped + total_remaining:
             percentage_dropped: float = total_dropped / (total_dropped
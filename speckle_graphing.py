@@ -14,30 +14,12 @@ python3 speckle_graphing.py ~/data/2-21-2024-data/120um/8v/ \
 
 import sys
 import os
+import re
 from typing import List, Dict, Any
 import pandas as pd
 import numpy as np
 from matplotlib import pyplot as plt
-import name_fixer
-import speckle
-
-
-files: Dict[str, str] = {
-    r'control[0-9]*_tracks\.csv': '0khz',
-    r'(?<![\.0-9])0\.2khz[0-9]*_tracks\.csv': '0.2khz',
-    r'(?<![\.0-9])0\.3khz[0-9]*_tracks\.csv': '0.3khz',
-    r'(?<![\.0-9])0\.4khz[0-9]*_tracks\.csv': '0.4khz',
-    r'(?<![\.0-9])0\.5khz[0-9]*_tracks\.csv': '0.5khz',
-    r'(?<![\.0-9])0\.8khz[0-9]*_tracks\.csv': '0.8khz',
-    r'(?<![\.0-9])1khz[0-9]*_tracks\.csv': '1khz',
-    r'(?<![\.0-9])2khz[0-9]*_tracks\.csv': '2khz',
-    r'(?<![\.0-9])3khz[0-9]*_tracks\.csv': '3khz',
-    r'(?<![\.0-9])5khz[0-9]*_tracks\.csv': '5khz',
-    r'(?<![\.0-9])10khz[0-9]*_tracks\.csv': '10khz',
-    r'(?<![\.0-9])25khz[0-9]*_tracks\.csv': '25khz',
-    r'(?<![\.0-9])50khz[0-9]*_tracks\.csv': '50khz',
-    r'(?<![\.0-9])75khz[0-9]*_tracks\.csv': '75khz',
-    r'(?<![\.0-9])100khz[0-9]*_tracks\.csv': '100khz'}
+from speckle.catalog import Catalog, frequency_label
 
 
 graphing_duration_threshold: int = 0
@@ -67,11 +49,16 @@ def main(args: List[str]) -> int:
     folder_pattern: str = args[2]
     file_pattern: str = args[3] if len(args) == 4 else '.*'
 
+    # Walk the tree only once
+    catalog: Catalog = Catalog.scan(root_folder).select(
+        kind=('tracks', 'filtered'))
+    top: str = os.path.realpath(root_folder)
+
     def do_root_folder(root: str) -> None:
         '''
         Graph the given folder and save locally. This folder
-        should contain files matching the `files` patterns
-        above.
+        should contain tracks files for some frequencies (see
+        `speckle.catalog`).
 
         :param root: The folder to use
         '''
@@ -91,28 +78,25 @@ def main(args: List[str]) -> int:
 
         durations: List[int] = []
 
-        old_dir: str = os.getcwd()
-        os.chdir(root)
-
-        # Look for all the frequency track files in this dir
-        labels: List[str] = list(files)
+        # Look for all the frequency track files in this dir,
+        # taking the first one of each frequency
+        by_frequency: Dict[float, str] = {}
 
-        candidate_files: List[str] = name_fixer.find_all(file_pattern)
+        for entry in catalog.select(within=root, directly=True):
+            if entry.frequency is not None \
+                    and entry.frequency not in by_frequency \
+                    and re.search(file_pattern,
+                                  os.path.basename(entry.path)):
+                by_frequency[entry.frequency] = os.path.basename(entry.path)
 
-        fixed_files: List[str] = name_fixer.fix_names(labels, candidate_files)
+        frequencies: List[float] = sorted(by_frequency)
+        fixed_files: List[str] = [by_frequency[hz] for hz in frequencies]
+        labels: List[str] = [frequency_label(hz) for hz in frequencies]
 
         print('Files:')
         for file in fixed_files:
             print(f'\t{file}')
 
-        zipped = [(item, files[labels[i]])
-                  for i, item in enumerate(fixed_files) if item]
-
-        fixed_files = [item[0] for item in zipped]
-        labels = [item[1] for item in zipped]
-
-        fixed_files = [file for file in fixed_files if file]
-
         for file in fixed_files:
 
             df: pd.DataFrame = pd.read_csv(root + '/' + file)
@@ -137,8 +121,6 @@ def main(args: List[str]) -> int:
 
             v_lines.append(i)
 
-        os.chdir(old_dir)
-
         plt.clf()
         plt.title(root + ' Speckle-Tracked')
 
@@ -171,7 +153,9 @@ def main(args: List[str]) -> int:
 
         pd.DataFrame(d).to_csv(root.replace('/', '_') + '_speckle_plot.csv')
 
-    speckle.for_each_dir(do_root_folder, root_folder, folder_pattern)
+    for folder in catalog.folders():
+        if folder != top and re.match(folder_pattern, folder):
+            do_root_folder(folder)
 
     return 0
 
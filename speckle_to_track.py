@@ -2,14 +2,23 @@
 Operates recursively on the given directory, transforming all
 `_speckles.csv` files into `_tracks.csv` files.
 
+Pass `--jobs N` after the folder to convert files on N worker
+processes. Output is printed in the same (sorted) file order
+either way.
+
+Files whose `_tracks.csv` is already up to date (according to
+the folder's manifest, see `speckle.manifest`) are skipped.
+
 Jordan Dehmel, 2024
 jdehmel@outlook.com
 jedehmel@mavs.coloradomesa.edu
 '''
 
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import speckle
-from typing import List
+from speckle.manifest import Manifest
+from typing import Any, Dict, List, Optional
 
 
 # Note: This is a very important filter! It's not a good idea to
@@ -17,39 +26,97 @@ from typing import List
 speckle.duration_threshold = 30
 
 
+def tracks_path(name: str) -> str:
+    '''
+    :param name: A speckle file.
+    :returns: The tracks file it is converted to.
+    '''
+
+    return name.replace('_speckles.csv', '_tracks.csv')
+
+
+def convert_file(name: str) -> Optional[str]:
+    '''
+    Converts a single file from speckles to tracks. This is at
+    module level so that it can be sent to worker processes.
+
+    :param name: The speckle file to convert.
+    :returns: None on success, or a failure message.
+    '''
+
+    try:
+        speckle.process_file(
+            name,
+            None,  # No spots file needed
+            tracks_path(name),
+            1.0)  # DO NOT USE ADJUSTMENT COEFFICIENT != 1.0
+
+    except RuntimeError:
+        return f'Failure in {name}'
+
+    return None
+
+
 def main(argv: List[str]) -> int:
     '''
     Main function for use when this is called as a script
     '''
 
-    if len(argv) == 1:
+    if len(argv) not in (2, 4) or (len(argv) == 4 and argv[2] != '--jobs'):
         print('Please provide 1 command-line argument: '
-              'The folder to operate in.')
+              'The folder to operate in. Optionally, follow it',
+              'with `--jobs N` to use N worker processes.')
         return 1
 
     from_filepath: str = argv[1]
+    jobs: int = int(argv[3]) if len(argv) == 4 else 1
 
-    def convert_file(name: str) -> None:
+    # Discover all files up front, in a deterministic order
+    names: List[str] = []
+    speckle.for_each_file(names.append, from_filepath,
+                          r'.*_speckles\.csv')
+    names.sort()
+
+    # Skip anything which is already up to date
+    manifest: Manifest = Manifest(from_filepath)
+    params: Dict[str, Any] = {
+        'duration_threshold': speckle.speckle.duration_threshold,
+        'adjustment_coefficient': 1.0}
+
+    stale: List[str] = []
+    for name in names:
+        if manifest.up_to_date(tracks_path(name), [name], params) is None:
+            stale.append(name)
+        else:
+            print(f'Skipping up-to-date file {name}')
+
+    def report(name: str, failure: Optional[str]) -> None:
         '''
-        Converts a single file from speckles to tracks.
+        Print a conversion failure, or record a success.
         '''
 
-        print(f'On file {name}')
-
-        try:
-            to_filepath: str = name.replace('_speckles.csv',
-                                            '_tracks.csv')
-            speckle.process_file(
-                name,
-                '/tmp/junk.csv',
-                to_filepath,
-                1.0)  # DO NOT USE ADJUSTMENT COEFFICIENT != 1.0
-
-        except RuntimeError:
-            print(f'Failure in {name}')
-
-    speckle.for_each_file(convert_file, from_filepath,
-                          r'.*_speckles\.csv')
+        if failure is not None:
+            print(failure)
+        else:
+            manifest.record(tracks_path(name), [name], params)
+
+    try:
+        if jobs <= 1:
+            for name in stale:
+                print(f'On file {name}')
+                report(name, convert_file(name))
+
+        else:
+            # Results are reported in submission order,
+            # regardless of which worker finishes first.
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for name, failure in zip(stale,
+                                         pool.map(convert_file, stale)):
+                    print(f'On file {name}')
+                    report(name, failure)
+
+    finally:
+        manifest.save()
 
     return 0
 